@@ -1,25 +1,19 @@
+import asyncio
+import hashlib
 import json
+import logging
 import re
-from typing import List, Union
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Collection, List, Optional, Union
 
-from langchain.chat_models import init_chat_model
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import AIMessage, HumanMessage
 from pydantic import BaseModel
-from template import prompt, generate_prompt, generate_param_prompt
+from client.tracing import record_prompt, record_tokens, registry, span
+from plan_parser import IncrementalPlanParser, IncrementalToolCallParser, PlanParseError, parse_json
+from template import (prompt, generate_prompt, generate_param_prompt, summary_prompt, repair_prompt, native_prompt,
+                      native_param_prompt, direct_prompt, param_repair_prompt)
 
-
-def extract_json_from_response(text):
-    # 移除 <think>...</think> 内容
-    text = re.sub(r'<think>[\s\S]*?</think>', '', text)
-    # 优先提取 ```json ... ``` 中的内容
-    match = re.search(r'```json\s*([\s\S]*?)\s*```', text)
-    if match is None:
-        match = re.search(r'(\[.*\])', text, re.DOTALL)
-    json_str = match.group(1) if match else text
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"JSON 解析失败: {e}")
+logger = logging.getLogger(__name__)
 
 
 # 模拟的响应内容类
@@ -40,6 +34,85 @@ class ToolCallResult(BaseModel):
     node_number: int = 0
 
 
+class PlanValidationError(ValueError):
+    pass
+
+
+class ParamGenerationError(ValueError):
+    """节点参数修复后仍然无法解析为 JSON 对象"""
+
+
+# 规划结果修复后仍然无法解析时返回给用户的文本
+PLAN_FALLBACK_TEXT = "抱歉，我没能理解该如何处理这个问题，请换一种说法再试一次。"
+PLAN_OUTCOME_HELP = "规划结果解析次数（ok / plain_text / repaired / fallback，原生工具调用为 native_*）"
+PARAM_OUTCOME_HELP = "节点参数解析次数（ok / repaired / failed）"
+
+
+def parse_params(text: str) -> dict:
+    """解析模型输出的节点参数，截断、无法解析或不是 JSON 对象时抛出异常"""
+    value = parse_json(text)
+    if not isinstance(value, dict):
+        raise PlanValidationError(f"参数必须是 JSON 对象，实际为 {type(value).__name__}")
+    return value
+
+
+def to_tool_node(item, tool_names: Optional[Collection[str]] = None) -> FakeToolContent:
+    if not isinstance(item, dict):
+        raise PlanValidationError(f"调用节点必须是 JSON 对象：{item!r}")
+    if item.get("type") != "tool":
+        raise PlanValidationError(f'调用节点的 type 必须为 "tool"：{item!r}')
+    name = item.get("name")
+    if not isinstance(name, str) or not name:
+        raise PlanValidationError(f"调用节点缺少工具名称 name：{item!r}")
+    if tool_names is not None and name not in tool_names:
+        raise PlanValidationError(f"工具 {name} 不在可用的工具列表中")
+    if not isinstance(item.get("input"), dict):
+        raise PlanValidationError(f"工具 {name} 的参数 input 必须是 JSON 对象")
+    return FakeToolContent(type="tool", name=name, input=item["input"])
+
+
+def to_tool_call_result(value, tool_names: Optional[Collection[str]] = None) -> ToolCallResult:
+    """按 ToolCallResult 的结构校验解析出的 JSON，错误信息用于修复提示"""
+    if isinstance(value, list):
+        if not value:
+            raise PlanValidationError("工具调用数组不能为空")
+        return ToolCallResult(type="chain", result=[to_tool_node(item, tool_names) for item in value])
+    if isinstance(value, dict):
+        if value.get("type") == "text":
+            if not isinstance(value.get("text"), str):
+                raise PlanValidationError('文本回答缺少字符串字段 "text"')
+            return ToolCallResult(type="text", result=FakeTextContent(type="text", text=value["text"]))
+        return ToolCallResult(type="tool", result=to_tool_node(value, tool_names))
+    raise PlanValidationError("输出必须是 JSON 对象或数组")
+
+
+def parse_plan(parser: IncrementalPlanParser, tool_names: Optional[Collection[str]] = None) -> ToolCallResult:
+    value = parser.result()
+    if parser.truncated:
+        raise PlanParseError("输出被截断，JSON 不完整")
+    return to_tool_call_result(value, tool_names)
+
+
+def to_native_tool(tool: dict) -> dict:
+    """把工具目录中的工具转换为原生工具调用（function calling）的定义"""
+    return {"type": "function", "function": {
+        "name": tool["name"],
+        "description": tool.get("description") or "",
+        "parameters": tool.get("input_schema") or {"type": "object", "properties": {}},
+    }}
+
+
+def supports_native_tools(client) -> bool:
+    """聊天模型是否实现了 bind_tools（基类的默认实现直接抛出 NotImplementedError）"""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    bind_tools = getattr(type(client), "bind_tools", None)
+    return bind_tools is not None and bind_tools is not BaseChatModel.bind_tools
+
+
+def is_plan_fallback(result: ToolCallResult) -> bool:
+    return result.type == "text" and result.result.text == PLAN_FALLBACK_TEXT
+
+
 class ToolResultItem(BaseModel):
     name: str  # 工具名称
     result: str  # 工具返回的结果
@@ -52,88 +125,357 @@ class UserQuery(BaseModel):
 
 
 class ModelAdapter:
-    def __init__(self, model_name: str, model_type: str, api_key: str, base_url: str):
+    def __init__(self, model_name: str, model_type: str, api_key: str, base_url: str,
+                 timeout: Optional[float] = None, usage_callback: Optional[Callable[[dict], None]] = None,
+                 client=None, native_tools: bool = False):
         self.generate_prompt = generate_prompt
-        self.client = init_chat_model(model_name, model_provider=model_type, temperature=0, api_key=api_key,
-                                      base_url=base_url)
+        if client is not None:
+            # 直接使用传入的聊天模型，例如基准测试中的模拟模型
+            self.client = client
+        else:
+            # 按需导入：langchain.chat_models 和模型供应商模块的导入耗时占启动时间的大头
+            from langchain.chat_models import init_chat_model
+            # openai 流式输出默认不返回 token 用量，需要显式开启
+            extra_kwargs = {"stream_usage": True} if model_type == "openai" else {}
+            self.client = init_chat_model(model_name, model_provider=model_type, temperature=0, api_key=api_key,
+                                          base_url=base_url, **extra_kwargs)
 
         self.system_prompt = prompt
         self.generate_param_prompt = generate_param_prompt
+        self.summary_prompt = summary_prompt
+        self.repair_prompt = repair_prompt
+        self.param_repair_prompt = param_repair_prompt
+        # 提示词模板只构建一次；langchain_core.prompts 同样按需导入，
+        # ModelAdapter 在后台线程中创建时，这部分耗时与 MCP 服务启动并行
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+        # 工具信息放在 system 中，保证提示词前缀稳定，便于模型服务端的前缀缓存命中
+        self.plan_template = ChatPromptTemplate([
+            ("system", self.system_prompt + "\n可用的工具列表如下:{tools_info}"),
+            MessagesPlaceholder("history"),
+            ("human", "那么我的问题是:{user_message}")
+        ])
+        self.context_template = ChatPromptTemplate([
+            ("system", self.generate_prompt),
+            MessagesPlaceholder("history"),
+            ("human", "{user_input}")
+        ])
+        self.param_template = ChatPromptTemplate([
+            ("system", self.generate_param_prompt),
+            MessagesPlaceholder("history"),
+            ("human", "{user_input}")
+        ])
+        self.summary_template = ChatPromptTemplate([
+            ("system", self.summary_prompt),
+            ("human", "已有摘要：{summary}\n需要合并的对话：\n{dialogue}")
+        ])
+        # 原生工具调用模式：工具以 bind_tools 的方式传给模型，参数生成使用 with_structured_output，
+        # 不再在提示词中嵌入工具列表和 JSON 格式说明；模型不支持时退回提示词模板
+        self.native_tools = native_tools and supports_native_tools(self.client)
+        if native_tools and not self.native_tools:
+            logger.warning("模型 %s 不支持原生工具调用，使用提示词模板", model_name)
+        self.native_plan_template = ChatPromptTemplate([
+            ("system", native_prompt),
+            MessagesPlaceholder("history"),
+            ("human", "{user_message}")
+        ])
+        self.native_param_template = ChatPromptTemplate([
+            ("system", native_param_prompt),
+            MessagesPlaceholder("history"),
+            ("human", "{user_input}")
+        ])
+        # 路由判断为闲聊时使用的简短提示词，不包含工具列表和输出格式说明
+        self.direct_template = ChatPromptTemplate([
+            ("system", direct_prompt),
+            MessagesPlaceholder("history"),
+            ("human", "{user_message}")
+        ])
+        # 模型和规划提示词的指纹，作为规划缓存 key 的一部分：换模型、修改提示词或切换原生工具调用后旧的规划不再命中
+        self.fingerprint = hashlib.sha256("\x1f".join(
+            [model_type, model_name, self.system_prompt, native_prompt, str(self.native_tools)]).encode("utf-8")
+        ).hexdigest()[:16]
+        # 序列化后的工具列表 -> 绑定了这些工具的模型，避免每次规划都重新转换工具定义
+        self._bound_models = {}
+        # 单次模型调用的超时时间（秒），None 表示不限制
+        self.timeout = timeout
+        # 每次模型调用结束后回调 token 用量（input_tokens / output_tokens）
+        self.usage_callback = usage_callback
+
+    async def _astream_messages(self, messages, timeout: Optional[float] = None, client=None) -> AsyncIterator:
+        """异步流式调用模型，逐块返回 AIMessageChunk；整体超时抛出 asyncio.TimeoutError，取消或提前退出时及时关闭流"""
+        client = client if client is not None else self.client
+        timeout = timeout if timeout is not None else self.timeout
+        prompt_messages = messages.to_messages() if hasattr(messages, "to_messages") else messages
+        record_prompt(sum(len(str(message.content)) for message in prompt_messages), len(prompt_messages))
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        async with aclosing(client.astream(input=messages)) as stream:
+            while True:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), remaining)
+                except StopAsyncIteration:
+                    return
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage:
+                    record_tokens(usage)
+                    if self.usage_callback is not None:
+                        self.usage_callback(usage)
+                yield chunk
+
+    async def _astream_chunks(self, messages, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """异步流式调用模型，逐块返回文本"""
+        async with aclosing(self._astream_messages(messages, timeout)) as stream:
+            async for chunk in stream:
+                yield chunk.content
 
-    def create(self, messages: list, history: list, tools: list):
+    async def _astream_text(self, messages, timeout: Optional[float] = None,
+                            on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """分块收集模型输出后一次性拼接"""
+        chunks = []
+        async for text in self._astream_chunks(messages, timeout):
+            chunks.append(text)
+            if on_chunk is not None:
+                on_chunk(text)
+        return "".join(chunks)
+
+    async def create(self, messages: list, history: list, tools: Union[list, str], timeout: Optional[float] = None,
+                     on_step: Optional[Callable[[FakeToolContent], None]] = None,
+                     tool_names: Optional[Collection[str]] = None,
+                     on_reset: Optional[Callable[[], None]] = None) -> ToolCallResult:
         """
-        将 messages 与 tools 信息封装后调用模型，并返回一个 FakeResponse 对象。
+        将 messages 与 tools 信息封装后调用模型，并返回一个 ToolCallResult 对象。
+        tools 可以直接传入已序列化好的工具列表字符串，避免每次请求重复序列化。
+        传入 on_step 时，调用链中的每个节点在生成完毕后立即回调，调用方可以边生成边执行。
+        原生工具调用无效、退回提示词模板重新规划前回调 on_reset，此前通过 on_step 交出的节点作废，
+        调用方不能把它们和重新规划后交出的节点当作两次调用。
+        传入 tool_names 时，规划中出现不存在的工具视为无效输出。
+        输出无法解析或不符合结构时带着错误原因重新提示一次，仍然失败则返回文本回答，不会返回 None。
         """
         # 针对简单实现，这里只取最后一条消息内容作为用户输入
         user_message = messages
-        # 拼接工具信息（注意实际情况可能需要更灵活的处理）
-        # combined_input = f"{json.dumps(tools)}\n那么我的问题是:{user_message}"
-        combined_input = "{tools_info}\n那么我的问题是:{user_message}"
-        # 调用模型的聊天接口，使用流式输出
-        messages = ChatPromptTemplate([
-            ("system", self.system_prompt),
-            MessagesPlaceholder("history"),
-            ("human", combined_input)
-        ]).invoke({"tools_info": json.dumps(tools), "user_message": user_message, "history": history})
-        response_text = ""
-        for chunk in self.client.stream(input=messages):
-            response_text += chunk.content  # 累加每个块的内容
-
-        print("model (full response):", response_text)
-        # 尝试解析 JSON，如果解析失败，就直接使用原文本
-        result = None
-        try:
-            parsed_result = extract_json_from_response(response_text)
-            print(parsed_result)
-            if isinstance(parsed_result, dict):
-                type = parsed_result['type']
-                if type == 'text':
-                    call_info = FakeTextContent(text=parsed_result['text'], type=type)
+        tools_info = tools if isinstance(tools, str) else json.dumps(tools)
+        if self.native_tools:
+            result = await self._create_native(user_message, history, tools_info, timeout, on_step, tool_names)
+            if result is not None:
+                return result
+            if on_reset is not None:
+                on_reset()
+        return await self._create_from_prompt(user_message, history, tools_info, timeout, on_step, tool_names)
+
+    async def _create_native(self, user_message, history: list, tools_info: str, timeout: Optional[float] = None,
+                             on_step: Optional[Callable[[FakeToolContent], None]] = None,
+                             tool_names: Optional[Collection[str]] = None) -> Optional[ToolCallResult]:
+        """原生工具调用：模型直接返回（可能并行的）工具调用，工具调用无效时返回 None，由调用方退回提示词模板"""
+        messages = self.native_plan_template.invoke({"user_message": user_message, "history": history})
+        parser = IncrementalToolCallParser()
+        chunks = []
+        with span("model.create", tools_chars=len(tools_info), mode="native") as create_span:
+            async with aclosing(self._astream_messages(messages, timeout, self._bind_tools(tools_info))) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk.content)
+                    for item in parser.feed(chunk.tool_call_chunks):
+                        if on_step is None:
+                            continue
+                        try:
+                            on_step(to_tool_node(item, tool_names))
+                        except PlanValidationError:
+                            continue
+            calls = parser.result()
+            try:
+                if not calls:
+                    text = re.sub(r"<think>[\s\S]*?</think>", "", "".join(chunks)).strip() or PLAN_FALLBACK_TEXT
+                    result, outcome = ToolCallResult(type="text", result=FakeTextContent(type="text", text=text)), \
+                        "native_text"
+                elif len(calls) == 1:
+                    result, outcome = ToolCallResult(type="tool", result=to_tool_node(calls[0], tool_names)), \
+                        "native_tool"
                 else:
-                    call_info = FakeToolContent(type=type, name=parsed_result['name'], input=parsed_result['input'])
-                result = ToolCallResult(type=type, result=call_info)
-            else:
-                call_info = []
-                for item in parsed_result:
-                    call_info.append(FakeToolContent(type=item['type'], name=item['name'], input=item['input']))
-                result = ToolCallResult(type="chain", result=call_info)
-        except Exception:
-            print("转化出错")
+                    result, outcome = to_tool_call_result(calls, tool_names), "native_chain"
+            except PlanValidationError as e:
+                logger.warning("原生工具调用无效，退回提示词模板：%s", e)
+                result, outcome = None, "native_invalid"
+            create_span.set_attribute("plan.outcome", outcome)
+        registry.inc("agent_plan_parse_total", 1, PLAN_OUTCOME_HELP, outcome=outcome)
         return result
 
-    def generate_context(self, generate_info: UserQuery, history: List):
+    def _bind_tools(self, tools_info: str):
+        bound = self._bound_models.get(tools_info)
+        if bound is None:
+            bound = self.client.bind_tools([to_native_tool(tool) for tool in json.loads(tools_info)])
+            # 工具目录变化或按问题检索工具时会出现不同的工具列表，只保留最近的若干个
+            if len(self._bound_models) >= 32:
+                self._bound_models.pop(next(iter(self._bound_models)))
+            self._bound_models[tools_info] = bound
+        return bound
+
+    async def _create_from_prompt(self, user_message, history: list, tools_info: str,
+                                  timeout: Optional[float] = None,
+                                  on_step: Optional[Callable[[FakeToolContent], None]] = None,
+                                  tool_names: Optional[Collection[str]] = None) -> ToolCallResult:
+        """工具列表和输出格式写在提示词中，模型以 JSON 文本返回规划"""
         # 调用模型的聊天接口，使用流式输出
-        messages = ChatPromptTemplate([
-            ("system", self.generate_prompt),
-            MessagesPlaceholder("history"),
-            ("human", "{user_input}")
-        ]).invoke({"user_input": json.dumps(generate_info.model_dump()), "history": history})
-        response_text = ""
-        for chunk in self.client.stream(input=messages):
-            response_text += chunk.content  # 累加每个块的内容
+        messages = self.plan_template.invoke({"tools_info": tools_info, "user_message": user_message,
+                                              "history": history})
+        # 边生成边解析，输出结束时解析也随之完成，不需要再扫描一遍完整文本
+        parser = IncrementalPlanParser()
+
+        def on_chunk(text: str):
+            for item in parser.feed(text):
+                if on_step is None:
+                    continue
+                try:
+                    on_step(to_tool_node(item, tool_names))
+                except PlanValidationError:
+                    # 不完整的节点不提前执行，等完整输出解析
+                    continue
+
+        with span("model.create", tools_chars=len(tools_info)) as create_span:
+            response_text = await self._astream_text(messages, timeout, on_chunk)
+            logger.debug("model (full response): %s", response_text)
+            try:
+                result, outcome = parse_plan(parser, tool_names), "ok"
+            except (PlanParseError, PlanValidationError) as e:
+                if not parser.started:
+                    # 没有按格式输出 JSON，直接作为文本回答
+                    text = re.sub(r"<think>[\s\S]*?</think>", "", response_text).strip() or PLAN_FALLBACK_TEXT
+                    result, outcome = ToolCallResult(type="text", result=FakeTextContent(type="text", text=text)), \
+                        "plain_text"
+                else:
+                    logger.warning("规划结果解析失败，重新提示修复：%s", e)
+                    result = await self._repair_plan(messages, response_text, str(e), tool_names, timeout)
+                    outcome = "repaired" if result is not None else "fallback"
+                    if result is None:
+                        result = ToolCallResult(type="text",
+                                                result=FakeTextContent(type="text", text=PLAN_FALLBACK_TEXT))
+            create_span.set_attribute("plan.outcome", outcome)
+        registry.inc("agent_plan_parse_total", 1, PLAN_OUTCOME_HELP, outcome=outcome)
+        logger.debug("规划结果：%s", result)
+        return result
+
+    async def _repair_plan(self, messages, response_text: str, error: str,
+                           tool_names: Optional[Collection[str]] = None,
+                           timeout: Optional[float] = None) -> Optional[ToolCallResult]:
+        """带着上一次的输出和错误原因重新提示一次，仍然失败时返回 None"""
+        repair_messages = messages.to_messages() + [
+            AIMessage(content=response_text),
+            HumanMessage(content=self.repair_prompt.format(error=error)),
+        ]
+        parser = IncrementalPlanParser()
+        with span("model.repair_plan", error=error):
+            await self._astream_text(repair_messages, timeout, parser.feed)
+        try:
+            return parse_plan(parser, tool_names)
+        except (PlanParseError, PlanValidationError) as e:
+            logger.warning("规划结果修复失败：%s", e)
+            return None
 
-        print("model (full response):", response_text)
+    async def generate_context(self, generate_info: UserQuery, history: List, timeout: Optional[float] = None):
+        chunks = []
+        async for text in self.astream_context(generate_info, history, timeout):
+            chunks.append(text)
+        response_text = "".join(chunks)
+
+        logger.debug("model (full response): %s", response_text)
         call_info = FakeTextContent(text=response_text, type="text")
         return ToolCallResult(type="text", result=call_info)
 
-    def generate_param_by_current_node(self,
-                                       chain_history: List[dict],
-                                       current_node_info: dict,
-                                       user_input: str,
-                                       history: List):
+    async def astream_context(self, generate_info: UserQuery, history: List,
+                              timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """流式生成最终回答，模型每输出一块文本就返回一块"""
+        # 调用模型的聊天接口，使用流式输出
+        messages = self.context_template.invoke({
+            "user_input": json.dumps(generate_info.model_dump(), ensure_ascii=False), "history": history})
+        with span("model.generate_context", tools=len(generate_info.tool_chain)):
+            async with aclosing(self._astream_chunks(messages, timeout)) as stream:
+                async for text in stream:
+                    yield text
+
+    async def astream_direct(self, user_message: str, history: List,
+                             timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """不经过规划直接流式回答，用于不需要工具的问题"""
+        messages = self.direct_template.invoke({"user_message": user_message, "history": history})
+        with span("model.direct"):
+            async with aclosing(self._astream_chunks(messages, timeout)) as stream:
+                async for text in stream:
+                    yield text
+
+    async def generate_param_by_current_node(self,
+                                             chain_history: List[dict],
+                                             current_node_info: dict,
+                                             user_input: str,
+                                             history: List,
+                                             timeout: Optional[float] = None):
         # 组建输入
         input_template = {
             "user_input": user_input,
             "chain_history": chain_history,
             "current_node_info": current_node_info,
         }
-        messages = ChatPromptTemplate([
-            ("system", self.generate_param_prompt),
-            MessagesPlaceholder("history"),
-            ("human", "{user_input}")
-        ]).invoke({"user_input": json.dumps(input_template), "history": history})
-        response_text = ""
-        for chunk in self.client.stream(input=messages):
-            response_text += chunk.content  # 累加每个块的内容
-        print("model (full response):", response_text)
-        return extract_json_from_response(response_text)
+        if self.native_tools and current_node_info and current_node_info.get("input_schema"):
+            params = await self._generate_param_native(input_template, history, timeout)
+            if params is not None:
+                return params
+        messages = self.param_template.invoke({"user_input": json.dumps(input_template, ensure_ascii=False),
+                                               "history": history})
+        tool_name = current_node_info.get("name", "") if current_node_info else ""
+        with span("model.generate_param", tool=tool_name):
+            response_text = await self._astream_text(messages, timeout)
+        logger.debug("model (full response): %s", response_text)
+        try:
+            params, outcome = parse_params(response_text), "ok"
+        except (PlanParseError, PlanValidationError) as e:
+            logger.warning("工具 %s 的参数解析失败，重新提示修复：%s", tool_name, e)
+            try:
+                params, outcome = await self._repair_params(messages, response_text, str(e), tool_name, timeout), \
+                    "repaired"
+            except (PlanParseError, PlanValidationError) as repair_error:
+                registry.inc("agent_param_parse_total", 1, PARAM_OUTCOME_HELP, outcome="failed")
+                raise ParamGenerationError(f"工具 {tool_name} 的参数生成失败：{repair_error}") from repair_error
+        registry.inc("agent_param_parse_total", 1, PARAM_OUTCOME_HELP, outcome=outcome)
+        return params
+
+    async def _repair_params(self, messages, response_text: str, error: str, tool_name: str,
+                             timeout: Optional[float] = None) -> dict:
+        """带着上一次的输出和错误原因重新提示一次，仍然失败时抛出 PlanParseError / PlanValidationError"""
+        repair_messages = messages.to_messages() + [
+            AIMessage(content=response_text),
+            HumanMessage(content=self.param_repair_prompt.format(error=error)),
+        ]
+        with span("model.repair_param", tool=tool_name, error=error):
+            response_text = await self._astream_text(repair_messages, timeout)
+        logger.debug("model (full response): %s", response_text)
+        return parse_params(response_text)
+
+    async def _generate_param_native(self, input_template: dict, history: List,
+                                     timeout: Optional[float] = None) -> Optional[dict]:
+        """按当前工具的 input_schema 做结构化输出，结果无效时返回 None，由调用方退回提示词模板"""
+        node_info = input_template["current_node_info"]
+        schema = {"title": node_info["name"], "description": node_info.get("description") or "",
+                  **node_info["input_schema"]}
+        structured = self.client.with_structured_output(schema, include_raw=True)
+        messages = self.native_param_template.invoke({"user_input": json.dumps(input_template, ensure_ascii=False),
+                                                      "history": history})
+        prompt_messages = messages.to_messages()
+        with span("model.generate_param", tool=node_info["name"], mode="native"):
+            record_prompt(sum(len(str(message.content)) for message in prompt_messages), len(prompt_messages))
+            timeout = timeout if timeout is not None else self.timeout
+            response = await asyncio.wait_for(structured.ainvoke(messages), timeout)
+            usage = getattr(response["raw"], "usage_metadata", None)
+            if usage:
+                record_tokens(usage)
+                if self.usage_callback is not None:
+                    self.usage_callback(usage)
+        params = response.get("parsed")
+        if response.get("parsing_error") is not None or not isinstance(params, dict):
+            logger.warning("结构化输出参数无效，退回提示词模板：%s", response.get("parsing_error"))
+            return None
+        return params
+
+    async def summarize_history(self, summary: str, messages: List, timeout: Optional[float] = None) -> str:
+        """把较早的对话消息合并进已有摘要"""
+        dialogue = "\n".join(f"{message.type}: {message.content}" for message in messages)
+        messages = self.summary_template.invoke({"summary": summary or "无", "dialogue": dialogue})
+        with span("model.summarize", messages=len(messages.to_messages())):
+            return await self._astream_text(messages, timeout)
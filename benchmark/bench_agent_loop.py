@@ -0,0 +1,192 @@
+"""
+智能体主流程基准：使用脚本化模拟模型和进程内 MCP 工具服务，测量 MCPClient.stream_query 的端到端表现。
+
+场景：
+    direct         规划直接返回文本回答
+    single_tool    单个工具调用
+    chain          N 个节点的调用链（book_flight -> order_info 依赖 + 若干并行的 weather_search）
+    long_history   每个会话预先写入较长的对话历史
+    large_catalog  工具目录中追加大量合成工具
+输出每个场景的延迟和首个 token 耗时的百分位数、并发下的吞吐量，以及内存分配（tracemalloc 单独一轮统计）。
+运行方式（项目根目录）：
+    python -m benchmark.bench_agent_loop --iterations 50 --concurrency 8
+    python -m benchmark.bench_agent_loop --scenarios chain --chain-length 8 --tool-latency 0.1
+    python -m benchmark.bench_agent_loop --native-tools   # 原生工具调用模式
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+
+from benchmark.env import setup_environment
+
+# MCPClient 在导入时读取这些配置
+setup_environment()
+
+from agent_collections import ModelAdapter  # noqa: E402
+from benchmark.fakes import ScriptedChatModel, build_tool_server, default_responder, memory_session_factory  # noqa: E402
+from client.cli import MCPClient  # noqa: E402
+from client.metrics import QueryMetrics, percentile, record_usage  # noqa: E402
+
+SCENARIOS = ["direct", "single_tool", "chain", "long_history", "large_catalog"]
+QUERY = "帮我查一下明天武汉的天气，并预订从武汉到广州的航班"
+
+
+def chain_plan(length: int) -> list:
+    nodes = [
+        {"type": "tool", "name": "book_flight",
+         "input": {"departure_city": "武汉", "destination_city": "广州", "date": "2025-05-06"}},
+        {"type": "tool", "name": "order_info", "input": {"order": "book_flight.result"}},
+    ]
+    cities = ["武汉", "广州", "北京", "上海", "深圳", "成都", "杭州", "南京"]
+    for index in range(max(0, length - len(nodes))):
+        nodes.append({"type": "tool", "name": "weather_search",
+                      "input": {"city": cities[index % len(cities)], "date": "2025-05-06"}})
+    return nodes[:max(1, length)]
+
+
+def scenario_plan(name: str, args):
+    if name == "direct":
+        return {"type": "text", "text": "你好，有什么可以帮你？"}
+    if name == "chain":
+        return chain_plan(args.chain_length)
+    return {"type": "tool", "name": "weather_search", "input": {"city": "武汉", "date": "2025-05-06"}}
+
+
+def make_responder(plan):
+    plan_text = json.dumps(plan, ensure_ascii=False)
+
+    def responder(kind: str, content: str) -> str:
+        if kind == "plan":
+            return plan_text
+        if kind == "param":
+            # 依赖节点的参数从前序工具结果中取订单号
+            return json.dumps({"order": "1122334455667788"})
+        return default_responder(kind, content)
+
+    return responder
+
+
+async def build_client(name: str, args) -> MCPClient:
+    model = ScriptedChatModel(responder=make_responder(scenario_plan(name, args)),
+                              first_token_latency=args.first_token_latency, prefill_tps=args.prefill_tps,
+                              tokens_per_second=args.tokens_per_second)
+    adapter = ModelAdapter(model_name="scripted-fake", model_type="fake", api_key="", base_url="",
+                           usage_callback=record_usage, client=model, native_tools=args.native_tools)
+    client = MCPClient(model_adapter=adapter)
+    extra_tools = args.catalog_size if name == "large_catalog" else 0
+    tools = build_tool_server(latency=args.tool_latency, extra_tools=extra_tools)
+    # FastMCP 创建时会把根日志配置为 INFO，每次工具调用都会输出一行
+    logging.getLogger().setLevel(logging.WARNING)
+    with contextlib.redirect_stdout(io.StringIO()):
+        await client.connect_to_sessions({"bench": memory_session_factory(tools)})
+    return client
+
+
+def seed_history(client: MCPClient, session_id: str, turns: int):
+    memory = client.memory_store.get(session_id)
+    for index in range(turns):
+        memory.add_user_message(f"第 {index} 轮：帮我查询武汉到广州的航班和天气情况，顺便看看订单状态。")
+        memory.add_ai_message(f"第 {index} 轮：已为你查询到航班信息，武汉天气晴，订单已出票。")
+
+
+async def run_queries(client: MCPClient, name: str, count: int, concurrency: int, args, prefix: str):
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(index: int):
+        session_id = f"{prefix}-{index}"
+        if name == "long_history":
+            seed_history(client, session_id, args.history_turns)
+        async with semaphore:
+            # 从获得执行名额开始计时，排队时间体现在吞吐量中
+            metrics = QueryMetrics()
+            async for _ in client.stream_query(QUERY, session_id, metrics):
+                pass
+        results.append(metrics)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one(index) for index in range(count)))
+    return results, time.perf_counter() - started
+
+
+async def run_scenario(name: str, args) -> dict:
+    client = await build_client(name, args)
+    try:
+        await run_queries(client, name, args.warmup, 1, args, "warmup")
+        results, wall = await run_queries(client, name, args.iterations, args.concurrency, args, "run")
+        # 内存分配单独统计一轮，避免 tracemalloc 的开销影响耗时结果
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        await run_queries(client, name, args.alloc_iterations, args.concurrency, args, "alloc")
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        await client.cleanup()
+    latencies = [metrics.latency for metrics in results]
+    ttfts = [metrics.ttft for metrics in results if metrics.ttft is not None]
+    return {
+        "scenario": name,
+        "iterations": len(results),
+        "concurrency": args.concurrency,
+        "latency": {"min": min(latencies), "mean": statistics.mean(latencies),
+                    "p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+                    "p99": percentile(latencies, 99)},
+        "ttft_p50": percentile(ttfts, 50),
+        "ttft_p99": percentile(ttfts, 99),
+        "throughput": len(results) / wall if wall else None,
+        "alloc_peak_kb": (peak - before) / 1024,
+        "alloc_retained_kb_per_query": (current - before) / 1024 / max(1, args.alloc_iterations),
+        "tokens_per_query": {key: sum(metrics.tokens[key] for metrics in results) / len(results)
+                             for key in ("input_tokens", "output_tokens")},
+    }
+
+
+def render(rows: list) -> str:
+    header = (f"{'scenario':<14} {'n':>4} {'min_ms':>8} {'mean_ms':>8} {'p50_ms':>8} {'p90_ms':>8} {'p99_ms':>8} "
+              f"{'ttft50_ms':>9} {'qps':>7} {'peak_kb':>8} {'kept_kb/q':>9} {'in_tok':>7}")
+    lines = [header]
+    for row in rows:
+        latency = row["latency"]
+        lines.append(
+            f"{row['scenario']:<14} {row['iterations']:>4} {latency['min'] * 1000:>8.1f} "
+            f"{latency['mean'] * 1000:>8.1f} {latency['p50'] * 1000:>8.1f} {latency['p90'] * 1000:>8.1f} "
+            f"{latency['p99'] * 1000:>8.1f} {(row['ttft_p50'] or 0) * 1000:>9.1f} {row['throughput']:>7.2f} "
+            f"{row['alloc_peak_kb']:>8.1f} {row['alloc_retained_kb_per_query']:>9.2f} "
+            f"{row['tokens_per_query']['input_tokens']:>7.0f}")
+    return "\n".join(lines)
+
+
+async def main(args):
+    rows = []
+    for name in args.scenarios:
+        rows.append(await run_scenario(name, args))
+    print(render(rows))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--alloc-iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chain-length", type=int, default=4)
+    parser.add_argument("--history-turns", type=int, default=50)
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="模拟工具调用耗时（秒）")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="模拟模型首包延迟（秒）")
+    parser.add_argument("--prefill-tps", type=float, default=20000, help="模拟模型每秒处理的提示词 token 数")
+    parser.add_argument("--tokens-per-second", type=float, default=500, help="模拟模型每秒输出的 token 数")
+    parser.add_argument("--native-tools", action="store_true", help="使用原生工具调用代替提示词中的工具列表")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,139 @@
+"""
+推测执行检查：开启 STREAM_PLAN_EXECUTION 时，规划生成过程中已经开始执行的节点，在规划被修复或重新生成后不会重复执行。
+
+每个场景用模拟模型给出预设的规划输出，统计每个 (工具, 参数) 实际调用的次数，并检查最终回答使用的是最终规划的结果：
+    repair_same     流式输出的调用链包含不存在的工具，修复后的调用链与已执行的节点相同：每个节点只执行一次
+    repair_changed  修复后的调用链参数不同：按新参数执行一次，回答中只使用新参数的结果
+    native_fallback 原生工具调用中包含不存在的工具，退回提示词模板重新规划并修复：每个节点只执行一次
+    native_invalid  每次规划都包含不存在的工具，最终返回兜底的文本回答：推测执行的节点最多执行一次
+检查不通过时以非 0 状态码退出。
+运行方式（项目根目录）：
+    python -m benchmark.chain_dispatch_check
+"""
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import sys
+from collections import Counter
+
+from benchmark.env import setup_environment
+
+# MCPClient 在导入时读取这些配置
+setup_environment(STREAM_PLAN_EXECUTION="true")
+
+from agent_collections import ModelAdapter  # noqa: E402
+from benchmark.fakes import ScriptedChatModel, build_tool_server, default_responder, memory_session_factory  # noqa: E402
+from client.cli import MCPClient  # noqa: E402
+from client.tool_cache import canonical_arguments  # noqa: E402
+
+QUERY = "帮我订明天武汉到广州的机票，然后查一下订单状态"
+
+
+def flight(destination: str) -> dict:
+    return {"type": "tool", "name": "book_flight",
+            "input": {"departure_city": "武汉", "destination_city": destination, "date": "2025-05-06"}}
+
+
+ORDER = {"type": "tool", "name": "order_info", "input": {"order": "book_flight.result"}}
+UNKNOWN = {"type": "tool", "name": "no_such_tool", "input": {"keyword": "test"}}
+
+
+class Scenario:
+
+    def __init__(self, name: str, outputs: list, expected_calls: dict, answer_contains: str = "",
+                 answer_excludes: str = "", native_tools: bool = False):
+        self.name = name
+        # 依次作为规划（以及修复）调用的输出
+        self.outputs = outputs
+        # (工具名称, 参数中包含的文字) -> 允许的调用次数范围 (最少, 最多)
+        self.expected_calls = expected_calls
+        self.answer_contains = answer_contains
+        self.answer_excludes = answer_excludes
+        self.native_tools = native_tools
+
+
+SCENARIOS = [
+    Scenario("repair_same", [[flight("广州"), ORDER, UNKNOWN], [flight("广州"), ORDER]],
+             {("book_flight", "广州"): (1, 1), ("order_info", ""): (1, 1)}, answer_contains="广州"),
+    # 旧参数的节点可能在修复前已经开始执行（推测执行无法撤回），但回答只能使用新参数的结果
+    Scenario("repair_changed", [[flight("广州"), ORDER, UNKNOWN], [flight("北京"), ORDER]],
+             {("book_flight", "北京"): (1, 1), ("book_flight", "广州"): (0, 1)},
+             answer_contains="飞往 北京", answer_excludes="飞往 广州"),
+    # 原生调用、提示词模板和修复三次规划都交出 book_flight
+    Scenario("native_fallback", [[flight("广州"), UNKNOWN], [flight("广州"), UNKNOWN], [flight("广州")]],
+             {("book_flight", "广州"): (1, 1)}, answer_contains="广州", native_tools=True),
+    Scenario("native_invalid", [[flight("广州"), UNKNOWN]], {("book_flight", "广州"): (0, 1)}, native_tools=True),
+]
+
+
+def make_responder(scenario: Scenario, answers: list):
+    outputs = [json.dumps(output, ensure_ascii=False) for output in scenario.outputs]
+    state = {"plan_calls": 0}
+
+    def responder(kind: str, content: str) -> str:
+        if kind == "plan":
+            index = min(state["plan_calls"], len(outputs) - 1)
+            state["plan_calls"] += 1
+            return outputs[index]
+        if kind == "param":
+            return json.dumps({"order": "1122334455667788"})
+        if kind == "answer":
+            answers.append(content)
+        return default_responder(kind, content)
+
+    return responder
+
+
+async def run_scenario(scenario: Scenario) -> list:
+    answers = []
+    model = ScriptedChatModel(responder=make_responder(scenario, answers), first_token_latency=0.01,
+                              prefill_tps=0, tokens_per_second=2000)
+    adapter = ModelAdapter(model_name="scripted-fake", model_type="fake", api_key="", base_url="", client=model,
+                           native_tools=scenario.native_tools)
+    client = MCPClient(model_adapter=adapter)
+    calls = Counter()
+    call_session_tool = client._call_session_tool
+
+    async def counting_call(tool_name: str, tool_params: dict) -> str:
+        calls[(tool_name, canonical_arguments(tool_params))] += 1
+        return await call_session_tool(tool_name, tool_params)
+
+    client._call_session_tool = counting_call
+    tools = build_tool_server(latency=0.02)
+    # FastMCP 创建时会把根日志配置为 INFO
+    logging.getLogger().setLevel(logging.ERROR)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await client.connect_to_sessions({"check": memory_session_factory(tools)})
+            await client.process_query(QUERY)
+    finally:
+        await client.cleanup()
+
+    failures = []
+    for (tool_name, marker), (low, high) in scenario.expected_calls.items():
+        count = sum(value for (name, params), value in calls.items() if name == tool_name and marker in params)
+        if not low <= count <= high:
+            failures.append(f"{tool_name}[{marker}] 调用 {count} 次，期望 {low}~{high} 次")
+    answer = answers[-1] if answers else ""
+    if scenario.answer_contains and scenario.answer_contains not in answer:
+        failures.append(f"回答输入中没有 {scenario.answer_contains!r}")
+    if scenario.answer_excludes and scenario.answer_excludes in answer:
+        failures.append(f"回答输入中包含旧规划的结果 {scenario.answer_excludes!r}")
+    print(f"{scenario.name:<16} {'ok' if not failures else 'FAIL':<5} "
+          f"{[f'{name} {json.loads(params)} x{count}' for (name, params), count in sorted(calls.items())]}")
+    for failure in failures:
+        print(f"    {failure}")
+    return failures
+
+
+async def main() -> int:
+    failed = 0
+    for scenario in SCENARIOS:
+        failed += bool(await run_scenario(scenario))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
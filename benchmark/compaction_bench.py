@@ -0,0 +1,79 @@
+"""
+工具结果压缩基准：对比调用链中参数生成和最终回答提示词的 token 数（压缩前 / 压缩后）。
+
+调用链由 N 个搜索节点组成，每个节点返回 --results 条模拟搜索结果（格式与 server/search_backend.format_results 一致），
+最坏情况下每个节点的参数都依赖全部前序节点（必填参数缺失时 find_dependencies 的行为），
+不压缩时参数生成提示词的总 token 数随链长平方增长，压缩后每次参数生成的调用链历史不超过预算，随链长线性增长。提示词使用 ModelAdapter 中的模板渲染，token 数由 client.tokens.count_tokens 统计。
+运行方式（项目根目录）：
+    python -m benchmark.compaction_bench --lengths 2 4 8 16 --param-budget 1000 --answer-budget 4000
+"""
+import argparse
+import json
+import random
+
+from agent_collections import ModelAdapter, ToolResultItem, UserQuery
+from benchmark.fakes import ScriptedChatModel
+from client.result_compactor import ResultCompactor, ResultStore
+from client.tokens import count_tokens
+from server.search_backend import format_results
+
+SEARCH_TOOL = {
+    "name": "google_search_info",
+    "description": "Perform a Google search and return formatted results.",
+    "input_schema": {"type": "object", "properties": {"query": {"title": "Query", "type": "string"}},
+                     "required": ["query"]},
+}
+WORDS = ["小米", "SU7", "续航", "价格", "评测", "智能驾驶", "电池", "充电", "销量", "内饰", "配置", "对比", "车主", "口碑"]
+
+
+def search_output(rng: random.Random, count: int) -> str:
+    results = []
+    for index in range(count):
+        snippet = "，".join(rng.choice(WORDS) for _ in range(60))
+        results.append({"title": f"{rng.choice(WORDS)}{rng.choice(WORDS)} 第{index + 1}篇",
+                        "link": f"https://example.com/{rng.getrandbits(48):x}", "snippet": snippet})
+    return format_results(results)
+
+
+def prompt_tokens(messages) -> int:
+    return sum(count_tokens(str(message.content)) for message in messages.to_messages())
+
+
+def measure(adapter: ModelAdapter, compactor: ResultCompactor, outputs: list) -> dict:
+    results = [ToolResultItem(name=SEARCH_TOOL["name"], result=output) for output in outputs]
+    param_tokens = 0
+    for index in range(1, len(results)):
+        chain_history = compactor.for_params(results[:index], SEARCH_TOOL)
+        payload = {"user_input": "小米su7怎么样？", "chain_history": chain_history, "current_node_info": SEARCH_TOOL}
+        param_tokens += prompt_tokens(adapter.param_template.invoke({
+            "user_input": json.dumps(payload, ensure_ascii=False), "history": []}))
+    generate_info = UserQuery(user_input="小米su7怎么样？", tool_chain=[item.name for item in results],
+                              tool_result=compactor.for_answer(results))
+    answer_tokens = prompt_tokens(adapter.context_template.invoke({
+        "user_input": json.dumps(generate_info.model_dump(), ensure_ascii=False), "history": []}))
+    return {"param": param_tokens, "answer": answer_tokens, "total": param_tokens + answer_tokens}
+
+
+def run(args):
+    adapter = ModelAdapter(model_name="scripted-fake", model_type="fake", api_key="", base_url="",
+                           client=ScriptedChatModel())
+    rng = random.Random(args.seed)
+    print(f"{'length':>6} {'param_raw':>10} {'param_cmp':>10} {'answer_raw':>11} {'answer_cmp':>11} "
+          f"{'total_raw':>10} {'total_cmp':>10} {'saved':>7}")
+    for length in args.lengths:
+        outputs = [search_output(rng, args.results) for _ in range(length)]
+        raw = measure(adapter, ResultCompactor(ResultStore()), outputs)
+        compacted = measure(adapter, ResultCompactor(ResultStore(), args.param_budget, args.answer_budget), outputs)
+        saved = 1 - compacted["total"] / raw["total"] if raw["total"] else 0
+        print(f"{length:>6} {raw['param']:>10} {compacted['param']:>10} {raw['answer']:>11} "
+              f"{compacted['answer']:>11} {raw['total']:>10} {compacted['total']:>10} {saved:>6.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", nargs="+", type=int, default=[2, 4, 8, 16])
+    parser.add_argument("--results", type=int, default=5, help="每个搜索节点返回的结果条数")
+    parser.add_argument("--param-budget", type=int, default=1000, help="每次参数生成的调用链历史 token 预算")
+    parser.add_argument("--answer-budget", type=int, default=4000, help="最终回答中全部工具结果的 token 预算")
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
@@ -0,0 +1,23 @@
+"""
+基准测试和 tests 共用的运行配置：client.cli 在导入时读取模型和工具服务的配置，
+需要在导入项目模块之前调用 setup_environment()，不需要真实的模型服务和工具服务。
+"""
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模拟模型和进程内工具服务的默认配置，已经设置的环境变量优先
+FAKE_ENVIRONMENT = {
+    "MODEL_API_KEY": "bench",
+    "MODEL_BASE_URL": "http://127.0.0.1",
+    "MODEL_NAME": "scripted-fake",
+    "MODEL_TYPE": "openai",
+    "MCP_TOOL_PATH": "",
+}
+
+
+def setup_environment(**overrides: str):
+    """补齐默认配置，overrides 中的配置强制覆盖"""
+    for key, value in FAKE_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(overrides)
@@ -0,0 +1,182 @@
+"""
+基准测试使用的模拟组件：不访问真实模型和外部进程，结果可重复。
+
+- ScriptedChatModel：按提示词类型（规划 / 参数生成 / 摘要 / 回答 / 直接回答）返回预设文本，模拟首包延迟、预填充速度和输出速度，
+  可以通过 ModelAdapter(client=...) 接入；绑定工具（bind_tools / with_structured_output）后把预设的 JSON 规划和参数
+  以原生工具调用的形式流式返回；
+- build_tool_server：与 server/search_tool.py 风格一致的 FastMCP 工具服务，每次调用固定延迟，可追加任意数量的合成工具；
+- memory_session_factory：进程内的内存会话，交给 ServerPool.connect_sessions / MCPClient.connect_to_sessions 使用，
+  同样适用于 server/echo_server.py 等已有的 FastMCP 服务。
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from client.tokens import count_tokens
+from template import (direct_prompt, generate_prompt, generate_param_prompt, native_param_prompt, native_prompt,
+                      summary_prompt)
+
+# 响应函数：(提示词类型, 最后一条消息的内容) -> 模型输出文本
+Responder = Callable[[str, str], str]
+
+
+def prompt_kind(messages) -> str:
+    """根据 system 提示词判断本次调用属于哪个阶段"""
+    system = messages[0].content if messages and messages[0].type == "system" else ""
+    if "可用的工具列表如下" in system:
+        return "plan"
+    # 模板中的 {{ }} 在渲染后会变成 { }，所以只比较开头的一段
+    for kind, template in (("plan", native_prompt), ("param", generate_param_prompt), ("param", native_param_prompt),
+                           ("summary", summary_prompt), ("answer", generate_prompt), ("direct", direct_prompt)):
+        if system.strip().startswith(template.strip()[:80]):
+            return kind
+    return "other"
+
+
+def default_responder(kind: str, content: str) -> str:
+    if kind == "plan":
+        return json.dumps({"type": "text", "text": "你好，有什么可以帮你？"}, ensure_ascii=False)
+    if kind == "param":
+        # 给当前节点的所有必填参数填上占位值
+        node_info = json.loads(content).get("current_node_info") or {}
+        required = node_info.get("input_schema", {}).get("required", [])
+        return json.dumps({name: "test" for name in required}, ensure_ascii=False)
+    if kind == "summary":
+        return "用户此前询问了天气和航班信息。"
+    if kind == "direct":
+        return "你好，有什么可以帮你？"
+    return "根据查询结果，明天武汉天气晴，适合出行，已为你预订好航班。"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    脚本化的聊天模型。
+    耗时 = first_token_latency + 输入 token 数 / prefill_tps（首包）+ 输出 token 数 / tokens_per_second，
+    每个流式块视为 1 个 token，包含 chunk_size 个字符。
+    """
+
+    responder: Responder = default_responder
+    first_token_latency: float = 0.05
+    prefill_tps: float = 0.0
+    tokens_per_second: float = 200.0
+    chunk_size: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _respond(self, messages) -> str:
+        return self.responder(prompt_kind(messages), str(messages[-1].content) if messages else "")
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # 非流式调用（例如 with_structured_output）同样模拟延迟
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+    def _chunks(self, messages, tools: Optional[List[dict]]) -> List[AIMessageChunk]:
+        """把预设输出切成流式块；绑定了工具时，JSON 规划和参数以工具调用的形式返回"""
+        text = self._respond(messages)
+        calls = native_calls(text, prompt_kind(messages), tools) if tools else []
+        if not calls:
+            return [AIMessageChunk(content=text[index:index + self.chunk_size])
+                    for index in range(0, len(text), self.chunk_size)] or [AIMessageChunk(content="")]
+        chunks = []
+        for call_index, (name, args) in enumerate(calls):
+            for index in range(0, max(1, len(args)), self.chunk_size):
+                chunks.append(AIMessageChunk(content="", tool_call_chunks=[{
+                    "name": name if index == 0 else None, "args": args[index:index + self.chunk_size],
+                    "id": f"call_{call_index}" if index == 0 else None, "index": call_index}]))
+        return chunks
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tools = kwargs.get("tools")
+        chunks = self._chunks(messages, tools)
+        input_tokens = sum(count_tokens(str(message.content)) for message in messages)
+        if tools:
+            # 模型服务端同样要处理工具定义，计入输入 token
+            input_tokens += count_tokens(json.dumps(tools, ensure_ascii=False, separators=(",", ":")))
+        first_token_delay = self.first_token_latency
+        if self.prefill_tps > 0:
+            first_token_delay += input_tokens / self.prefill_tps
+        await asyncio.sleep(first_token_delay)
+        for index, chunk in enumerate(chunks):
+            if index and self.tokens_per_second > 0:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            if index == len(chunks) - 1:
+                chunk.usage_metadata = {"input_tokens": input_tokens, "output_tokens": len(chunks),
+                                        "total_tokens": input_tokens + len(chunks)}
+            yield ChatGenerationChunk(message=chunk)
+
+
+def native_calls(text: str, kind: str, tools: List[dict]) -> List[tuple]:
+    """预设输出对应的原生工具调用：[(工具名称, 参数 JSON)]，文本回答返回空列表"""
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        return []
+    if kind == "param":
+        # with_structured_output 只绑定一个工具，参数即为结构化输出
+        return [(tools[0]["function"]["name"], text)]
+    nodes = value if isinstance(value, list) else [value]
+    return [(node["name"], json.dumps(node.get("input", {}), ensure_ascii=False))
+            for node in nodes if isinstance(node, dict) and node.get("type") == "tool"]
+
+
+def build_tool_server(latency: float = 0.05, extra_tools: int = 0) -> FastMCP:
+    """航班 / 天气 / 订单工具，加上 extra_tools 个合成工具，每次调用等待 latency 秒"""
+    mcp = FastMCP("BenchTools")
+
+    @mcp.tool()
+    async def book_flight(departure_city: str, destination_city: str, date: str) -> str:
+        """Book a flight ticket based on departure city, destination, and date."""
+        await asyncio.sleep(latency)
+        return f"已为您预订 {date} 从 {departure_city} 飞往 {destination_city} 的航班，订单号：1122334455667788"
+
+    @mcp.tool()
+    async def weather_search(city: str, date: str) -> str:
+        """Retrieve the weather forecast for a given city and date."""
+        await asyncio.sleep(latency)
+        return f"{city} {date} 天气晴，气温 18~26℃"
+
+    @mcp.tool()
+    async def order_info(order: str) -> str:
+        """Retrieve the current status of a flight using the order number."""
+        await asyncio.sleep(latency)
+        return f"订单 {order} 状态：已出票"
+
+    for index in range(extra_tools):
+        mcp.add_tool(_synthetic_tool(index, latency), name=f"synthetic_tool_{index}",
+                     description=f"Synthetic tool #{index}: look up record {index} by keyword.")
+    return mcp
+
+
+def _synthetic_tool(index: int, latency: float):
+    async def tool(keyword: str) -> str:
+        await asyncio.sleep(latency)
+        return f"synthetic_tool_{index}: {keyword}"
+
+    return tool
+
+
+def memory_session_factory(mcp: FastMCP):
+    """与 FastMCP 服务在同一进程内通过内存流通信，省去子进程启动和 stdio 序列化开销"""
+    @asynccontextmanager
+    async def open_session(message_handler: Optional[Callable] = None):
+        async with create_connected_server_and_client_session(mcp._mcp_server,
+                                                              message_handler=message_handler) as session:
+            yield session
+
+    return open_session
@@ -0,0 +1,199 @@
+"""
+查询路由基准：在模拟工具目录（book_flight / weather_search / order_info）上评估 QueryRouter。
+
+1. 准确率：一组带标注的问题（direct / single_tool / chain / plan），输出混淆矩阵、准确率、路由耗时，
+   以及需要工具却被判断为 direct 的问题数（代价最高的误判，回答中不会有工具结果）；
+2. 端到端收益：同一组问题分别在以下模式下通过 MCPClient.stream_query 执行，对比各类问题的平均延迟、首个 token 耗时和输入 token 数：
+    off         不使用路由，每个问题都带完整工具列表规划
+    router      使用路由：闲聊直接回答，单工具问题只带候选工具规划
+    templates   路由 + weather_search 的回答模板，单工具天气问题跳过回答生成
+模拟模型按问题返回标注的规划，延迟由首包延迟、预填充速度和输出速度决定。
+运行方式（项目根目录）：
+    python -m benchmark.router_bench --repeat 3
+    python -m benchmark.router_bench --catalog-size 100   # 追加合成工具，完整工具列表更长
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import statistics
+import time
+from collections import Counter, defaultdict
+
+from benchmark.env import setup_environment
+
+# MCPClient 在导入时读取这些配置
+setup_environment()
+
+from agent_collections import ModelAdapter  # noqa: E402
+from benchmark.fakes import ScriptedChatModel, build_tool_server, default_responder, memory_session_factory  # noqa: E402
+from client.cli import MCPClient  # noqa: E402
+from client.metrics import QueryMetrics, record_usage  # noqa: E402
+from client.query_router import ROUTES, QueryRouter  # noqa: E402
+
+MODES = ["off", "router", "templates"]
+KEYWORDS = {
+    "weather_search": ["天气", "气温", "下雨", "下雪", "weather", "forecast"],
+    "book_flight": ["机票", "订票", "订航班", "预订航班", "飞往", "book a flight"],
+    "order_info": ["订单", "出票", "order"],
+}
+TEMPLATES = {"weather_search": "{result}"}
+
+WEATHER = {"type": "tool", "name": "weather_search", "input": {"city": "武汉", "date": "2025-05-06"}}
+FLIGHT = {"type": "tool", "name": "book_flight",
+          "input": {"departure_city": "武汉", "destination_city": "广州", "date": "2025-05-06"}}
+ORDER = {"type": "tool", "name": "order_info", "input": {"order": "1122334455667788"}}
+ORDER_AFTER_FLIGHT = {"type": "tool", "name": "order_info", "input": {"order": "book_flight.result"}}
+GREETING = {"type": "text", "text": "你好，有什么可以帮你？"}
+CLARIFY = {"type": "text", "text": "请问你想查询哪方面的信息？"}
+
+# (问题, 标注的路由, 模拟模型给出的规划)
+LABELED_QUERIES = [
+    ("你好啊", "direct", GREETING),
+    ("您好", "direct", GREETING),
+    ("谢谢！", "direct", GREETING),
+    ("再见", "direct", GREETING),
+    ("你是谁", "direct", GREETING),
+    ("hello", "direct", GREETING),
+    ("早上好呀", "direct", GREETING),
+    ("thanks a lot", "direct", GREETING),
+    ("谢谢，再见", "direct", GREETING),
+    ("明天武汉天气怎么样", "single_tool", WEATHER),
+    ("武汉明天会下雨吗", "single_tool", WEATHER),
+    ("查一下广州后天的气温", "single_tool", WEATHER),
+    ("What is the weather forecast in Wuhan tomorrow", "single_tool", WEATHER),
+    ("帮我订一张明天武汉飞往广州的机票", "single_tool", FLIGHT),
+    ("预订航班：武汉到广州，5月6日", "single_tool", FLIGHT),
+    ("我的订单 1122334455667788 出票了吗", "single_tool", ORDER),
+    ("查询订单 1122334455667788 的状态", "single_tool", ORDER),
+    ("你好，明天北京天气如何", "single_tool", WEATHER),
+    ("明天出门要带伞吗", "single_tool", WEATHER),
+    ("我想知道 1122334455667788 这单的进度", "single_tool", ORDER),
+    ("帮我订明天武汉到广州的机票，然后查一下订单状态", "chain", [FLIGHT, ORDER_AFTER_FLIGHT]),
+    ("查一下明天武汉的天气，并且订一张飞往广州的机票", "chain", [WEATHER, FLIGHT]),
+    ("订一张去广州的机票，顺便看看广州的天气", "chain", [FLIGHT, WEATHER]),
+    ("查询武汉和广州明天的天气，然后帮我订票", "chain", [WEATHER, FLIGHT]),
+    ("Book a flight to Guangzhou and then check the order", "chain", [FLIGHT, ORDER_AFTER_FLIGHT]),
+    ("武汉到广州的航班订好以后告诉我那边的天气", "chain", [FLIGHT, WEATHER]),
+    ("帮我安排一下下周的出差", "plan", CLARIFY),
+    # 以问候或致谢开头、但后面还有实际问题的，不能直接回答
+    ("你好，小米su7怎么样？", "plan", CLARIFY),
+    ("嗨 帮我看看航班", "plan", CLARIFY),
+    ("谢谢，再帮我搜一下特斯拉", "plan", CLARIFY),
+    ("你好，帮我看看有什么适合周末去的地方", "plan", CLARIFY),
+    ("最近有什么新闻", "plan", CLARIFY),
+]
+
+
+def make_responder():
+    # 较长的问题先匹配，避免 "你好" 匹配到 "你好，帮我..."
+    plans = sorted(((query, json.dumps(plan, ensure_ascii=False)) for query, _, plan in LABELED_QUERIES),
+                   key=lambda item: -len(item[0]))
+
+    def responder(kind: str, content: str) -> str:
+        if kind == "plan":
+            # 规划提示词的最后一条消息包含原始问题
+            for query, plan_text in plans:
+                if query in content:
+                    return plan_text
+            return json.dumps(GREETING, ensure_ascii=False)
+        if kind == "param":
+            return json.dumps({"order": "1122334455667788"})
+        return default_responder(kind, content)
+
+    return responder
+
+
+async def build_client(mode: str, args) -> MCPClient:
+    model = ScriptedChatModel(responder=make_responder(), first_token_latency=args.first_token_latency,
+                              prefill_tps=args.prefill_tps, tokens_per_second=args.tokens_per_second)
+    adapter = ModelAdapter(model_name="scripted-fake", model_type="fake", api_key="", base_url="",
+                           usage_callback=record_usage, client=model)
+    client = MCPClient(model_adapter=adapter)
+    # 路由和回答模板按模式配置，不依赖环境变量
+    client.router = QueryRouter(keywords=KEYWORDS, min_score=args.min_score) if mode != "off" else None
+    client.result_templates = TEMPLATES if mode == "templates" else {}
+    tools = build_tool_server(latency=args.tool_latency, extra_tools=args.catalog_size)
+    logging.getLogger().setLevel(logging.WARNING)
+    with contextlib.redirect_stdout(io.StringIO()):
+        await client.connect_to_sessions({"bench": memory_session_factory(tools)})
+    return client
+
+
+async def evaluate_accuracy(args):
+    client = await build_client("router", args)
+    try:
+        client.router.load(client.tool_registry.tools, client.tool_registry.version)
+        confusion = defaultdict(Counter)
+        durations = []
+        unsafe = []
+        for query, label, _ in LABELED_QUERIES:
+            started = time.perf_counter()
+            decision = client.router.route(query)
+            durations.append(time.perf_counter() - started)
+            confusion[label][decision.route] += 1
+            if decision.route == "direct" and label != "direct":
+                unsafe.append(query)
+            if decision.route != label:
+                print(f"  误判 {label:>11} -> {decision.route:<11} {query}  {decision.tools}")
+    finally:
+        await client.cleanup()
+    correct = sum(confusion[route][route] for route in ROUTES)
+    print(f"\n{'label/pred':<12}" + "".join(f"{route:>12}" for route in ROUTES))
+    for label in ROUTES:
+        print(f"{label:<12}" + "".join(f"{confusion[label][route]:>12}" for route in ROUTES))
+    print(f"\n准确率 {correct}/{len(LABELED_QUERIES)} = {correct / len(LABELED_QUERIES):.1%}，"
+          f"需要工具却直接回答 {len(unsafe)} 条，单次路由耗时 p50 {statistics.median(durations) * 1e6:.0f}µs")
+
+
+async def run_mode(mode: str, args) -> dict:
+    client = await build_client(mode, args)
+    results = defaultdict(list)
+    try:
+        for repeat in range(args.repeat):
+            for index, (query, label, _) in enumerate(LABELED_QUERIES):
+                metrics = QueryMetrics()
+                async for _ in client.stream_query(query, f"{mode}-{repeat}-{index}", metrics):
+                    pass
+                results[label].append(metrics)
+    finally:
+        await client.cleanup()
+    return results
+
+
+def summarize(results: list) -> tuple:
+    return (statistics.mean(metrics.latency for metrics in results),
+            statistics.mean(metrics.ttft or 0 for metrics in results),
+            statistics.mean(metrics.tokens["input_tokens"] for metrics in results))
+
+
+async def main(args):
+    print("路由准确率：")
+    await evaluate_accuracy(args)
+    print(f"\n端到端（每类问题的平均值，重复 {args.repeat} 轮）：")
+    print(f"{'mode':<10} {'label':<12} {'n':>4} {'latency_ms':>11} {'ttft_ms':>9} {'in_tok':>8}")
+    for mode in args.modes:
+        results = await run_mode(mode, args)
+        for label in ROUTES + ["all"]:
+            items = [metrics for items in results.values() for metrics in items] if label == "all" \
+                else results.get(label, [])
+            if not items:
+                continue
+            latency, ttft, input_tokens = summarize(items)
+            print(f"{mode:<10} {label:<12} {len(items):>4} {latency * 1000:>11.1f} {ttft * 1000:>9.1f} "
+                  f"{input_tokens:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--catalog-size", type=int, default=0, help="追加的合成工具数")
+    parser.add_argument("--min-score", type=float, default=0.2, help="TF-IDF 相似度阈值")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="模拟工具调用耗时（秒）")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="模拟模型首包延迟（秒）")
+    parser.add_argument("--prefill-tps", type=float, default=20000, help="模拟模型每秒处理的提示词 token 数")
+    parser.add_argument("--tokens-per-second", type=float, default=500, help="模拟模型每秒输出的 token 数")
+    asyncio.run(main(parser.parse_args()))
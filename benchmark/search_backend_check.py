@@ -0,0 +1,185 @@
+"""
+搜索后端检查：用 httpx.MockTransport 模拟 Google / Bing 接口（可配置延迟和错误），不访问外部网络。
+
+    concurrent  同一提供方并发发起 N 次搜索：请求在共享的连接池上重叠执行，总耗时接近单次延迟而不是 N 倍，
+                同时在途的请求数不超过提供方的并发上限
+    hedged      对冲模式同时请求两个提供方：返回较快的结果，较慢的请求被取消
+    fallback    较快的提供方返回 500 / 非 JSON 响应：对冲模式使用另一个提供方的结果；单独请求时抛出 SearchError
+    all_failed  所有提供方都失败：对冲模式抛出 SearchError，错误信息包含每个提供方的原因
+检查不通过时以非 0 状态码退出。
+运行方式（项目根目录）：
+    python -m benchmark.search_backend_check --latency 0.1 --requests 8
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+from server.search_backend import BingSearchProvider, GoogleSearchProvider, SearchBackend, SearchError
+
+GOOGLE_URL = "https://google.test/customsearch/v1"
+BING_URL = "https://bing.test/v7.0/search"
+
+
+class MockProvider:
+    """一个提供方的模拟接口：延迟、响应方式，以及请求的统计"""
+
+    def __init__(self, latency: float, respond: Callable[[httpx.Request], httpx.Response]):
+        self.latency = latency
+        self.respond = respond
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.started += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        return self.respond(request)
+
+
+def google_ok(request: httpx.Request) -> httpx.Response:
+    query = request.url.params["q"]
+    return httpx.Response(200, json={"items": [{"title": f"google {query}", "link": "https://google.test/1",
+                                                "snippet": "google"}]})
+
+
+def bing_ok(request: httpx.Request) -> httpx.Response:
+    query = request.url.params["q"]
+    return httpx.Response(200, json={"webPages": {"value": [{"name": f"bing {query}", "url": "https://bing.test/1",
+                                                             "snippet": "bing"}]}})
+
+
+def server_error(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(500, text="internal error")
+
+
+def not_json(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, text="<html>rate limited</html>", headers={"content-type": "text/html"})
+
+
+def make_backend(mocks: Dict[str, MockProvider], max_concurrency: int = 8) -> SearchBackend:
+    backend = SearchBackend([GoogleSearchProvider("key", "cx", url=GOOGLE_URL, max_concurrency=max_concurrency),
+                             BingSearchProvider("key", url=BING_URL, max_concurrency=max_concurrency)])
+    hosts = {"google.test": mocks["google"], "bing.test": mocks["bing"]}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return await hosts[request.url.host].handle(request)
+
+    backend._client = httpx.AsyncClient(limits=backend.limits, transport=httpx.MockTransport(handler))
+    return backend
+
+
+async def check_concurrent(args) -> List[str]:
+    google = MockProvider(args.latency, google_ok)
+    max_concurrency = max(1, args.requests // 2)
+    backend = make_backend({"google": google, "bing": MockProvider(args.latency, bing_ok)}, max_concurrency)
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(backend.search("google", f"q{index}", 3) for index in range(args.requests)))
+    finally:
+        await backend.aclose()
+    elapsed = time.perf_counter() - started
+    # 并发上限为请求数的一半，理想情况下分两批完成
+    expected = args.latency * -(-args.requests // max_concurrency)
+    print(f"concurrent   {args.requests} 次搜索耗时 {elapsed * 1000:.0f}ms（串行约 {args.latency * args.requests * 1000:.0f}ms），"
+          f"最多同时在途 {google.max_in_flight}（上限 {max_concurrency}）")
+    failures = []
+    if [item[0]["title"] for item in results] != [f"google q{index}" for index in range(args.requests)]:
+        failures.append("结果与请求顺序不对应")
+    if google.max_in_flight < min(2, max_concurrency):
+        failures.append("请求没有重叠执行")
+    if google.max_in_flight > max_concurrency:
+        failures.append(f"同时在途 {google.max_in_flight} 超过并发上限 {max_concurrency}")
+    if elapsed > expected + args.latency:
+        failures.append(f"耗时 {elapsed * 1000:.0f}ms 超过预期 {expected * 1000:.0f}ms")
+    return failures
+
+
+async def check_hedged(args) -> List[str]:
+    google, bing = MockProvider(args.latency * 5, google_ok), MockProvider(args.latency, bing_ok)
+    backend = make_backend({"google": google, "bing": bing})
+    started = time.perf_counter()
+    try:
+        results = await backend.hedged_search("hedged", 3)
+        # 等取消传递到模拟接口
+        await asyncio.sleep(0)
+    finally:
+        await backend.aclose()
+    elapsed = time.perf_counter() - started
+    print(f"hedged       耗时 {elapsed * 1000:.0f}ms，结果来自 {results[0]['title']!r}，"
+          f"较慢的请求 发起 {google.started} / 完成 {google.completed} / 取消 {google.cancelled}")
+    failures = []
+    if results[0]["title"] != "bing hedged":
+        failures.append("没有返回较快提供方的结果")
+    if elapsed > args.latency * 3:
+        failures.append(f"耗时 {elapsed * 1000:.0f}ms，等待了较慢的提供方")
+    if google.started != 1 or google.completed != 0 or google.cancelled != 1:
+        failures.append("较慢的请求没有被取消")
+    return failures
+
+
+async def check_fallback(args) -> List[str]:
+    failures = []
+    for name, respond in (("500", server_error), ("非 JSON", not_json)):
+        bing = MockProvider(args.latency * 2, bing_ok)
+        backend = make_backend({"google": MockProvider(args.latency / 2, respond), "bing": bing})
+        try:
+            results = await backend.hedged_search("fallback", 3)
+            error = ""
+            try:
+                await backend.search("google", "fallback", 3)
+                failures.append(f"google 返回 {name} 时单独请求没有抛出 SearchError")
+            except SearchError as e:
+                error = str(e)
+            except Exception as e:
+                failures.append(f"google 返回 {name} 时单独请求抛出 {type(e).__name__}，而不是 SearchError")
+        finally:
+            await backend.aclose()
+        print(f"fallback     google 返回 {name}：对冲结果来自 {results[0]['title']!r}，单独请求的错误 {error!r}")
+        if results[0]["title"] != "bing fallback":
+            failures.append(f"google 返回 {name} 时没有使用 bing 的结果")
+    return failures
+
+
+async def check_all_failed(args) -> List[str]:
+    backend = make_backend({"google": MockProvider(args.latency, server_error),
+                            "bing": MockProvider(args.latency / 2, not_json)})
+    try:
+        await backend.hedged_search("failed", 3)
+        return ["所有提供方都失败时没有抛出 SearchError"]
+    except SearchError as e:
+        print(f"all_failed   {e}")
+        return [] if "google" in str(e) and "bing" in str(e) else ["错误信息没有包含每个提供方的原因"]
+    finally:
+        await backend.aclose()
+
+
+async def main(args) -> int:
+    failed = 0
+    for check in (check_concurrent, check_hedged, check_fallback, check_all_failed):
+        failures = await check(args)
+        for failure in failures:
+            print(f"    FAIL {failure}")
+        failed += bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="模拟接口的基础延迟（秒）")
+    parser.add_argument("--requests", type=int, default=8, help="并发检查中的搜索次数")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,98 @@
+"""
+服务端工具执行方式基准：同一个 FastMCP 服务中的阻塞型 / CPU 密集型工具，在并发调用下的吞吐量。
+
+    inline   同步函数直接注册为工具（FastMCP 默认行为，在事件循环中执行）
+    thread   ToolRunner.blocking，在线程池中执行
+    process  ToolRunner.cpu_bound，在预热好的进程池中执行
+客户端通过进程内的内存会话并发调用，统计 calls/s 和单次调用延迟的 p50 / p99。
+阻塞型工具用 time.sleep 模拟，CPU 密集型工具用纯 Python 的循环计算模拟；进程池的收益取决于机器的 CPU 核数。
+运行方式（项目根目录）：
+    python -m benchmark.server_runner_bench --calls 64 --concurrency 16 --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import time
+
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from client.metrics import percentile
+from server.tool_runner import ToolRunner
+
+MODES = ["inline", "thread", "process"]
+WORKLOADS = ["blocking", "cpu"]
+
+
+def blocking_work(seconds: float) -> str:
+    time.sleep(seconds)
+    return "done"
+
+
+def cpu_work(rounds: int) -> str:
+    digest = b""
+    for index in range(rounds):
+        digest = hashlib.sha256(digest + index.to_bytes(4, "little")).digest()
+    return digest.hex()
+
+
+def build_server(mode: str, workload: str, runner: ToolRunner) -> FastMCP:
+    mcp = FastMCP("RunnerBench")
+    fn = blocking_work if workload == "blocking" else cpu_work
+    if mode == "thread":
+        fn = runner.blocking(fn)
+    elif mode == "process":
+        fn = runner.cpu_bound(fn)
+    mcp.add_tool(fn, name="work")
+    return mcp
+
+
+async def run_case(mode: str, workload: str, args) -> dict:
+    runner = ToolRunner(thread_workers=args.workers, process_workers=args.workers)
+    mcp = build_server(mode, workload, runner)
+    logging.getLogger().setLevel(logging.WARNING)
+    runner.warm()
+    arguments = {"seconds": args.sleep} if workload == "blocking" else {"rounds": args.rounds}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    try:
+        async with create_connected_server_and_client_session(mcp._mcp_server) as session:
+            async def one():
+                async with semaphore:
+                    started = time.perf_counter()
+                    result = await session.call_tool("work", arguments)
+                    latencies.append(time.perf_counter() - started)
+                    if result.isError:
+                        raise RuntimeError(result.content[0].text)
+
+            await one()
+            latencies.clear()
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.calls)))
+            wall = time.perf_counter() - started
+    finally:
+        runner.shutdown()
+    return {"mode": mode, "workload": workload, "throughput": len(latencies) / wall,
+            "p50": percentile(latencies, 50), "p99": percentile(latencies, 99)}
+
+
+async def main(args):
+    print(f"{'workload':<9} {'mode':<8} {'calls/s':>9} {'p50_ms':>9} {'p99_ms':>9}")
+    for workload in args.workloads:
+        for mode in args.modes:
+            row = await run_case(mode, workload, args)
+            print(f"{workload:<9} {mode:<8} {row['throughput']:>9.1f} {row['p50'] * 1000:>9.1f} "
+                  f"{row['p99'] * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4, help="线程池 / 进程池的 worker 数")
+    parser.add_argument("--sleep", type=float, default=0.05, help="阻塞型工具每次调用的耗时（秒）")
+    parser.add_argument("--rounds", type=int, default=20000, help="CPU 密集型工具每次调用的计算轮数")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,134 @@
+"""
+共享缓存基准：多个进程同时读写同一个 SharedCache 文件（模拟网关的多个 worker）。
+
+1. 并发读写：每个进程按 --read-ratio 混合读写 --ops 次，key 在所有进程间共享，统计总吞吐量、
+   单次操作延迟的 p50 / p99、跨进程命中率（读到其他进程写入的条目）、等待锁超时按未命中处理的次数以及失败次数；
+2. 重启后命中：一个进程写入规划结果后退出，新进程用新的 PlanCache 查询同样的问题，统计命中率；
+3. 存储大小：ToolCallResult 和工具结果压缩前后的字节数，以及写满 --max-kb 后的实际大小（验证按大小淘汰）。
+运行方式（项目根目录）：
+    python -m benchmark.shared_cache_bench --processes 4 --ops 2000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from agent_collections import FakeToolContent, ToolCallResult
+from client.metrics import percentile
+from client.plan_cache import PlanCache
+from client.shared_cache import SharedCache, content_key, encode_value
+from client.tracing import registry
+
+QUERIES = [f"帮我查一下 {city} {day} 的天气，并预订从武汉飞往 {city} 的航班"
+           for city in ["广州", "北京", "上海", "深圳", "成都", "杭州", "南京", "西安"] for day in range(1, 9)]
+
+
+def sample_plan(query: str) -> ToolCallResult:
+    nodes = [FakeToolContent(type="tool", name="weather_search", input={"city": query[6:8], "date": "2025-05-06"}),
+             FakeToolContent(type="tool", name="book_flight",
+                             input={"departure_city": "武汉", "destination_city": query[6:8], "date": "2025-05-06"})]
+    return ToolCallResult(type="chain", result=nodes, node_number=len(nodes))
+
+
+def sample_result(index: int) -> str:
+    return "\n".join(f"{index}-{row}. 武汉 2025-05-{row % 28 + 1:02d} 天气晴，气温 18~26℃，东南风 2 级，空气质量良"
+                     for row in range(40))
+
+
+def worker(path: str, worker_id: int, ops: int, keys: int, read_ratio: float, queue):
+    cache = SharedCache(path)
+    rng = random.Random(worker_id)
+    latencies, reads, hits, foreign_hits, errors = [], 0, 0, 0, 0
+    for _ in range(ops):
+        index = rng.randrange(keys)
+        key = content_key("bench", str(index))
+        started = time.perf_counter()
+        try:
+            if rng.random() < read_ratio:
+                reads += 1
+                entry = cache.get(key)
+                if entry is not None:
+                    hits += 1
+                    foreign_hits += entry.value["writer"] != worker_id
+            else:
+                cache.put(key, "bench", {"writer": worker_id, "result": sample_result(index)}, ttl=600)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    cache.close()
+    busy = sum(registry.get("agent_shared_cache_busy_total", operation=operation) for operation in ("get", "put"))
+    queue.put({"latencies": latencies, "reads": reads, "hits": hits, "foreign_hits": foreign_hits,
+               "busy": busy, "errors": errors})
+
+
+def bench_concurrency(path: str, args):
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(path, index, args.ops, args.keys, args.read_ratio,
+                                                              queue)) for index in range(args.processes)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    rows = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+    latencies = [value for row in rows for value in row["latencies"]]
+    reads = sum(row["reads"] for row in rows)
+    hits = sum(row["hits"] for row in rows)
+    print(f"并发读写：{args.processes} 个进程 x {args.ops} 次，吞吐 {len(latencies) / wall:.0f} ops/s，"
+          f"p50 {percentile(latencies, 50) * 1e6:.0f}µs，p99 {percentile(latencies, 99) * 1e6:.0f}µs，"
+          f"读命中率 {hits / max(1, reads):.1%}（其中其他进程写入 {sum(r['foreign_hits'] for r in rows)} 次），"
+          f"锁超时跳过 {sum(row['busy'] for row in rows):.0f} 次，失败 {sum(row['errors'] for row in rows)} 次")
+
+
+def write_plans(path: str):
+    cache = PlanCache(store=SharedCache(path))
+    for query in QUERIES:
+        cache.put(query, "fingerprint:catalog", sample_plan(query))
+
+
+def bench_restart(path: str):
+    # 在子进程中写入，子进程退出后由当前进程中新建的缓存读取
+    process = multiprocessing.Process(target=write_plans, args=(path,))
+    process.start()
+    process.join()
+    cache = PlanCache(store=SharedCache(path))
+    started = time.perf_counter()
+    hits = sum(cache.get(query, "fingerprint:catalog") is not None for query in QUERIES)
+    elapsed = time.perf_counter() - started
+    print(f"重启后命中：{hits}/{len(QUERIES)}，平均每次查询 {elapsed / len(QUERIES) * 1e6:.0f}µs（包含反序列化）")
+
+
+def bench_size(path: str, args):
+    plan = sample_plan(QUERIES[0]).model_dump(mode="json")
+    result = sample_result(0)
+    for name, value in (("ToolCallResult", plan), ("工具结果", result)):
+        raw = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        print(f"存储大小：{name} JSON {raw} 字节，压缩后 {len(encode_value(value))} 字节")
+    cache = SharedCache(path, max_bytes=args.max_kb * 1024)
+    for index in range(args.keys * 4):
+        cache.put(content_key("size", str(index)), "size", sample_result(index))
+    cache.trim()
+    print(f"按大小淘汰：写入 {args.keys * 4} 条后占用 {cache.size_bytes() / 1024:.0f}KB（上限 {args.max_kb}KB），"
+          f"淘汰 {cache.evictions} 条")
+    cache.close()
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        bench_concurrency(os.path.join(directory, "concurrency.db"), args)
+        bench_restart(os.path.join(directory, "restart.db"))
+        bench_size(os.path.join(directory, "size.db"), args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=2000, help="每个进程的读写次数")
+    parser.add_argument("--keys", type=int, default=500)
+    parser.add_argument("--read-ratio", type=float, default=0.9)
+    parser.add_argument("--max-kb", type=int, default=256, help="按大小淘汰测试中的缓存上限")
+    main(parser.parse_args())
@@ -0,0 +1,109 @@
+"""
+启动耗时基准：每次在新的 Python 进程中测量从导入 client.cli 到 MCP 服务连接完成、模型客户端可用的耗时。
+
+对比三种方式：
+    serial      先创建模型客户端，再启动服务进程并握手（改动前的顺序）
+    concurrent  模型客户端在后台线程中创建，与服务进程启动、握手并发进行
+    warm_pool   服务由 server.warm_pool 预先启动，客户端通过 SSE 地址连接（同样并发创建模型客户端）
+模型客户端使用 MODEL_TYPE 对应的真实供应商模块创建（只构造对象，不发起请求）。
+运行方式（项目根目录）：
+    python -m benchmark.startup_bench --runs 5 --tool-path server/echo_server.py
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmark.env import PROJECT_ROOT, setup_environment
+
+MODES = ["serial", "concurrent", "warm_pool"]
+
+
+def probe(mode: str, tool_paths: list):
+    """在当前进程中执行一次启动，输出各阶段耗时（JSON）"""
+    started = time.perf_counter()
+    # 使用真实供应商模块认识的模型名称
+    os.environ.setdefault("MODEL_NAME", "gpt-4o-mini")
+    setup_environment(MCP_TOOL_PATH=",".join(tool_paths))
+    import asyncio
+    from client.cli import MCPClient, create_model_adapter
+    imported = time.perf_counter()
+
+    async def connect():
+        client = MCPClient(model_adapter=create_model_adapter() if mode == "serial" else None)
+        try:
+            await client.connect_to_servers(tool_paths)
+            await client.ensure_model_adapter()
+            return time.perf_counter()
+        finally:
+            await client.cleanup()
+
+    connected = asyncio.run(connect())
+    print(json.dumps({"import": imported - started, "connect": connected - imported,
+                      "total": connected - started}))
+
+
+def run_probe(mode: str, tool_paths: list) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-m", "benchmark.startup_bench", "--probe", mode,
+                             "--tool-path", *tool_paths],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # 包含解释器启动的进程级耗时
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def wait_for_port(host: str, port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex((host, port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"{host}:{port} 未启动")
+
+
+def run(args):
+    tool_paths = [os.path.abspath(path) for path in args.tool_path]
+    print(f"{'mode':<11} {'import_ms':>10} {'connect_ms':>11} {'total_ms':>9} {'process_ms':>11}")
+    for mode in args.modes:
+        pool = None
+        paths = tool_paths
+        if mode == "warm_pool":
+            pool = subprocess.Popen([sys.executable, "-m", "server.warm_pool", *tool_paths,
+                                     "--base-port", str(args.base_port)],
+                                    cwd=PROJECT_ROOT, stdout=subprocess.PIPE, text=True)
+            paths = [f"http://127.0.0.1:{args.base_port + index}/sse" for index in range(len(tool_paths))]
+            for index in range(len(tool_paths)):
+                wait_for_port("127.0.0.1", args.base_port + index)
+        try:
+            # 第一次运行用于预热磁盘缓存和 .pyc，不计入结果
+            run_probe(mode, paths)
+            results = [run_probe(mode, paths) for _ in range(args.runs)]
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.wait()
+        median = {key: statistics.median(item[key] for item in results) * 1000
+                  for key in ("import", "connect", "total", "process")}
+        print(f"{mode:<11} {median['import']:>10.1f} {median['connect']:>11.1f} {median['total']:>9.1f} "
+              f"{median['process']:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tool-path", nargs="+", default=["server/echo_server.py"])
+    parser.add_argument("--base-port", type=int, default=8191, help="warm_pool 模式下服务使用的起始端口")
+    parser.add_argument("--probe", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        probe(args.probe, args.tool_path)
+    else:
+        run(args)
@@ -0,0 +1,102 @@
+"""
+工具检索基准：对比不同工具目录规模下，完整工具列表与 top-k 检索两种方式的规划提示词 token 数和规划耗时。
+
+规划耗时由模拟模型给出：固定首包延迟 + 提示词 token 数 / 预填充速度，可通过参数调整。
+运行方式（项目根目录）：
+    python -m benchmark.tool_retrieval_bench --sizes 10 50 100 200 --top-k 5
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from client.tokens import count_tokens
+from client.tool_registry import ToolRegistry
+from template import prompt
+
+# 与 server/search_tool.py 中工具风格一致的种子工具
+SEED_TOOLS = [
+    ("weather_search", "Retrieve the weather forecast for a given city and date.", ["city", "date"]),
+    ("book_flight", "Book a flight ticket based on departure city, destination, and date.",
+     ["departure_city", "destination_city", "date"]),
+    ("order_info", "Retrieve the current status of a flight using the order number.", ["order"]),
+    ("google_search", "Perform a Google search and return formatted results.", ["query"]),
+    ("bing_search", "Perform a Bing search and return formatted results.", ["query"]),
+]
+DOMAINS = ["hotel", "train", "stock", "movie", "restaurant", "music", "news", "email", "calendar", "map",
+           "translate", "currency", "recipe", "sports", "package", "taxi", "ticket", "doctor", "library", "parking"]
+ACTIONS = [("search", "Search {d} information by keyword"), ("book", "Book a {d} reservation for the user"),
+           ("cancel", "Cancel an existing {d} order"), ("status", "Query the current status of a {d} order"),
+           ("recommend", "Recommend {d} options based on user preference")]
+QUERIES = [
+    "What is the weather forecast in Wuhan tomorrow",
+    "Book a flight from Wuhan to Guangzhou on 2025-05-06",
+    "Check the status of my flight order 1122334455667788",
+    "Search the news about Xiaomi SU7",
+    "Recommend a restaurant near my hotel",
+]
+
+
+class _Tool:
+    def __init__(self, name, description, params):
+        self.name = name
+        self.description = description
+        self.inputSchema = {
+            "type": "object",
+            "title": f"{name}Arguments",
+            "properties": {param: {"title": param.title(), "type": "string"} for param in params},
+            "required": params,
+        }
+
+
+def build_catalog(size: int):
+    tools = [_Tool(*seed) for seed in SEED_TOOLS]
+    synthetic = [(f"{action}_{domain}", template.format(d=domain), [f"{domain}_id", "keyword"])
+                 for domain in DOMAINS for action, template in ACTIONS]
+    random.Random(size).shuffle(synthetic)
+    for name, description, params in synthetic[:max(0, size - len(tools))]:
+        tools.append(_Tool(name, description, params))
+    return tools[:size]
+
+
+def planner_latency(prompt_tokens: int, args) -> float:
+    return args.first_token_latency + prompt_tokens / args.prefill_tps
+
+
+def run(args):
+    print(f"{'size':>6} {'mode':>6} {'prompt_tokens':>14} {'planner_ms':>11} {'select_ms':>10} {'index_ms':>9}")
+    system_tokens = count_tokens(prompt)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for size in args.sizes:
+            tools = build_catalog(size)
+            for mode, top_k in (("full", 0), ("top-k", args.top_k)):
+                index_path = os.path.join(cache_dir, f"tool_index_{size}.json")
+                started = time.perf_counter()
+                registry = ToolRegistry(top_k=top_k, index_path=index_path)
+                registry.load(tools)
+                index_ms = (time.perf_counter() - started) * 1000
+                token_counts, select_times = [], []
+                for query in QUERIES:
+                    started = time.perf_counter()
+                    tools_info = registry.prompt_tools(query)
+                    select_times.append((time.perf_counter() - started) * 1000)
+                    token_counts.append(system_tokens + count_tokens(tools_info) + count_tokens(query))
+                prompt_tokens = statistics.mean(token_counts)
+                print(f"{size:>6} {mode:>6} {prompt_tokens:>14.0f} "
+                      f"{planner_latency(prompt_tokens, args) * 1000:>11.1f} "
+                      f"{statistics.mean(select_times):>10.3f} {index_ms:>9.2f}")
+            # 第二次加载走磁盘索引，衡量重启后的加载耗时
+            started = time.perf_counter()
+            ToolRegistry(top_k=args.top_k, index_path=os.path.join(cache_dir, f"tool_index_{size}.json")).load(tools)
+            print(f"{size:>6} reload index from disk: {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="模拟模型的固定延迟（秒）")
+    parser.add_argument("--prefill-tps", type=float, default=5000, help="模拟模型每秒处理的提示词 token 数")
+    run(parser.parse_args())
@@ -0,0 +1,176 @@
+"""
+离线批量执行：逐行读取 JSONL 中的问题，用有界的异步 worker 池调用 process_query，结果逐条追加写入输出 JSONL。
+输出文件中已成功的记录在重新运行时会被跳过，进程中断后用相同命令即可续跑。
+
+运行方式（项目根目录）：
+    python -m client.batch queries.jsonl results.jsonl --concurrency 8 --query-field query --id-field id
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import traceback
+from typing import Dict, List, Optional, Set
+
+from client.cli import MCPClient, log_level, tool_paths
+from client.metrics import QueryMetrics, percentile
+
+
+def load_finished_ids(output_path: str) -> Set[str]:
+    """读取输出文件中已经成功的记录 ID，用于续跑"""
+    finished = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时可能留下写了一半的行
+                continue
+            if record.get("status") == "ok":
+                finished.add(str(record["id"]))
+    return finished
+
+
+class BatchReport:
+    """汇总吞吐、各阶段耗时分位数和 token 用量"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.latencies: Dict[str, List[float]] = {}
+        self.tokens: Dict[str, int] = {"input_tokens": 0, "output_tokens": 0}
+
+    def add(self, metrics: QueryMetrics, ok: bool):
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        for name, value in (("total", metrics.latency), ("ttft", metrics.ttft)):
+            if value is not None:
+                self.latencies.setdefault(name, []).append(value)
+        for name, values in metrics.stages.items():
+            self.latencies.setdefault(name, []).append(sum(values))
+        for key in self.tokens:
+            self.tokens[key] += metrics.tokens.get(key, 0)
+
+    def render(self) -> str:
+        elapsed = time.perf_counter() - self.started_at
+        done = self.succeeded + self.failed
+        lines = [
+            f"完成 {done} 条（成功 {self.succeeded}，失败 {self.failed}，跳过 {self.skipped}），"
+            f"耗时 {elapsed:.2f}s，吞吐 {done / elapsed if elapsed else 0:.2f} queries/s",
+            f"{'stage':<10}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}",
+        ]
+        for name, values in sorted(self.latencies.items()):
+            lines.append(f"{name:<10}{len(values):>8}" + "".join(
+                f"{percentile(values, p):>10.3f}" for p in (50, 90, 99)))
+        lines.append(f"token 用量：输入 {self.tokens['input_tokens']}，输出 {self.tokens['output_tokens']}")
+        return "\n".join(lines)
+
+
+async def run_batch(client: MCPClient,
+                    input_path: str,
+                    output_path: str,
+                    concurrency: int = 8,
+                    query_field: str = "query",
+                    id_field: str = "id",
+                    limit: Optional[int] = None) -> BatchReport:
+    finished = load_finished_ids(output_path)
+    report = BatchReport()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker(output):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            record_id, query = item
+            metrics = QueryMetrics()
+            record = {"id": record_id, "query": query}
+            try:
+                # 每条问题使用独立的会话，互不共享对话历史
+                record["answer"] = await client.process_query(query, session_id=f"batch-{record_id}",
+                                                              metrics=metrics)
+                record["status"] = "ok"
+            except Exception as e:
+                metrics.finish()
+                record["status"] = "error"
+                record["error"] = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+            record["metrics"] = metrics.to_dict()
+            report.add(metrics, record["status"] == "ok")
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+    def write_invalid(output, record_id: str, line_number: int, error: Exception):
+        reason = f"缺少字段 {error}" if isinstance(error, KeyError) else f"{type(error).__name__}: {error}"
+        record = {"id": record_id, "line": line_number, "status": "error", "error": reason}
+        report.failed += 1
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        workers = [asyncio.create_task(worker(output)) for _ in range(max(1, concurrency))]
+        try:
+            with open(input_path, encoding="utf-8") as f:
+                submitted = 0
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    if limit is not None and submitted >= limit:
+                        break
+                    record_id = str(line_number)
+                    try:
+                        item = json.loads(line)
+                        if not isinstance(item, dict):
+                            raise TypeError(f"每行必须是 JSON 对象，实际为 {type(item).__name__}")
+                        record_id = str(item.get(id_field, line_number))
+                        query = item[query_field]
+                    except (ValueError, KeyError, TypeError) as e:
+                        # 格式错误的行记为失败并继续，不影响其余问题
+                        write_invalid(output, record_id, line_number, e)
+                        continue
+                    if record_id in finished:
+                        report.skipped += 1
+                        continue
+                    # 队列有界，输入文件按处理进度逐行读取
+                    await queue.put((record_id, query))
+                    submitted += 1
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+    return report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="输入 JSONL，每行一个问题")
+    parser.add_argument("output", help="输出 JSONL，结果逐条追加")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时处理的问题数")
+    parser.add_argument("--query-field", default="query", help="问题所在的字段名")
+    parser.add_argument("--id-field", default="id", help="记录 ID 所在的字段名，缺省时使用行号")
+    parser.add_argument("--limit", type=int, default=None, help="最多处理的条数")
+    args = parser.parse_args()
+    logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    client = MCPClient()
+    try:
+        await client.connect_to_servers(tool_paths)
+        report = await run_batch(client, args.input, args.output, args.concurrency,
+                                 args.query_field, args.id_field, args.limit)
+        print(report.render())
+    finally:
+        await client.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from agent_collections import FakeToolContent, ParamGenerationError, ToolResultItem
+from client.tool_cache import canonical_arguments
+
+logger = logging.getLogger(__name__)
+
+# 工具调用：(工具名称, 参数) -> 工具返回的文本
+CallToolFn = Callable[[str, dict], Awaitable[str]]
+# 参数解析：(用户问题, 当前节点, 当前节点工具信息, 依赖节点的执行历史, 对话历史) -> 工具参数
+ResolveParamsFn = Callable[[str, FakeToolContent, Optional[dict], List[dict], list], Awaitable[dict]]
+# 依赖节点的执行结果 -> 参数生成时使用的调用链历史，例如按当前节点的 input_schema 压缩结果
+CompactHistoryFn = Callable[[List[ToolResultItem], Optional[dict]], List[dict]]
+
+
+def _iter_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+def missing_required_params(node_input: dict, node_info: Optional[dict]) -> List[str]:
+    """返回 input_schema 中要求、但规划结果里缺失或为空的参数名"""
+    if not node_info:
+        return []
+    required = (node_info.get("input_schema") or {}).get("required", [])
+    return [name for name in required if node_input.get(name) in (None, "", [], {})]
+
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+    "null": type(None),
+}
+
+
+def _match_type(value, expected) -> bool:
+    if expected is None:
+        return True
+    if isinstance(expected, list):
+        return any(_match_type(value, item) for item in expected)
+    python_type = _JSON_TYPES.get(expected)
+    if python_type is None:
+        return True
+    # bool 是 int 的子类，需要单独排除
+    if isinstance(value, bool) and expected in ("integer", "number"):
+        return False
+    return isinstance(value, python_type)
+
+
+def validate_planned_input(node_input: dict, node_info: Optional[dict]) -> bool:
+    """检查规划阶段给出的参数是否满足工具 input_schema（必填项、参数名、基础类型）"""
+    if not node_info or not isinstance(node_input, dict):
+        return False
+    if missing_required_params(node_input, node_info):
+        return False
+    schema = node_info.get("input_schema") or {}
+    properties = schema.get("properties") or {}
+    for name, value in node_input.items():
+        if name not in properties:
+            if schema.get("additionalProperties", True) is False or properties:
+                return False
+            continue
+        if not _match_type(value, properties[name].get("type")):
+            return False
+    return True
+
+
+def find_dependencies(index: int, chain: List[FakeToolContent], node_info: Optional[dict]) -> Set[int]:
+    """
+    计算调用链中第 index 个节点依赖的前序节点。
+    - 参数值中引用了前序工具名称（例如 "book_flight.result"）时，依赖对应节点；
+    - 必填参数缺失时无法判断来源，保守地依赖全部前序节点。
+    """
+    node = chain[index]
+    if missing_required_params(node.input, node_info):
+        return set(range(index))
+    dependencies = set()
+    values = list(_iter_strings(node.input))
+    for previous_index in range(index):
+        previous_name = chain[previous_index].name
+        if any(previous_name in value for value in values):
+            dependencies.add(previous_index)
+    return dependencies
+
+
+class ChainExecutor:
+    """把工具调用链视为依赖图，互不依赖的节点并发解析参数并调用工具"""
+
+    def __init__(self,
+                 call_tool: CallToolFn,
+                 resolve_params: ResolveParamsFn,
+                 max_concurrency: int = 4,
+                 reuse_planned_input: bool = True,
+                 compact_history: Optional[CompactHistoryFn] = None):
+        self.call_tool = call_tool
+        self.resolve_params = resolve_params
+        self.max_concurrency = max(1, max_concurrency)
+        # 开启后，不依赖前序结果且参数校验通过的节点直接使用规划阶段的参数，不再调用模型生成参数
+        self.reuse_planned_input = reuse_planned_input
+        self.compact_history = compact_history
+
+    def start(self, user_input: str, tools_by_name: Dict[str, dict], history: Optional[list] = None) -> "ChainRun":
+        """创建一次调用链执行，节点可以在规划模型还在生成时逐个加入"""
+        return ChainRun(self, user_input, tools_by_name, history or [])
+
+    async def run(self,
+                  user_input: str,
+                  chain: List[FakeToolContent],
+                  tools_by_name: Dict[str, dict],
+                  history: Optional[list] = None) -> List[ToolResultItem]:
+        chain_run = self.start(user_input, tools_by_name, history)
+        for node in chain:
+            chain_run.add(node)
+        return await chain_run.wait()
+
+    async def _run_node(self,
+                        user_input: str,
+                        history: list,
+                        node: FakeToolContent,
+                        node_info: Optional[dict],
+                        dependencies: List[asyncio.Task],
+                        semaphore: asyncio.Semaphore) -> ToolResultItem:
+        # 先等待依赖节点完成，再占用并发名额，避免依赖链互相占满名额
+        dependency_results = await asyncio.gather(*dependencies)
+        if self.compact_history is not None:
+            chain_history = self.compact_history(list(dependency_results), node_info)
+        else:
+            chain_history = [item.model_dump() for item in dependency_results]
+        async with semaphore:
+            if self.reuse_planned_input and not dependencies and validate_planned_input(node.input, node_info):
+                tool_params = node.input
+            else:
+                try:
+                    tool_params = await self.resolve_params(user_input, node, node_info, chain_history, history)
+                except ParamGenerationError as e:
+                    # 与工具调用失败一样把错误信息作为节点结果，不调用工具，也不让整个问题失败
+                    logger.warning("%s", e)
+                    return ToolResultItem(name=node.name, result=str(e))
+            result = await self.call_tool(node.name, tool_params)
+        logger.debug("工具结果：%s %s", node.name, result)
+        return ToolResultItem(name=node.name, result=result)
+
+
+# 节点的标识：(工具名称, 规范化参数, 依赖节点的标识)，标识相同的节点执行结果相同，可以复用
+NodeKey = Tuple[str, str, tuple]
+
+
+class ChainRun:
+    """
+    一次调用链执行，加入的节点立即按依赖关系调度。
+    规划生成过程中加入的节点是推测执行的：最终规划（修复后的规划、退回提示词模板后的规划）通过 finish / claim 对账，
+    工具、参数和依赖都相同的节点复用已经开始的执行，不会重复调用有副作用的工具；其余的节点取消，只执行不同的节点。
+    """
+
+    def __init__(self, executor: ChainExecutor, user_input: str, tools_by_name: Dict[str, dict], history: list):
+        self.executor = executor
+        self.user_input = user_input
+        self.history = history
+        self.tools_by_name = tools_by_name
+        self.nodes: List[FakeToolContent] = []
+        self.tasks: List[asyncio.Task] = []
+        self.keys: List[NodeKey] = []
+        # 作废的节点：标识 -> 已经开始的执行，等待重新加入时复用
+        self._spare: Dict[NodeKey, List[asyncio.Task]] = {}
+        self.semaphore = asyncio.Semaphore(executor.max_concurrency)
+
+    def add(self, node: FakeToolContent):
+        # 依赖只指向前序节点，所以节点加入时即可确定依赖关系
+        index = len(self.nodes)
+        self.nodes.append(node)
+        node_info = self.tools_by_name.get(node.name)
+        dependency_indexes = sorted(find_dependencies(index, self.nodes, node_info))
+        key = (node.name, canonical_arguments(node.input), tuple(self.keys[i] for i in dependency_indexes))
+        self.keys.append(key)
+        spare = self._spare.get(key)
+        if spare:
+            self.tasks.append(spare.pop(0))
+            return
+        dependencies = [self.tasks[i] for i in dependency_indexes]
+        self.tasks.append(asyncio.create_task(
+            self.executor._run_node(self.user_input, self.history, node, node_info, dependencies, self.semaphore)))
+
+    def reset(self):
+        """已经加入的节点作废，重新加入相同的节点时复用已经开始的执行"""
+        for key, task in zip(self.keys, self.tasks):
+            self._spare.setdefault(key, []).append(task)
+        self.nodes, self.tasks, self.keys = [], [], []
+
+    async def finish(self, chain: List[FakeToolContent]) -> List[ToolResultItem]:
+        """按最终规划执行调用链：与已加入节点相同的部分复用执行结果，只执行不同的节点"""
+        self.reset()
+        for node in chain:
+            self.add(node)
+        # 最终规划没有复用的推测执行立即取消，还没开始的工具调用不会再执行。
+        # 标识包含依赖节点的标识，复用的节点依赖的执行同样被复用，不会在这里被取消
+        for task in [task for tasks in self._spare.values() for task in tasks]:
+            if not task.done():
+                task.cancel()
+        self._spare.clear()
+        return await self.wait()
+
+    def claim(self, node: FakeToolContent) -> Optional[asyncio.Task]:
+        """最终规划是单个工具调用时，取出参数相同、不依赖其他节点的已开始执行，其余节点取消"""
+        self.reset()
+        key = (node.name, canonical_arguments(node.input), ())
+        spare = self._spare.get(key)
+        task = spare.pop(0) if spare else None
+        self.cancel()
+        return task
+
+    async def wait(self) -> List[ToolResultItem]:
+        try:
+            # 结果按调用链原有顺序返回
+            return list(await asyncio.gather(*self.tasks))
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        for task in self.tasks + [task for tasks in self._spare.values() for task in tasks]:
+            if not task.done():
+                task.cancel()
+        self._spare.clear()
@@ -1,31 +1,131 @@
 import asyncio
+import json
+import logging
 import os
-from typing import Optional
-from contextlib import AsyncExitStack
+import time
+from typing import AsyncIterator, Dict, List, Optional
+from contextlib import AsyncExitStack, aclosing
 
-from langchain_core.messages import HumanMessage, AIMessage
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 from dotenv import load_dotenv
-from agent_collections import ToolResultItem, UserQuery, ModelAdapter
+from agent_collections import ToolResultItem, UserQuery, ModelAdapter, is_plan_fallback
+from client.chain_executor import ChainExecutor
+from client.memory import MemoryStore, create_backend
+from client.metrics import QueryMetrics, current_metrics, record_usage, track_stage
+from client.plan_cache import PlanCache, history_scope
+from client.query_router import ROUTE_DIRECT, ROUTE_SINGLE_TOOL, QueryRouter, RouteDecision, parse_keywords
+from client.result_compactor import ResultCompactor, ResultStore, current_session
+from client.server_pool import ServerPool, SessionFactory
+from client.shared_cache import SharedCache
+from client.tool_cache import ToolResultCache, parse_ttls
+from client.tool_policy import ToolCallError, ToolPolicies, parse_policies
+from client.tool_registry import ToolRegistry
+from client.tracing import create_exporter, current_span, registry, set_exporters, shutdown as shutdown_tracing, span
 
 load_dotenv()  # load environment variables from .env
 api_key = os.environ["MODEL_API_KEY"]
 base_url = os.environ["MODEL_BASE_URL"]
-tool_path = os.environ["MCP_TOOL_PATH"]
+# 多个服务脚本用英文逗号分隔，启动时并发连接
+tool_paths = [path.strip() for path in os.environ["MCP_TOOL_PATH"].split(",") if path.strip()]
 model_name = os.environ["MODEL_NAME"]
 model_type = os.environ["MODEL_TYPE"]
+# 工具链中可同时执行的节点数
+chain_concurrency = int(os.environ.get("TOOL_CHAIN_CONCURRENCY", "4"))
+# 工具链节点参数完整时是否直接复用规划结果，跳过逐节点的参数生成调用
+reuse_planned_input = os.environ.get("CHAIN_REUSE_PLANNED_INPUT", "true").lower() == "true"
+# 单次模型调用超时时间（秒），不配置则不限制
+model_timeout = float(os.environ["MODEL_TIMEOUT"]) if os.environ.get("MODEL_TIMEOUT") else None
+# 原生工具调用：工具以 function calling / structured output 的方式传给模型，模型不支持时退回提示词模板
+model_native_tools = os.environ.get("MODEL_NATIVE_TOOLS", "false").lower() == "true"
+# 工具目录缓存的过期时间（秒），不配置则只在服务端通知工具列表变更时刷新
+tool_catalog_ttl = float(os.environ["TOOL_CATALOG_TTL"]) if os.environ.get("TOOL_CATALOG_TTL") else None
+# 规划时只放入检索出的 top-k 个工具，0 表示使用完整工具列表
+tool_top_k = int(os.environ.get("TOOL_TOP_K", "0"))
+tool_index_path = os.environ.get("TOOL_INDEX_PATH", ".cache/tool_index.json")
+# 规划结果缓存，PLAN_CACHE_SIZE 为 0 时关闭
+plan_cache_size = int(os.environ.get("PLAN_CACHE_SIZE", "0"))
+plan_cache_ttl = float(os.environ["PLAN_CACHE_TTL"]) if os.environ.get("PLAN_CACHE_TTL") else None
+plan_cache_threshold = float(os.environ.get("PLAN_CACHE_SIMILARITY", "1.0"))
+# 同一台机器上多个客户端进程共享的磁盘缓存（SQLite WAL），规划结果和工具结果在重启后仍可命中；
+# 兼容旧的 PLAN_CACHE_PATH 配置，不配置则只缓存在进程内存中
+shared_cache_path = os.environ.get("SHARED_CACHE_PATH") or os.environ.get("PLAN_CACHE_PATH") or None
+shared_cache_max_mb = float(os.environ.get("SHARED_CACHE_MAX_MB", "256"))
+# 按工具配置的结果缓存时间，例如 "weather_search=300,google_search=600"，未配置的工具不缓存
+tool_result_ttls = parse_ttls(os.environ.get("TOOL_RESULT_TTLS", ""))
+# 按工具配置的调用策略（JSON）：并发上限、截止时间、幂等工具的重试和熔断，"*" 为默认策略，不配置则不做限制
+tool_policies = parse_policies(os.environ.get("TOOL_POLICIES", ""))
+# 工具结果拼接到提示词前的 token 预算（按结果条数平分），超出时压缩并保留完整结果的引用，0 表示不压缩
+tool_result_param_budget = int(os.environ.get("TOOL_RESULT_PARAM_BUDGET", "1000"))
+tool_result_answer_budget = int(os.environ.get("TOOL_RESULT_ANSWER_BUDGET", "4000"))
+# 规划前的本地路由：闲聊直接回答，只涉及一个工具时规划提示词中只放入这个工具
+query_router = os.environ.get("QUERY_ROUTER", "false").lower() == "true"
+# 路由使用的工具关键词（JSON，工具名称 -> 关键词列表），与工具描述的 TF-IDF 相似度一起判断问题涉及哪些工具
+router_keywords = parse_keywords(os.environ.get("ROUTER_KEYWORDS", ""))
+router_min_score = float(os.environ.get("ROUTER_MIN_SCORE", "0.2"))
+# 单工具调用的回答模板（JSON，工具名称 -> 模板），可以使用 {result} 和工具参数，配置后跳过回答生成的模型调用
+tool_result_templates = json.loads(os.environ["TOOL_RESULT_TEMPLATES"]) if os.environ.get("TOOL_RESULT_TEMPLATES") \
+    else {}
+# 每个 MCP 服务启动的会话（进程）数，慢工具不会阻塞同一服务的其他调用
+session_pool_size = int(os.environ.get("MCP_SESSION_POOL_SIZE", "1"))
+# 规划模型流式输出时，调用链节点一生成完毕就开始执行
+stream_plan_execution = os.environ.get("STREAM_PLAN_EXECUTION", "false").lower() == "true"
+# 对话记忆：历史消息的 token 预算、是否对超出预算的早期对话做摘要、持久化方式（sqlite / jsonl，不配置则只在内存中）
+memory_token_budget = int(os.environ.get("MEMORY_TOKEN_BUDGET", "3000"))
+memory_summary = os.environ.get("MEMORY_SUMMARY", "true").lower() == "true"
+memory_backend = os.environ.get("MEMORY_BACKEND", "")
+memory_path = os.environ.get("MEMORY_PATH", ".cache/memory.db")
+memory_max_sessions = int(os.environ.get("MEMORY_MAX_SESSIONS", "1024"))
+# 日志级别，DEBUG 时输出模型完整回复和工具结果
+log_level = os.environ.get("LOG_LEVEL", "WARNING").upper()
+# 调用链导出方式：file（OTLP/JSON 行格式写入 TRACE_PATH）/ memory，不配置则不导出
+trace_exporter = os.environ.get("TRACE_EXPORTER", "")
+trace_path = os.environ.get("TRACE_PATH", ".cache/traces.jsonl")
 
-message_history = []
+logger = logging.getLogger(__name__)
+
+
+def create_model_adapter() -> ModelAdapter:
+    return ModelAdapter(model_name=model_name, model_type=model_type, api_key=api_key, base_url=base_url,
+                        timeout=model_timeout, usage_callback=record_usage, native_tools=model_native_tools)
 
 
 class MCPClient:
-    def __init__(self):
+    def __init__(self, model_adapter: Optional[ModelAdapter] = None):
         # Initialize session and client objects
-        self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.model_adapter = ModelAdapter(model_name=model_name, model_type=model_type, api_key=api_key,
-                                          base_url=base_url)
+        exporter = create_exporter(trace_exporter, trace_path)
+        if exporter is not None:
+            set_exporters([exporter])
+            self.exit_stack.callback(shutdown_tracing)
+        # 可以传入自定义的 ModelAdapter（例如基准测试中的模拟模型）；
+        # 不传入时在连接 MCP 服务的同时于后台线程中创建，模型客户端的导入和初始化不再阻塞服务启动
+        self.model_adapter = model_adapter
+        self._model_adapter_task: Optional[asyncio.Future] = None
+        self.tool_registry = ToolRegistry(ttl=tool_catalog_ttl, top_k=tool_top_k, index_path=tool_index_path)
+        self.servers = ServerPool(pool_size=session_pool_size, message_handler=self.tool_registry.handle_message)
+        self.shared_cache = SharedCache(shared_cache_path, max_bytes=int(shared_cache_max_mb * 1024 * 1024)) \
+            if shared_cache_path else None
+        if self.shared_cache is not None:
+            self.exit_stack.callback(self.shared_cache.close)
+        self.plan_cache = PlanCache(max_size=plan_cache_size, ttl=plan_cache_ttl,
+                                    similarity_threshold=plan_cache_threshold,
+                                    store=self.shared_cache) if plan_cache_size > 0 else None
+        self.tool_cache = ToolResultCache(ttls=tool_result_ttls, store=self.shared_cache)
+        self.tool_policies = ToolPolicies(tool_policies)
+        self.result_store = ResultStore()
+        self.result_compactor = ResultCompactor(self.result_store, param_budget=tool_result_param_budget,
+                                                answer_budget=tool_result_answer_budget)
+        self.router = QueryRouter(keywords=router_keywords, min_score=router_min_score) if query_router else None
+        self.result_templates = tool_result_templates
+        self.last_metrics: Optional[QueryMetrics] = None
+        self.memory_store = MemoryStore(backend=create_backend(memory_backend, memory_path),
+                                        token_budget=memory_token_budget, max_sessions=memory_max_sessions,
+                                        summarize=self._summarize_history if memory_summary else None)
+        self.exit_stack.callback(self.memory_store.close)
+        self.chain_executor = ChainExecutor(call_tool=self._call_tool_text,
+                                            resolve_params=self._resolve_node_params,
+                                            max_concurrency=chain_concurrency,
+                                            reuse_planned_input=reuse_planned_input,
+                                            compact_history=self.result_compactor.for_params)
 
     # methods will go here
 
@@ -35,31 +135,57 @@ class MCPClient:
         Args:
             server_script_path: Path to the server script (.py or .js)
         """
-        is_python = server_script_path.endswith('.py')
-        is_js = server_script_path.endswith('.js')
-        if not (is_python or is_js):
-            raise ValueError("Server script must be a .py or .js file")
-
-        command = "python" if is_python else "node"
-        server_params = StdioServerParameters(
-            command=command,
-            args=[server_script_path],
-            env=None
-        )
-
-        stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
-
-        await self.session.initialize()
-
-        # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
-        print("\nConnected to server with tools:", [tool.name for tool in tools])
-
-    async def process_query(self, query: str) -> str:
+        await self.connect_to_servers([server_script_path])
+
+    async def connect_to_servers(self, server_script_paths: List[str]):
+        """并发连接多个 MCP 服务，合并各服务的工具"""
+        if not self.servers.servers:
+            self.exit_stack.push_async_callback(self.servers.close)
+        # 服务进程启动、握手与模型客户端创建并发进行
+        await asyncio.gather(self.ensure_model_adapter(), self.servers.connect(server_script_paths))
+        await self._load_tools()
+
+    async def connect_to_sessions(self, factories: Dict[str, SessionFactory]):
+        """按 服务名 -> 会话工厂 连接，例如进程内的内存会话"""
+        if not self.servers.servers:
+            self.exit_stack.push_async_callback(self.servers.close)
+        await asyncio.gather(self.ensure_model_adapter(), self.servers.connect_sessions(factories))
+        await self._load_tools()
+
+    async def ensure_model_adapter(self) -> ModelAdapter:
+        if self.model_adapter is None:
+            if self._model_adapter_task is None:
+                self._model_adapter_task = asyncio.ensure_future(asyncio.to_thread(create_model_adapter))
+            self.model_adapter = await self._model_adapter_task
+        return self.model_adapter
+
+    async def _load_tools(self):
+        # List available tools，后续查询直接使用缓存的工具目录
+        await self.tool_registry.refresh(self.servers)
+        logger.info("Connected to server with tools: %s", [tool["name"] for tool in self.tool_registry.tools])
+
+    async def process_query(self, query: str, session_id: str = "default",
+                            metrics: Optional[QueryMetrics] = None) -> str:
         """Process a query using Claude and available tools"""
+        chunks = []
+        async for text in self.stream_query(query, session_id, metrics):
+            chunks.append(text)
+        return "".join(chunks)
+
+    async def stream_query(self, query: str, session_id: str = "default",
+                           metrics: Optional[QueryMetrics] = None) -> AsyncIterator[str]:
+        """处理用户问题，最终回答按模型输出逐块返回；结束后记录对话历史和本次查询指标"""
+        metrics = metrics or QueryMetrics()
+        self.last_metrics = metrics
+        current_metrics.set(metrics)
+        current_session.set(session_id)
+        # 一次查询对应一条 trace，规划、参数生成、工具调用和回答生成都是其中的子 span
+        with span("query", session_id=session_id):
+            async with aclosing(self._stream_query(query, session_id, metrics)) as stream:
+                async for text in stream:
+                    yield text
+
+    async def _stream_query(self, query: str, session_id: str, metrics: QueryMetrics) -> AsyncIterator[str]:
         messages = [
             {
                 "role": "user",
@@ -67,88 +193,196 @@ class MCPClient:
             }
         ]
 
-        response = await self.session.list_tools()
-        available_tools = [{
-            "name": tool.name,
-            "description": tool.description,
-            "input_schema": tool.inputSchema
-        } for tool in response.tools]
+        await self.tool_registry.ensure_loaded(self.servers)
+        await self.ensure_model_adapter()
 
         # Initial Claude API call
-        message_history.append(HumanMessage(content=query))
-        response = self.model_adapter.create(
-            messages=messages,
-            history=message_history,
-            tools=available_tools
-        )
-        print(response)
+        memory = self.memory_store.get(session_id)
+        # 本轮所有模型调用共用同一份历史（摘要 + 预算内的最近消息），存储的读写在后台线程中执行
+        with track_stage("memory"):
+            await memory.load()
+            memory.add_user_message(query)
+            history = await memory.history()
+        decision = self._route(query) if self.router is not None else None
+        if decision is not None and decision.route == ROUTE_DIRECT:
+            # 不需要工具：跳过规划和工具列表，用简短提示词直接流式回答
+            async with aclosing(self._stream_answer(self.model_adapter.astream_direct(query, history), memory,
+                                                    metrics)) as stream:
+                async for text in stream:
+                    yield text
+            return
+        # 只涉及一个工具时规划提示词中只放入这个工具
+        tools = self.tool_registry.render_subset(decision.tools) \
+            if decision is not None and decision.route == ROUTE_SINGLE_TOOL else None
+        chain_run = self.chain_executor.start(query, self.tool_registry.tools_by_name, history) \
+            if stream_plan_execution else None
+        response = await self._plan(messages, query, history, chain_run, tools)
+        logger.debug("规划结果：%s", response)
         # 根据返回类型进行输出
         # 先写第一种，即文本类型，说明不需要调用工具（可能是结束也可能是调用工具的条件不足），直接获得返回
-        while True:
-            type = response.type
-            if type == "text":
-                context = response.result.text
-                message_history.append(AIMessage(content=context))
-                return context
-            elif type == "tool":
-                # 说明其判断只需要执行一次工具就可以获取到结果
-                tool_name, tool_params = response.result.name, response.result.input
-                # Execute tool call
-                result = await self.session.call_tool(tool_name, tool_params)
-                print("工具结果：", result.content[0].text)
-                # 需要一个用户问题、工具调用历史进行回答的Agent
-                tool_chain = [response.result.name]
-                tool_result = ToolResultItem(name=response.result.name, result=result.content[0].text)
-                generate_info = UserQuery(user_input=query, tool_chain=tool_chain, tool_result=[tool_result])
-                response = self.model_adapter.generate_context(
-                    generate_info=generate_info,
-                    history = message_history
-                )
+        type = response.type
+        reused = None
+        if chain_run is not None and type == "tool":
+            # 最终规划是单个工具调用：参数相同的推测执行直接复用，其余推测执行的节点取消
+            reused = chain_run.claim(response.result)
+        elif chain_run is not None and type != "chain":
+            chain_run.cancel()
+        if type == "text":
+            context = response.result.text
+            memory.add_ai_message(context)
+            metrics.mark_first_token()
+            metrics.finish()
+            yield context
+            return
+        elif type == "tool":
+            # 说明其判断只需要执行一次工具就可以获取到结果
+            tool_name, tool_params = response.result.name, response.result.input
+            # Execute tool call
+            if reused is not None:
+                result = (await reused).result
+            else:
+                result = await self._call_tool_text(tool_name, tool_params)
+            logger.debug("工具结果：%s %s", tool_name, result)
+            context = self._render_result(tool_name, tool_params, result)
+            if context is not None:
+                # 配置了回答模板的工具直接按模板回答，不再调用模型生成
+                memory.add_ai_message(context)
+                metrics.mark_first_token()
+                metrics.finish()
+                yield context
+                return
+            # 需要一个用户问题、工具调用历史进行回答的Agent
+            tool_chain = [response.result.name]
+            tool_result = [ToolResultItem(name=response.result.name, result=result)]
+        elif type == "chain":
+            logger.debug("工具chain执行中")
+            # 互不依赖的节点并发执行，结果按调用链顺序返回
+            chain_full = response.result
+            tool_chain = [tool.name for tool in chain_full]
+            if chain_run is not None:
+                # 规划生成过程中已经开始执行、且工具和参数都与最终规划一致的节点直接复用，只执行不同的节点
+                tool_result = await chain_run.finish(chain_full)
+            else:
+                tool_result = await self.chain_executor.run(query, chain_full, self.tool_registry.tools_by_name,
+                                                            history)
+        else:
+            logger.error("类型解析失败：%s", response)
+            return
 
-            elif type == "chain":
-                print("工具chain执行中")
-                # 获取当前属于哪一个节点
-                chain_full = response.result
-                chain_history = []
-                tool_chain = []
-                tool_result = []
-                for tool in chain_full:
-                    current_tool_name = tool.name
-                    tool_chain.append(current_tool_name)
-                    # 根据名字获取工具的详细信息
-                    current_node_info = next((tool for tool in available_tools if tool["name"] == current_tool_name),
-                                             None)
-                    response = self.model_adapter.generate_param_by_current_node(
-                        current_node_info=current_node_info,
-                        chain_history=chain_history,
-                        user_input=query,
-                        history= message_history
-                    )
-                    current_tool_input = response
-                    # Execute tool call
-                    result = await self.session.call_tool(current_tool_name, current_tool_input)
-                    print("工具结果：", result.content[0].text)
-                    # 制作执行历史
-                    chain_history.append(
-                        {
-                            "name": current_tool_name,
-                            "result": result.content[0].text
-                        }
-                    )
-                    tool_result.append(ToolResultItem(name=current_tool_name, result=result.content[0].text))
-                # 将工具调用历史等交给大模型，让大模型生成总结
-                generate_info = UserQuery(user_input=query, tool_chain=tool_chain, tool_result=tool_result)
-                response = self.model_adapter.generate_context(
-                    generate_info=generate_info,
-                    history= message_history
+        # 将工具调用历史等交给大模型，让大模型生成总结，边生成边返回
+        generate_info = UserQuery(user_input=query, tool_chain=tool_chain,
+                                  tool_result=self.result_compactor.for_answer(tool_result))
+        async with aclosing(self._stream_answer(
+                self.model_adapter.astream_context(generate_info=generate_info, history=history), memory,
+                metrics)) as stream:
+            async for text in stream:
+                yield text
+
+    async def _stream_answer(self, stream: AsyncIterator[str], memory, metrics: QueryMetrics) -> AsyncIterator[str]:
+        """逐块返回模型生成的回答，结束后写入对话历史"""
+        chunks = []
+        answer_started = time.perf_counter()
+        async with aclosing(stream):
+            async for text in stream:
+                if not text:
+                    continue
+                metrics.mark_first_token()
+                chunks.append(text)
+                yield text
+        metrics.add_stage("answer", time.perf_counter() - answer_started)
+        memory.add_ai_message("".join(chunks))
+        metrics.finish()
+
+    def _route(self, query: str) -> RouteDecision:
+        with track_stage("route"):
+            self.router.load(self.tool_registry.tools, self.tool_registry.version)
+            decision = self.router.route(query)
+            current_span().set_attribute("route", decision.route)
+        registry.inc("agent_router_total", 1, "查询路由结果（direct / single_tool / chain / plan）",
+                     route=decision.route)
+        logger.debug("路由结果：%s", decision)
+        return decision
+
+    def _render_result(self, tool_name: str, tool_params: dict, result: str) -> Optional[str]:
+        template = self.result_templates.get(tool_name)
+        if template is None:
+            return None
+        try:
+            return template.format_map({**(tool_params or {}), "result": result})
+        except (KeyError, IndexError, ValueError) as e:
+            logger.warning("工具 %s 的回答模板无法渲染，改由模型生成回答：%r", tool_name, e)
+            return None
+
+    async def _plan(self, messages: list, query: str, history: list, chain_run=None, tools: Optional[str] = None):
+        """
+        生成调用规划，命中规划缓存时跳过模型调用；传入 chain_run 时边生成边执行调用链节点。
+        tools 为路由给出的候选工具列表，不传入时按问题检索或使用完整工具列表。
+        """
+        # 缓存范围：模型和提示词指纹 + 工具目录版本 + 对话历史指纹
+        scope = f"{self.model_adapter.fingerprint}:{self.tool_registry.version}:{history_scope(history)}"
+        if self.plan_cache is not None:
+            response = self.plan_cache.get(query, scope)
+            if response is not None:
+                return response
+        try:
+            with track_stage("plan"):
+                response = await self.model_adapter.create(
+                    messages=messages,
+                    history=history,
+                    tools=tools if tools is not None else self.tool_registry.prompt_tools(query),
+                    on_step=chain_run.add if chain_run is not None else None,
+                    tool_names=self.tool_registry.tools_by_name,
+                    on_reset=chain_run.reset if chain_run is not None else None
                 )
-            else:
-                print("类型解析失败")
-                return ""
+        except BaseException:
+            if chain_run is not None:
+                chain_run.cancel()
+            raise
+        # 修复失败时的兜底回答不写入缓存，下次同样的问题重新规划
+        if self.plan_cache is not None and not is_plan_fallback(response):
+            self.plan_cache.put(query, scope, response)
+        return response
+
+    async def _call_tool_text(self, tool_name: str, tool_params: dict) -> str:
+        # 可缓存的工具先查结果缓存，相同的并发调用只请求一次
+        # 调用失败（超时、熔断、服务端报错）时把错误信息作为工具结果，模型据此生成后续参数和回答
+        with track_stage("tool", tool=tool_name):
+            try:
+                return await self.tool_cache.call(tool_name, tool_params, self._call_policy_tool,
+                                                  scope=self.tool_registry.version)
+            except ToolCallError as e:
+                logger.warning("%s", e)
+                return str(e)
+
+    async def _call_policy_tool(self, tool_name: str, tool_params: dict) -> str:
+        return await self.tool_policies.call(tool_name, tool_params, self._call_session_tool)
+
+    async def _call_session_tool(self, tool_name: str, tool_params: dict) -> str:
+        result = await self.servers.call_tool(tool_name, tool_params)
+        text = result.content[0].text if result.content else ""
+        if result.isError:
+            # 服务端报错的结果不写入缓存，计入重试和熔断
+            raise ToolCallError(text or "服务端返回错误")
+        return text
+
+    async def _summarize_history(self, summary: str, messages: list) -> str:
+        return await self.model_adapter.summarize_history(summary, messages)
+
+    async def _resolve_node_params(self, user_input: str, node, node_info: dict, chain_history: list,
+                                   history: list) -> dict:
+        # 根据用户问题和依赖节点的输出生成当前节点参数
+        with track_stage("param", tool=node.name):
+            return await self.model_adapter.generate_param_by_current_node(
+                current_node_info=node_info,
+                chain_history=chain_history,
+                user_input=user_input,
+                history=history
+            )
 
     async def chat_loop(self):
         """Run an interactive chat loop"""
         print("\nMCP Client Started!")
+        print("Connected to server with tools:", [tool["name"] for tool in self.tool_registry.tools])
         print("Type your queries or 'quit' to exit.")
 
         while True:
@@ -158,8 +392,13 @@ class MCPClient:
                 if query.lower() == 'quit':
                     break
 
-                response = await self.process_query(query)
-                print("\n" + response)
+                # 回答逐块输出，用户不需要等待完整回答生成
+                print()
+                async for text in self.stream_query(query):
+                    print(text, end="", flush=True)
+                print()
+                if self.last_metrics is not None and self.last_metrics.ttft is not None:
+                    print(f"(首个 token 耗时 {self.last_metrics.ttft:.2f}s，总耗时 {self.last_metrics.latency:.2f}s)")
 
             except Exception as e:
                 print(f"\nError: {str(e)}")
@@ -170,9 +409,10 @@ class MCPClient:
 
 
 async def main():
+    logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     client = MCPClient()
     try:
-        await client.connect_to_server(tool_path)
+        await client.connect_to_servers(tool_paths)
         # await client.connect_to_server("D:\\local\\pycharm\\mcp_demo\\server\\echo_server.py")
 
         await client.chat_loop()
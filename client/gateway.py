@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncContextManager, Dict, Optional
+
+import uvicorn
+from sse_starlette.sse import EventSourceResponse
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from client.cli import MCPClient, log_level, tool_paths
+from client.metrics import QueryMetrics
+from client.tracing import registry
+
+gateway_host = os.environ.get("GATEWAY_HOST", "127.0.0.1")
+gateway_port = int(os.environ.get("GATEWAY_PORT", "8000"))
+# 同时处理的查询数、排队等待的查询数上限，排队已满时直接返回 429
+gateway_max_concurrency = int(os.environ.get("GATEWAY_MAX_CONCURRENCY", "64"))
+gateway_max_queue = int(os.environ.get("GATEWAY_MAX_QUEUE", "256"))
+# 关闭服务时等待进行中查询完成的最长时间（秒）
+gateway_shutdown_timeout = float(os.environ.get("GATEWAY_SHUTDOWN_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class AdmissionController:
+    """限制同时处理的查询数，超出的查询排队，排队数达到上限后拒绝新查询"""
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @asynccontextmanager
+    async def slot(self, hold: Optional[AsyncContextManager] = None):
+        """
+        占用一个处理名额。hold 为占用名额前需要先进入、并在查询结束后才退出的上下文（例如会话锁）：
+        等待 hold 的查询计入排队数，但不占用处理名额，同一会话排队的查询不会占满并发。
+        """
+        if self.draining:
+            raise QueueFullError("服务正在关闭")
+        if self.waiting >= self.max_queue:
+            raise QueueFullError("请求排队已满，请稍后重试")
+        async with AsyncExitStack() as stack:
+            self.waiting += 1
+            try:
+                if hold is not None:
+                    await stack.enter_async_context(hold)
+                await self.semaphore.acquire()
+            except BaseException:
+                self.waiting -= 1
+                # 排队中的查询被取消（例如客户端断开）时，可能是最后一个未完成的查询
+                self._check_idle()
+                raise
+            self.waiting -= 1
+            self.active += 1
+            self._idle.clear()
+            try:
+                yield
+            finally:
+                self.active -= 1
+                self.semaphore.release()
+                self._check_idle()
+
+    def _check_idle(self):
+        if self.active == 0 and self.waiting == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float):
+        """停止接收新查询，等待进行中的查询完成"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("关闭服务时仍有 %d 个查询未完成", self.active)
+
+
+class SessionLocks:
+    """同一会话的多次查询按顺序执行，保证对话记忆的一致性；空闲会话的锁会被回收"""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._users[session_id] = self._users.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[session_id] -= 1
+            if self._users[session_id] == 0:
+                del self._users[session_id]
+                del self._locks[session_id]
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    # 所有会话共享同一个 MCPClient 以及其中的 MCP 服务连接和模型客户端
+    client = MCPClient()
+    await client.connect_to_servers(tool_paths)
+    app.state.client = client
+    app.state.admission = AdmissionController(gateway_max_concurrency, gateway_max_queue)
+    app.state.session_locks = SessionLocks()
+    try:
+        yield
+    finally:
+        await app.state.admission.drain(gateway_shutdown_timeout)
+        await client.cleanup()
+
+
+async def query(request: Request):
+    """
+    请求体：{"query": "用户问题", "session_id": "会话ID", "stream": true}
+    stream 为 true（默认）时以 SSE 返回：token 事件为回答片段，done 事件为本次查询指标，error 事件为错误信息。
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "请求体必须是 JSON"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "请求体必须是 JSON 对象"}, status_code=400)
+    user_query = (body.get("query") or "").strip()
+    if not user_query:
+        return JSONResponse({"error": "query 不能为空"}, status_code=400)
+    session_id = str(body.get("session_id") or "default")
+    client: MCPClient = request.app.state.client
+    admission: AdmissionController = request.app.state.admission
+    session_locks: SessionLocks = request.app.state.session_locks
+    if admission.draining or admission.waiting >= admission.max_queue:
+        return JSONResponse({"error": "请求排队已满，请稍后重试"}, status_code=429)
+
+    if not body.get("stream", True):
+        metrics = QueryMetrics()
+        try:
+            async with admission.slot(session_locks.hold(session_id)):
+                chunks = [text async for text in client.stream_query(user_query, session_id, metrics)]
+        except QueueFullError as e:
+            return JSONResponse({"error": str(e)}, status_code=429)
+        except Exception as e:
+            logger.exception("查询失败：%s", user_query)
+            return JSONResponse({"error": f"{type(e).__name__}: {e}"}, status_code=500)
+        return JSONResponse({"answer": "".join(chunks), "metrics": metrics.to_dict()})
+
+    async def events():
+        metrics = QueryMetrics()
+        try:
+            async with admission.slot(session_locks.hold(session_id)):
+                async for text in client.stream_query(user_query, session_id, metrics):
+                    yield {"event": "token", "data": text}
+            yield {"event": "done", "data": json.dumps(metrics.to_dict())}
+        except QueueFullError as e:
+            yield {"event": "error", "data": str(e)}
+        except Exception as e:
+            logger.exception("查询失败：%s", user_query)
+            yield {"event": "error", "data": f"{type(e).__name__}: {e}"}
+
+    return EventSourceResponse(events())
+
+
+async def health(request: Request):
+    admission: AdmissionController = request.app.state.admission
+    return JSONResponse({
+        "status": "draining" if admission.draining else "ok",
+        "active": admission.active,
+        "waiting": admission.waiting,
+    })
+
+
+async def metrics(request: Request):
+    """Prometheus 文本格式的指标"""
+    admission: AdmissionController = request.app.state.admission
+    registry.set_gauge("agent_gateway_active_queries", admission.active, "正在处理的查询数")
+    registry.set_gauge("agent_gateway_waiting_queries", admission.waiting, "排队等待的查询数")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+async def result(request: Request):
+    """按引用取回被压缩前的完整工具结果，查询参数 session_id 必须与生成该结果的查询一致（缺省为 default）"""
+    client: MCPClient = request.app.state.client
+    session_id = request.query_params.get("session_id") or "default"
+    text = client.result_store.get(request.path_params["result_id"], session_id)
+    if text is None:
+        return JSONResponse({"error": "结果不存在或已过期"}, status_code=404)
+    return PlainTextResponse(text)
+
+
+app = Starlette(routes=[
+    Route("/query", query, methods=["POST"]),
+    Route("/health", health, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/results/{result_id}", result, methods=["GET"]),
+], lifespan=lifespan)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    uvicorn.run(app, host=gateway_host, port=gateway_port)
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from client.tokens import count_tokens
+
+# 摘要：(之前的摘要, 需要合并进摘要的消息) -> 新摘要
+SummarizeFn = Callable[[str, List[BaseMessage]], Awaitable[str]]
+
+_ROLES = {"human": HumanMessage, "ai": AIMessage}
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend(ABC):
+    """对话记忆的持久化存储，只追加消息，摘要按会话覆盖保存"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Tuple[List[Tuple[str, str]], str, int]:
+        """返回 ([(role, content)], 摘要, 摘要覆盖到的消息下标)"""
+
+    @abstractmethod
+    def append(self, session_id: str, role: str, content: str):
+        pass
+
+    @abstractmethod
+    def save_summary(self, session_id: str, summary: str, summarized_upto: int):
+        pass
+
+    async def aload(self, session_id: str) -> Tuple[List[Tuple[str, str]], str, int]:
+        return self.load(session_id)
+
+    def close(self):
+        pass
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 由 ThreadedMemoryBackend 在单独的线程中按顺序调用，连接不会被并发使用
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS messages ("
+                          "session_id TEXT NOT NULL, seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                          "role TEXT NOT NULL, content TEXT NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, seq)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS summaries ("
+                          "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, summarized_upto INTEGER NOT NULL)")
+        self.conn.commit()
+
+    def load(self, session_id: str):
+        rows = self.conn.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq",
+                                 (session_id,)).fetchall()
+        summary = self.conn.execute("SELECT summary, summarized_upto FROM summaries WHERE session_id = ?",
+                                    (session_id,)).fetchone()
+        return [tuple(row) for row in rows], summary[0] if summary else "", summary[1] if summary else 0
+
+    def append(self, session_id: str, role: str, content: str):
+        self.conn.execute("INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                          (session_id, role, content))
+        self.conn.commit()
+
+    def save_summary(self, session_id: str, summary: str, summarized_upto: int):
+        self.conn.execute("INSERT OR REPLACE INTO summaries (session_id, summary, summarized_upto) VALUES (?, ?, ?)",
+                          (session_id, summary, summarized_upto))
+        self.conn.commit()
+
+
+class JsonlMemoryBackend(MemoryBackend):
+    """每个会话一个只追加写入的 jsonl 文件，摘要也作为一条记录追加，加载时以最后一条为准"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.-]", "_", session_id) + ".jsonl")
+
+    def _write(self, session_id: str, record: dict):
+        with open(self._path(session_id), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def load(self, session_id: str):
+        messages, summary, summarized_upto = [], "", 0
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return messages, summary, summarized_upto
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("type") == "summary":
+                    summary, summarized_upto = record["summary"], record["summarized_upto"]
+                else:
+                    messages.append((record["role"], record["content"]))
+        return messages, summary, summarized_upto
+
+    def append(self, session_id: str, role: str, content: str):
+        self._write(session_id, {"type": "message", "role": role, "content": content})
+
+    def save_summary(self, session_id: str, summary: str, summarized_upto: int):
+        self._write(session_id, {"type": "summary", "summary": summary, "summarized_upto": summarized_upto})
+
+
+def _log_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("对话记忆写入失败：%r", future.exception())
+
+
+class ThreadedMemoryBackend(MemoryBackend):
+    """
+    在单独的线程中按顺序执行存储操作，SQLite 提交（fsync）和文件写入不阻塞事件循环。
+    写入提交后立即返回；读取排在之前提交的写入之后，会话被淘汰后重新加载时能读到全部已写入的消息。
+    """
+
+    def __init__(self, backend: MemoryBackend):
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-backend")
+
+    def load(self, session_id: str):
+        return self._executor.submit(self.backend.load, session_id).result()
+
+    async def aload(self, session_id: str):
+        return await asyncio.wrap_future(self._executor.submit(self.backend.load, session_id))
+
+    def append(self, session_id: str, role: str, content: str):
+        self._executor.submit(self.backend.append, session_id, role, content).add_done_callback(_log_failure)
+
+    def save_summary(self, session_id: str, summary: str, summarized_upto: int):
+        self._executor.submit(self.backend.save_summary, session_id, summary, summarized_upto) \
+            .add_done_callback(_log_failure)
+
+    def close(self):
+        # 等待排队中的写入完成
+        self._executor.shutdown(wait=True)
+        self.backend.close()
+
+
+class ConversationMemory:
+    """
+    单个会话的对话记忆。
+    传给模型的历史 = 更早对话的摘要 + 最近若干条消息，总 token 数控制在预算内。
+    超出预算时把窗口外的消息合并进摘要，并一次性把窗口收缩到预算的一半，
+    之后的若干轮不需要再次摘要，每轮的历史长度和耗时保持平稳。
+    """
+
+    def __init__(self,
+                 session_id: str,
+                 backend: Optional[MemoryBackend] = None,
+                 token_budget: int = 3000,
+                 summarize: Optional[SummarizeFn] = None):
+        self.session_id = session_id
+        self.backend = backend
+        self.token_budget = token_budget
+        self.summarize = summarize
+        # 尚未合并进摘要的 (消息, token 数)，token 数只在写入时计算一次；
+        # 合并进摘要的消息从内存中移除，_messages[0] 是会话的第 _summarized_upto 条消息
+        self._messages: List[Tuple[BaseMessage, int]] = []
+        self._summary = ""
+        self._summary_tokens = 0
+        self._summarized_upto = 0
+        self._loaded = backend is None
+
+    async def load(self):
+        """从存储中加载会话，在事件循环中应先调用 load，之后的 add 不会再同步读取存储"""
+        if not self._loaded:
+            self._apply(*await self.backend.aload(self.session_id))
+
+    def _load(self):
+        if not self._loaded:
+            self._apply(*self.backend.load(self.session_id))
+
+    def _apply(self, messages: List[Tuple[str, str]], summary: str, summarized_upto: int):
+        if self._loaded:
+            return
+        # 已经合并进摘要的消息不会再进入窗口，不需要加载
+        self._messages = [(_ROLES[role](content=content), count_tokens(content))
+                          for role, content in messages[summarized_upto:]]
+        self._set_summary(summary, summarized_upto)
+        self._loaded = True
+
+    def _set_summary(self, summary: str, summarized_upto: int):
+        self._summary = summary
+        self._summary_tokens = count_tokens(summary)
+        self._summarized_upto = summarized_upto
+
+    def add(self, role: str, content: str):
+        self._load()
+        self._messages.append((_ROLES[role](content=content), count_tokens(content)))
+        if self.backend is not None:
+            self.backend.append(self.session_id, role, content)
+
+    def add_user_message(self, content: str):
+        self.add("human", content)
+
+    def add_ai_message(self, content: str):
+        self.add("ai", content)
+
+    def _window_start(self, budget: int) -> int:
+        """从最新的消息往前取，返回预算内窗口在 _messages 中的起始下标（至少保留最后一条）"""
+        used, start = 0, len(self._messages)
+        while start > 0:
+            tokens = self._messages[start - 1][1]
+            if used + tokens > budget and start < len(self._messages):
+                break
+            used += tokens
+            start -= 1
+        return start
+
+    async def history(self) -> List[BaseMessage]:
+        await self.load()
+        start = self._window_start(self.token_budget - self._summary_tokens)
+        if start > 0:
+            # 超出预算：窗口收缩到预算的一半，窗口外的消息合并进摘要
+            start = self._window_start(self.token_budget // 2)
+            await self._compact(start)
+        messages = [message for message, _ in self._messages]
+        if self._summary:
+            messages.insert(0, HumanMessage(content=f"（以下为更早对话的摘要）{self._summary}"))
+        return messages
+
+    async def _compact(self, start: int):
+        dropped = [message for message, _ in self._messages[:start]]
+        summary = self._summary
+        if self.summarize is not None:
+            summary = await self.summarize(self._summary, dropped)
+        # 存储中的消息下标从会话开始计算
+        summarized_upto = self._summarized_upto + start
+        self._set_summary(summary, summarized_upto)
+        del self._messages[:start]
+        if self.backend is not None:
+            self.backend.save_summary(self.session_id, summary, summarized_upto)
+
+
+class MemoryStore:
+    """
+    按 session_id 管理对话记忆，内存中只保留最近使用的 max_sessions 个会话，其余按需从存储中加载。
+    没有配置存储时，被淘汰的会话丢失全部记忆，再次访问时从空白对话开始。
+    """
+
+    def __init__(self,
+                 backend: Optional[MemoryBackend] = None,
+                 token_budget: int = 3000,
+                 summarize: Optional[SummarizeFn] = None,
+                 max_sessions: int = 1024):
+        self.backend = ThreadedMemoryBackend(backend) if backend is not None else None
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+
+    def get(self, session_id: str) -> ConversationMemory:
+        memory = self._sessions.get(session_id)
+        if memory is None:
+            memory = ConversationMemory(session_id, self.backend, self.token_budget, self.summarize)
+            self._sessions[session_id] = memory
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return memory
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+
+
+def create_backend(kind: str, path: str) -> Optional[MemoryBackend]:
+    if kind == "sqlite":
+        return SQLiteMemoryBackend(path)
+    if kind == "jsonl":
+        return JsonlMemoryBackend(path)
+    return None
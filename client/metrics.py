@@ -0,0 +1,87 @@
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from client.tracing import registry, span
+
+
+class QueryMetrics:
+    """
+    单次查询的耗时和 token 指标。
+    ttft 为从收到问题到输出第一个回答 token 的时间，stages 记录各阶段（plan/param/tool/answer）每次调用的耗时。
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.stages: Dict[str, List[float]] = {}
+        self.tokens: Dict[str, int] = {"input_tokens": 0, "output_tokens": 0}
+
+    def mark_first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+        registry.observe("agent_query_duration_seconds", self.latency, "单次查询总耗时（秒）")
+        if self.ttft is not None:
+            registry.observe("agent_query_ttft_seconds", self.ttft, "单次查询首个回答 token 的耗时（秒）")
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages.setdefault(name, []).append(seconds)
+
+    def add_tokens(self, usage: dict):
+        for key in self.tokens:
+            self.tokens[key] += usage.get(key) or 0
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        return None if self.finished_at is None else self.finished_at - self.started_at
+
+    def to_dict(self) -> dict:
+        return {
+            "ttft": self.ttft,
+            "latency": self.latency,
+            "stages": {name: sum(values) for name, values in self.stages.items()},
+            "tokens": dict(self.tokens),
+        }
+
+
+# 当前查询的指标，查询内部的模型调用和工具调用通过它记录耗时，不需要层层传参
+current_metrics: ContextVar[Optional[QueryMetrics]] = ContextVar("current_metrics", default=None)
+
+
+@contextmanager
+def track_stage(name: str, **attributes):
+    """记录阶段耗时，同时作为调用链中的一个 span"""
+    started = time.perf_counter()
+    try:
+        with span(name, **attributes):
+            yield
+    finally:
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.add_stage(name, time.perf_counter() - started)
+
+
+def record_usage(usage: dict):
+    """作为 ModelAdapter 的 usage_callback，累计当前查询的 token 用量"""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.add_tokens(usage)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """最近秩法计算百分位数，p 取 0~100"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
@@ -0,0 +1,160 @@
+import math
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Tuple
+
+from agent_collections import ToolCallResult
+from client.shared_cache import SharedCache, content_key
+from client.tool_index import tokenize
+from client.tracing import record_cache
+
+_SPACE_PATTERN = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = "?？!！。.,，~～ "
+
+
+def normalize_query(query: str) -> str:
+    """去掉首尾空白和结尾标点、合并连续空白并转小写，用作精确匹配的 key"""
+    return _SPACE_PATTERN.sub(" ", query.strip().lower()).rstrip(_TRAILING_PUNCTUATION)
+
+
+def history_scope(history: list) -> str:
+    """
+    对话历史（摘要 + 最近的消息）的指纹，加入缓存范围：同样的追问（例如 "那明天呢？"）在不同的上下文中规划不同，
+    只在历史完全相同时复用；没有历史的第一轮对话返回空字符串，所有会话共享
+    """
+    if not history:
+        return ""
+    return content_key(*(f"{message.type}:{message.content}" for message in history))[:16]
+
+
+def _vectorize(text: str) -> Dict[str, float]:
+    counts = Counter(tokenize(text))
+    norm = math.sqrt(sum(value * value for value in counts.values()))
+    return {term: value / norm for term, value in counts.items()} if norm else {}
+
+
+def _cosine(left: Dict[str, float], right: Dict[str, float]) -> float:
+    if len(left) > len(right):
+        left, right = right, left
+    return sum(weight * right.get(term, 0.0) for term, weight in left.items())
+
+
+class PlanCache:
+    """
+    规划结果缓存：以 规范化后的问题 + 缓存范围（模型及提示词指纹、工具目录版本、对话历史指纹）为 key
+    缓存 ModelAdapter.create 解析后的 ToolCallResult。
+    支持精确匹配和相似度阈值匹配（只用于文本回答，见 _get_similar）、LRU/TTL 淘汰；传入 SharedCache 时作为二级缓存，多个进程共享且重启后仍可命中。
+    """
+
+    def __init__(self,
+                 max_size: int = 1024,
+                 ttl: Optional[float] = None,
+                 similarity_threshold: float = 1.0,
+                 store: Optional[SharedCache] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # 阈值为 1.0 时只做精确匹配
+        self.similarity_threshold = similarity_threshold
+        self.store = store
+        # key -> (plan, 写入时间, 问题向量)
+        self._entries: "OrderedDict[str, Tuple[ToolCallResult, float, Dict[str, float]]]" = OrderedDict()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(normalized_query: str, scope: str) -> str:
+        return f"{scope}:{normalized_query}"
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _remember(self, key: str, plan: ToolCallResult, created_at: float, normalized_query: str):
+        self._entries[key] = (plan, created_at, _vectorize(normalized_query))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, query: str, scope: str) -> Optional[ToolCallResult]:
+        normalized_query = normalize_query(query)
+        key = self._key(normalized_query, scope)
+        plan = self._get_exact(key)
+        outcome = "hit"
+        if plan is None and self.store is not None:
+            plan = self._get_shared(key, normalized_query)
+            outcome = "shared_hit"
+        if plan is None and self.similarity_threshold < 1.0:
+            plan = self._get_similar(normalized_query, scope)
+            if plan is not None:
+                self.similar_hits += 1
+                outcome = "similar_hit"
+        if plan is None:
+            self.misses += 1
+            record_cache("plan", "miss")
+            return None
+        self.hits += 1
+        record_cache("plan", outcome)
+        # 返回副本，避免调用方修改缓存中的对象
+        return plan.model_copy(deep=True)
+
+    def _get_exact(self, key: str) -> Optional[ToolCallResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[1]):
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _get_shared(self, key: str, normalized_query: str) -> Optional[ToolCallResult]:
+        # 进程内未命中时查询共享的磁盘缓存，命中后放入进程内缓存
+        entry = self.store.get(content_key("plan", key))
+        if entry is None:
+            return None
+        plan = ToolCallResult.model_validate(entry.value["plan"])
+        self._remember(key, plan, entry.value["created_at"], normalized_query)
+        return plan
+
+    def _get_similar(self, normalized_query: str, scope: str) -> Optional[ToolCallResult]:
+        """
+        相似问题只复用文本回答。工具调用的规划带有从问题中提取的参数，相似的问题参数往往不同：
+        "查询订单1122334455的状态" 与 "查询订单9988776655的状态" 的相似度为 0.92，
+        "北京到上海的机票" 与 "上海到北京的机票" 的相似度为 0.85，复用会查询或预订错误的对象，所以只做精确匹配。
+        """
+        query_vector = _vectorize(normalized_query)
+        prefix = f"{scope}:"
+        best_key, best_score = None, self.similarity_threshold
+        for key, (plan, created_at, vector) in self._entries.items():
+            if plan.type != "text" or not key.startswith(prefix) or self._expired(created_at):
+                continue
+            score = _cosine(query_vector, vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][0]
+
+    def put(self, query: str, scope: str, plan: ToolCallResult):
+        normalized_query = normalize_query(query)
+        key = self._key(normalized_query, scope)
+        created_at = time.time()
+        self._remember(key, plan.model_copy(deep=True), created_at, normalized_query)
+        if self.store is not None:
+            # 磁盘缓存的过期时间由 SharedCache 处理，总大小按字节数限制
+            self.store.put(content_key("plan", key), "plan",
+                           {"plan": plan.model_dump(mode="json"), "created_at": created_at}, self.ttl)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,100 @@
+import json
+import re
+from typing import Dict, List, Optional
+
+from client.tool_index import ToolIndex
+
+# 路由结果
+ROUTE_DIRECT = "direct"          # 闲聊、问候等，不需要工具，用简短提示词直接回答
+ROUTE_SINGLE_TOOL = "single_tool"  # 只涉及一个工具，规划时只放入这个工具
+ROUTE_CHAIN = "chain"            # 涉及多个工具
+ROUTE_PLAN = "plan"              # 无法判断，交给完整的规划流程
+ROUTES = [ROUTE_DIRECT, ROUTE_SINGLE_TOOL, ROUTE_CHAIN, ROUTE_PLAN]
+
+DEFAULT_SMALL_TALK = ["你好", "您好", "嗨", "哈喽", "在吗", "谢谢", "谢谢你", "谢谢您", "多谢", "感谢", "再见", "拜拜",
+                      "晚安", "早上好", "中午好", "晚上好", "你是谁", "你叫什么", "你能做什么", "hi", "hello", "hey",
+                      "thanks", "thanks a lot", "thank you", "bye", "good morning", "good night"]
+# 多个步骤的连接词，出现时即使只识别出一个工具也交给完整的规划流程
+_CHAIN_PATTERN = re.compile(r"并且|然后|之后|以后|接着|顺便|同时|再帮|再查|以及|\band then\b|\bthen\b")
+# 计算相似度前去掉的英文停用词和数字（订单号、日期等），避免它们让无关的工具超过阈值
+_STOPWORD_PATTERN = re.compile(r"\b(?:a|an|the|of|to|in|on|at|for|from|by|with|and|or|is|are|was|be|do|does|i|me|"
+                               r"my|you|your|it|this|that|what|how|please|can|could|would)\b|\d+")
+# 判断闲聊时忽略的语气词和标点
+_FILLER_PATTERN = re.compile(r"[\s啊呀呢吗嘛吧哦哈~～!！?？,，.。、]+")
+
+
+def parse_keywords(spec: str) -> Dict[str, List[str]]:
+    """解析 JSON 形式的 工具名称 -> 关键词列表，例如 {"weather_search": ["天气", "气温"]}"""
+    return {name: [keyword.lower() for keyword in keywords] for name, keywords in json.loads(spec).items()} \
+        if spec else {}
+
+
+class RouteDecision:
+
+    def __init__(self, route: str, tools: Optional[List[str]] = None, reason: str = ""):
+        self.route = route
+        self.tools = tools or []
+        self.reason = reason
+
+    def __repr__(self):
+        return f"RouteDecision(route={self.route!r}, tools={self.tools!r}, reason={self.reason!r})"
+
+
+class QueryRouter:
+    """
+    规划前的本地路由，不调用模型：
+    - 按工具关键词和工具目录的 TF-IDF 相似度找出问题涉及的工具；
+    - 没有涉及任何工具且是简短的问候、致谢等闲聊时直接回答；
+    - 只涉及一个工具且没有多步骤的连接词时按单工具处理，规划提示词中只放入这个工具；
+    - 其他情况（多个工具或无法判断）交给完整的规划流程。
+    误判为 direct 的代价最高（该调用的工具没有调用），所以只在把握较大时返回 direct。
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, List[str]]] = None, small_talk: Optional[List[str]] = None,
+                 min_score: float = 0.2, max_small_talk_chars: int = 12):
+        self.keywords = keywords or {}
+        # 去掉语气词和标点后比较，例如 "thank you" -> "thankyou"
+        self.small_talk = {_FILLER_PATTERN.sub("", item.lower()) for item in (small_talk or DEFAULT_SMALL_TALK)}
+        self.small_talk.discard("")
+        self.min_score = min_score
+        self.max_small_talk_chars = max_small_talk_chars
+        self.index = ToolIndex()
+        self.tool_names: List[str] = []
+
+    def load(self, tools: List[dict], version: str):
+        """工具目录变化时重建索引"""
+        if self.index.version == version:
+            return
+        self.index.build(tools, version)
+        self.tool_names = [tool["name"] for tool in tools]
+
+    def candidate_tools(self, query: str) -> List[str]:
+        text = query.lower()
+        names = [name for name in self.tool_names if any(keyword in text for keyword in self.keywords.get(name, []))]
+        for score, name in self.index.scores(_STOPWORD_PATTERN.sub(" ", text)):
+            if score < self.min_score:
+                break
+            if name not in names:
+                names.append(name)
+        return names
+
+    def is_small_talk(self, query: str) -> bool:
+        """去掉语气词和标点后，问题完全由闲聊短语拼接而成，例如 "你好啊"、"谢谢，再见"；"你好，小米su7怎么样" 不算"""
+        text = _FILLER_PATTERN.sub("", query.lower())
+        if not text or len(text) > self.max_small_talk_chars:
+            return False
+        # reachable[i] 表示前 i 个字符可以切分成若干个闲聊短语
+        reachable = [True] + [False] * len(text)
+        for end in range(1, len(text) + 1):
+            reachable[end] = any(reachable[start] and text[start:end] in self.small_talk for start in range(end))
+        return reachable[-1]
+
+    def route(self, query: str) -> RouteDecision:
+        tools = self.candidate_tools(query)
+        if not tools:
+            if self.is_small_talk(query):
+                return RouteDecision(ROUTE_DIRECT, reason="small_talk")
+            return RouteDecision(ROUTE_PLAN, reason="no_tool_matched")
+        if len(tools) == 1 and not _CHAIN_PATTERN.search(query.lower()):
+            return RouteDecision(ROUTE_SINGLE_TOOL, tools, reason="one_tool_matched")
+        return RouteDecision(ROUTE_CHAIN, tools, reason="multiple_tools" if len(tools) > 1 else "chain_words")
@@ -0,0 +1,161 @@
+"""
+工具结果压缩：工具返回的完整内容写入 ResultStore，拼接到提示词中的只是压缩后的版本。
+
+- 参数生成：按当前节点 input_schema 的参数名挑出相关字段（JSON）或相关段落（文本），再截断到 token 预算；
+- 最终回答：只按 token 预算截断；
+压缩后的结果末尾附上完整内容的引用（result://...），可以通过 ResultStore 或网关的 GET /results/{id} 取回。
+引用属于生成它的会话，只能用同一个 session_id 取回。
+"""
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set, Tuple
+
+from agent_collections import ToolResultItem
+from client.tokens import count_tokens, truncate_tokens
+from client.tracing import registry
+
+REFERENCE_PREFIX = "result://"
+
+# 当前查询所属的会话，压缩结果时作为引用的归属，调用链中的节点不需要层层传参
+current_session: ContextVar[str] = ContextVar("current_session", default="")
+
+
+class ResultStore:
+    """
+    按 会话 + 内容 寻址的完整工具结果，只在内存中保留最近的 max_size 条。
+    id 由会话和内容共同计算，不知道会话时无法由内容推算，取回时还需要提供同一个会话。
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        # id -> (会话, 完整结果)
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+    def put(self, text: str, session_id: str = "") -> str:
+        key = hashlib.sha256(f"{session_id}\x1f{text}".encode("utf-8")).hexdigest()[:32]
+        self._entries[key] = (session_id, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return REFERENCE_PREFIX + key
+
+    def get(self, reference: str, session_id: str = "") -> Optional[str]:
+        key = reference[len(REFERENCE_PREFIX):] if reference.startswith(REFERENCE_PREFIX) else reference
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != session_id:
+            return None
+        return entry[1]
+
+
+def schema_terms(node_info: Optional[dict]) -> Set[str]:
+    """input_schema 中的参数名及其拆分出的单词，例如 departure_city -> {departure_city, departure, city}"""
+    properties = ((node_info or {}).get("input_schema") or {}).get("properties") or {}
+    terms = set()
+    for name, spec in properties.items():
+        terms.add(name.lower())
+        terms.update(part for part in re.split(r"[_\W]+", name.lower()) if len(part) > 1)
+        title = (spec or {}).get("title") if isinstance(spec, dict) else None
+        if title:
+            terms.update(part for part in re.split(r"[_\W]+", title.lower()) if len(part) > 1)
+    return terms
+
+
+def _related_key(key: str, terms: Set[str]) -> bool:
+    key = key.lower()
+    return any(term in key or key in term for term in terms)
+
+
+def _select_json(value, terms: Set[str]):
+    """保留 key 与参数名相关的字段；一个都不相关时保留原值"""
+    if isinstance(value, dict):
+        selected = {key: item for key, item in value.items() if _related_key(str(key), terms)}
+        return selected or value
+    if isinstance(value, list):
+        return [_select_json(item, terms) for item in value]
+    return value
+
+
+def _select_text(text: str, terms: Set[str], budget: int) -> str:
+    """按段落（没有空行时按行）切分，优先保留包含参数名的段落，输出时保持原有顺序"""
+    segments = [segment for segment in re.split(r"\n\s*\n" if "\n\n" in text else r"\n", text) if segment.strip()]
+    if len(segments) <= 1:
+        return text
+    scores = [sum(1 for term in terms if term in segment.lower()) for segment in segments]
+    order = sorted(range(len(segments)), key=lambda index: (-scores[index], index))
+    kept, used = set(), 0
+    for index in order:
+        tokens = count_tokens(segments[index])
+        if used + tokens > budget:
+            continue
+        kept.add(index)
+        used += tokens
+    if not kept:
+        return text
+    separator = "\n\n" if "\n\n" in text else "\n"
+    return separator.join(segments[index] for index in sorted(kept))
+
+
+class ResultCompactor:
+    """
+    param_budget / answer_budget 为参数生成的调用链历史、最终回答的全部工具结果的 token 上限，0 表示不压缩。
+    预算按结果条数平分，每条至少 min_budget；结果多到每条分不到 min_budget 时，最新的结果各自保留一份预算，
+    更早的结果合并为一条、共用一份预算，调用链再长，单次提示词中的工具结果也不会超出预算。
+    """
+
+    def __init__(self, store: ResultStore, param_budget: int = 0, answer_budget: int = 0, min_budget: int = 64):
+        self.store = store
+        self.param_budget = param_budget
+        self.answer_budget = answer_budget
+        self.min_budget = min_budget
+
+    def _fit(self, results: List[ToolResultItem], budget: int) -> Tuple[List[ToolResultItem], int]:
+        """返回按预算调整后的结果和每条结果的预算，条数 × 每条预算不超过总预算"""
+        if budget <= 0 or not results:
+            return results, budget
+        if len(results) * self.min_budget <= budget:
+            return results, budget // len(results)
+        slots = max(1, budget // self.min_budget)
+        newest = slots - 1
+        older = results[:len(results) - newest]
+        # 合并后的完整内容同样写入 ResultStore，压缩后只保留开头部分和引用
+        merged = ToolResultItem(name="、".join(dict.fromkeys(item.name for item in older)),
+                                result="\n\n".join(f"[{item.name}]\n{item.result}" for item in older))
+        registry.inc("agent_tool_result_merged_total", len(older), "预算不足时合并为一条的较早工具结果条数")
+        return [merged] + results[len(results) - newest:], budget // slots
+
+    def compact(self, text: str, budget: int, node_info: Optional[dict] = None) -> str:
+        if budget <= 0:
+            return text
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            return text
+        reference = self.store.put(text, current_session.get())
+        terms = schema_terms(node_info)
+        compacted = text
+        if terms:
+            try:
+                value = json.loads(text)
+            except ValueError:
+                compacted = _select_text(text, terms, budget)
+            else:
+                compacted = json.dumps(_select_json(value, terms), ensure_ascii=False, separators=(",", ":"))
+        suffix = f"\n……（结果已压缩，完整内容见 {reference}）"
+        # 引用说明同样计入预算
+        compacted = truncate_tokens(compacted, max(1, budget - count_tokens(suffix)))
+        registry.inc("agent_tool_result_compacted_total", 1, "压缩过的工具结果条数")
+        registry.inc("agent_tool_result_saved_tokens_total", tokens - count_tokens(compacted),
+                     "工具结果压缩节省的 token 数")
+        return compacted + suffix
+
+    def for_params(self, results: List[ToolResultItem], node_info: Optional[dict]) -> List[Dict[str, str]]:
+        """参数生成时看到的调用链历史"""
+        results, budget = self._fit(results, self.param_budget)
+        return [{"name": item.name, "result": self.compact(item.result, budget, node_info)} for item in results]
+
+    def for_answer(self, results: List[ToolResultItem]) -> List[ToolResultItem]:
+        """生成最终回答时使用的工具结果"""
+        results, budget = self._fit(results, self.answer_budget)
+        return [ToolResultItem(name=item.name, result=self.compact(item.result, budget)) for item in results]
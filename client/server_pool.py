@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+
+from client.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# 打开一个已初始化的会话：(message_handler) -> 异步上下文管理器，进入后得到 ClientSession
+SessionFactory = Callable[..., AsyncContextManager[ClientSession]]
+
+
+def server_parameters(server_script_path: str) -> StdioServerParameters:
+    is_python = server_script_path.endswith('.py')
+    is_js = server_script_path.endswith('.js')
+    if not (is_python or is_js):
+        raise ValueError("Server script must be a .py or .js file")
+
+    command = "python" if is_python else "node"
+    return StdioServerParameters(
+        command=command,
+        args=[server_script_path],
+        env=None
+    )
+
+
+def is_server_url(server_path: str) -> bool:
+    return server_path.startswith(("http://", "https://"))
+
+
+def sse_session_factory(url: str) -> SessionFactory:
+    """通过 SSE 连接已经在运行的 MCP 服务（例如 server/warm_pool.py 预热的服务），不需要启动进程"""
+    # 只有配置了 URL 时才导入 SSE 客户端
+    from mcp.client.sse import sse_client
+
+    @asynccontextmanager
+    async def open_session(message_handler=None):
+        async with sse_client(url) as (read, write):
+            async with ClientSession(read, write, message_handler=message_handler) as session:
+                await session.initialize()
+                yield session
+
+    return open_session
+
+
+def stdio_session_factory(server_params: StdioServerParameters) -> SessionFactory:
+    """通过子进程 stdio 连接 MCP 服务"""
+    @asynccontextmanager
+    async def open_session(message_handler=None):
+        async with stdio_client(server_params) as (read, write):
+            async with ClientSession(read, write, message_handler=message_handler) as session:
+                await session.initialize()
+                yield session
+
+    return open_session
+
+
+class ServerConnection:
+    """
+    单个 MCP 服务的会话（stdio 时对应一个服务进程）。
+    stdio_client 内部使用 anyio 任务组，进入和退出必须在同一个任务里，
+    所以每个连接在独立的后台任务中持有上下文，直到 close() 被调用。
+    会话失效（服务进程退出、传输层报错）后连接标记为不可用，并在后台按指数退避重连。
+    """
+
+    def __init__(self, open_session: SessionFactory, message_handler=None,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.open_session = open_session
+        self.message_handler = message_handler
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.healthy = False
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self):
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready, self._stop))
+        await ready
+        self.healthy = True
+
+    async def _run(self, ready: asyncio.Future, stop: asyncio.Event):
+        try:
+            async with self.open_session(message_handler=self.message_handler) as session:
+                self.session = session
+                ready.set_result(None)
+                await stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            elif not isinstance(e, asyncio.CancelledError):
+                logger.error("MCP 服务连接异常退出: %r", e)
+                self.mark_failed(e)
+        finally:
+            self.session = None
+
+    def mark_failed(self, error: BaseException):
+        """标记连接不可用，选择连接时跳过，并在后台重连"""
+        if not self.healthy or self._closed:
+            return
+        self.healthy = False
+        logger.warning("MCP 服务连接失效，后台重连: %r", error)
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = self.reconnect_delay
+        while not self._closed:
+            await self._stop_session()
+            try:
+                await self.start()
+                logger.info("MCP 服务连接已恢复")
+                return
+            except Exception as e:
+                logger.warning("MCP 服务重连失败，%.1fs 后重试: %r", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _stop_session(self):
+        if self._stop is not None:
+            self._stop.set()
+        if self._task is not None:
+            await self._task
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> types.CallToolResult:
+        if self.session is None:
+            raise RuntimeError("MCP 服务连接已关闭")
+        self.in_flight += 1
+        try:
+            return await self.session.call_tool(tool_name, arguments)
+        except McpError:
+            # 服务端返回的错误响应，会话本身仍然可用
+            raise
+        except Exception as e:
+            self.mark_failed(e)
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def close(self):
+        self._closed = True
+        self.healthy = False
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+        await self._stop_session()
+
+
+class MCPServer:
+    """一个 MCP 服务及其会话池，调用时在可用的会话中选择当前并发最少的"""
+
+    def __init__(self, name: str, open_session: SessionFactory, pool_size: int = 1, message_handler=None,
+                 reconnect_delay: float = 1.0):
+        self.name = name
+        self.connections = [ServerConnection(open_session, message_handler, reconnect_delay)
+                            for _ in range(max(1, pool_size))]
+
+    async def start(self):
+        await asyncio.gather(*(connection.start() for connection in self.connections))
+
+    def _healthy_connections(self) -> List[ServerConnection]:
+        connections = [item for item in self.connections if item.healthy]
+        if not connections:
+            raise RuntimeError(f"MCP 服务 {self.name} 没有可用的连接，正在后台重连")
+        return connections
+
+    async def list_tools(self) -> List[types.Tool]:
+        response = await self._healthy_connections()[0].session.list_tools()
+        return response.tools
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> types.CallToolResult:
+        connection = min(self._healthy_connections(), key=lambda item: item.in_flight)
+        return await connection.call_tool(tool_name, arguments)
+
+    async def close(self):
+        await asyncio.gather(*(connection.close() for connection in self.connections), return_exceptions=True)
+
+
+class ServerPool:
+    """
+    同时连接多个 MCP 服务，合并各服务的工具为统一命名空间，并把工具调用路由到所属服务。
+    工具重名时先配置的服务保留原名，后面的服务使用 "服务名_工具名"。
+    """
+
+    def __init__(self, pool_size: int = 1, message_handler=None):
+        self.pool_size = pool_size
+        self.message_handler = message_handler
+        self.servers: Dict[str, MCPServer] = {}
+        # 对外的工具名 -> (服务名, 服务内的工具名)
+        self.routes: Dict[str, Tuple[str, str]] = {}
+
+    @staticmethod
+    def server_name(server_script_path: str) -> str:
+        if is_server_url(server_script_path):
+            # URL 可以用 #服务名 指定名称，例如 http://127.0.0.1:8101/sse#search_tool
+            url = urlparse(server_script_path)
+            return url.fragment or url.netloc.replace(":", "_")
+        return os.path.splitext(os.path.basename(server_script_path))[0]
+
+    async def connect(self, server_script_paths: List[str]):
+        """并发连接所有服务：服务脚本通过 stdio 启动子进程，http(s) 地址通过 SSE 连接"""
+        factories = {}
+        for path in server_script_paths:
+            name = self.server_name(path)
+            if name in factories:
+                raise ValueError(f"MCP 服务名称重复: {name}")
+            if is_server_url(path):
+                factories[name] = sse_session_factory(urlparse(path)._replace(fragment="").geturl())
+            else:
+                factories[name] = stdio_session_factory(server_parameters(path))
+        await self.connect_sessions(factories)
+
+    async def connect_sessions(self, factories: Dict[str, SessionFactory]):
+        """按 服务名 -> 会话工厂 并发连接，除 stdio 外也可以接入进程内的内存会话"""
+        servers = []
+        for name, open_session in factories.items():
+            if name in self.servers:
+                raise ValueError(f"MCP 服务名称重复: {name}")
+            servers.append(MCPServer(name, open_session, self.pool_size, self.message_handler))
+        results = await asyncio.gather(*(server.start() for server in servers), return_exceptions=True)
+        for server, result in zip(servers, results):
+            if isinstance(result, BaseException):
+                await asyncio.gather(*(item.close() for item in servers), return_exceptions=True)
+                raise result
+            self.servers[server.name] = server
+
+    async def list_tools(self) -> types.ListToolsResult:
+        with span("mcp.list_tools", servers=len(self.servers)) as item:
+            server_tools = await asyncio.gather(*(server.list_tools() for server in self.servers.values()))
+            item.set_attribute("tools", sum(len(tools) for tools in server_tools))
+        routes, tools = {}, []
+        for server, items in zip(self.servers.values(), server_tools):
+            for tool in items:
+                exposed_name = tool.name
+                if exposed_name in routes:
+                    exposed_name = f"{server.name}_{tool.name}"
+                    logger.warning("工具名称冲突：%s 的 %s 重命名为 %s", server.name, tool.name, exposed_name)
+                routes[exposed_name] = (server.name, tool.name)
+                tools.append(tool.model_copy(update={"name": exposed_name}))
+        self.routes = routes
+        return types.ListToolsResult(tools=tools)
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> types.CallToolResult:
+        route = self.routes.get(tool_name)
+        if route is None:
+            raise ValueError(f"未知的工具: {tool_name}")
+        server_name, original_name = route
+        with span("mcp.call_tool", tool=tool_name, server=server_name) as item:
+            result = await self.servers[server_name].call_tool(original_name, arguments)
+            item.set_attribute("is_error", bool(result.isError))
+            return result
+
+    async def close(self):
+        await asyncio.gather(*(server.close() for server in self.servers.values()), return_exceptions=True)
+        self.servers.clear()
+        self.routes.clear()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, NamedTuple, Optional
+
+from client.tracing import registry
+
+logger = logging.getLogger(__name__)
+
+# 访问时间的更新间隔（秒）：命中时不必每次都写库，淘汰顺序近似 LRU
+_TOUCH_INTERVAL = 60.0
+# 每写入多少次检查一次总大小
+_TRIM_EVERY = 64
+
+
+def content_key(*parts: str) -> str:
+    """按内容生成缓存 key，例如 (命名空间, 模型及提示词指纹, 工具目录版本, 规范化后的问题)"""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def encode_value(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_value(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+class CachedValue(NamedTuple):
+    value: Any
+    # 过期时间（time.time()），None 表示不过期
+    expires_at: Optional[float]
+
+
+class SharedCache:
+    """
+    同一台机器上多个客户端进程（网关的多个 worker）共用的磁盘缓存，进程重启后仍可命中。
+    基于 SQLite WAL：读写可以跨进程并发，读取通过 mmap 进行；值为 zlib 压缩的紧凑 JSON，
+    总大小超过 max_bytes 时按最近访问时间淘汰到 90%，过期条目在读取和整理时删除。
+
+    get / put 在事件循环中同步执行，只在其他进程持有写锁时才可能等待：等待上限为 busy_timeout（默认 50ms），
+    超时（database is locked）按未命中处理、写入直接跳过，不会长时间阻塞网关；
+    按大小淘汰需要扫描全表，在后台线程中用独立的连接执行，等待上限为 trim_timeout。
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, busy_timeout: float = 0.05,
+                 trim_timeout: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.trim_timeout = trim_timeout
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 多个 worker 同时启动时建表需要排队，初始化完成后再缩短等待时间
+        self.conn = self._connect(trim_timeout)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self.conn.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        self._writes = 0
+        self._trim_thread: Optional[threading.Thread] = None
+        self.evictions = 0
+
+    def _connect(self, timeout: float) -> sqlite3.Connection:
+        # 自动提交模式，每条语句是一个独立的短事务，写锁持有时间最短
+        conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 只在检查点时同步磁盘，掉电最多丢失最近的缓存写入
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={self.max_bytes}")
+        return conn
+
+    @staticmethod
+    def _busy(operation: str, error: sqlite3.OperationalError):
+        registry.inc("agent_shared_cache_busy_total", 1, "共享缓存等待锁超时、按未命中处理的次数", operation=operation)
+        logger.debug("共享缓存%s跳过：%s", operation, error)
+
+    def get(self, key: str) -> Optional[CachedValue]:
+        try:
+            row = self.conn.execute("SELECT value, expires_at, accessed_at FROM cache WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                self.delete(key)
+                return None
+            if now - accessed_at > _TOUCH_INTERVAL:
+                self.conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.OperationalError as e:
+            self._busy("get", e)
+            return None
+        return CachedValue(decode_value(value), expires_at)
+
+    def put(self, key: str, namespace: str, value: Any, ttl: Optional[float] = None):
+        data = encode_value(value)
+        now = time.time()
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, namespace, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, data, len(data), now + ttl if ttl is not None else None, now))
+        except sqlite3.OperationalError as e:
+            self._busy("put", e)
+            return
+        registry.inc("agent_shared_cache_bytes_written_total", len(data), "共享缓存写入的字节数（压缩后）",
+                     namespace=namespace)
+        self._writes += 1
+        if self._writes % _TRIM_EVERY == 0:
+            self._trim_in_background()
+
+    def delete(self, key: str):
+        self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def size_bytes(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        return (conn or self.conn).execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def _trim_in_background(self):
+        # 同一时间最多一个整理线程，上一次还没结束时跳过
+        if self._trim_thread is not None and self._trim_thread.is_alive():
+            return
+        self._trim_thread = threading.Thread(target=self._trim_worker, name="shared-cache-trim", daemon=True)
+        self._trim_thread.start()
+
+    def _trim_worker(self):
+        # sqlite3 连接不能跨线程使用，每次整理使用独立的连接
+        try:
+            conn = self._connect(self.trim_timeout)
+            try:
+                self.trim(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("共享缓存整理失败：%s", e)
+
+    def trim(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """删除过期条目，总大小超出上限时按最近访问时间淘汰到上限的 90%，返回删除的条数"""
+        conn = conn or self.conn
+        removed = conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                               (time.time(),)).rowcount
+        if self.size_bytes(conn) > self.max_bytes:
+            # 按访问时间从新到旧累加大小，超出目标大小的部分整体删除
+            removed += conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total FROM cache"
+                ") WHERE total > ?)", (int(self.max_bytes * 0.9),)).rowcount
+        if removed:
+            self.evictions += removed
+            registry.inc("agent_shared_cache_evictions_total", removed, "共享缓存淘汰的条目数")
+        return removed
+
+    def close(self):
+        if self._trim_thread is not None:
+            self._trim_thread.join()
+        self.conn.close()
@@ -0,0 +1,52 @@
+import os
+from functools import lru_cache
+
+# tiktoken 的编码名称，可通过环境变量覆盖
+encoding_name = os.environ.get("TOKEN_ENCODING", "cl100k_base")
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception:
+        # 没有安装 tiktoken 或无法下载编码文件时退化为估算
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """统计文本的 token 数，tiktoken 不可用时按字符数估算"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # 中文约 1 字 1 token，英文约 4 个字符 1 token
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """截取文本开头不超过 budget 个 token 的部分"""
+    if budget <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        # 截断处可能落在多字节字符中间，decode 时替换掉不完整的字符
+        return encoding.decode(tokens[:budget]).rstrip("�")
+    used = 0
+    ascii_run = 0
+    for index, char in enumerate(text):
+        if ord(char) < 128:
+            ascii_run += 1
+            if ascii_run % 4 == 1:
+                used += 1
+        else:
+            used += 1
+        if used > budget:
+            return text[:index]
+    return text
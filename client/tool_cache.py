@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from client.shared_cache import SharedCache, content_key
+from client.tracing import record_cache
+
+CallToolFn = Callable[[str, dict], Awaitable[str]]
+
+
+def canonical_arguments(arguments: Optional[dict]) -> str:
+    """参数规范化：key 排序、去掉多余空白，保证相同参数得到相同的缓存 key"""
+    return json.dumps(arguments or {}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """解析 "weather_search=300,google_search=600" 形式的按工具配置的缓存时间"""
+    ttls = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        name, ttl = item.split("=", 1)
+        ttls[name.strip()] = float(ttl)
+    return ttls
+
+
+class ToolResultCache:
+    """
+    工具结果缓存：以 工具名称 + 规范化参数 为 key，只缓存显式配置了 TTL 的工具，
+    book_flight 这类有副作用的工具不配置即永远不会被缓存。
+    同一个可缓存调用并发到达时合并为一次上游请求。
+    传入 SharedCache 时作为二级缓存，其他进程写入的结果也能命中，过期时间与写入时一致。
+    """
+
+    def __init__(self, ttls: Dict[str, float], max_size: int = 1024, store: Optional[SharedCache] = None):
+        self.ttls = ttls
+        self.max_size = max_size
+        self.store = store
+        # key -> (结果, 过期时间)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return self.ttls.get(tool_name, 0) > 0
+
+    def _get(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: Tuple[str, str], result: str, ttl: Optional[float] = None):
+        self._entries[key] = (result, time.monotonic() + (ttl if ttl is not None else self.ttls[key[0]]))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _get_shared(self, key: Tuple[str, str], scope: str) -> Optional[str]:
+        entry = self.store.get(content_key("tool_result", scope, *key))
+        if entry is None:
+            return None
+        # 按共享缓存中剩余的有效期放入进程内缓存
+        self._put(key, entry.value, entry.expires_at - time.time() if entry.expires_at is not None else None)
+        return entry.value
+
+    async def call(self, tool_name: str, arguments: dict, call_tool: CallToolFn, scope: str = "") -> str:
+        """scope 为工具目录版本，工具定义变化后共享缓存中的旧结果不再命中"""
+        if not self.is_cacheable(tool_name):
+            return await call_tool(tool_name, arguments)
+        key = (tool_name, canonical_arguments(arguments))
+        result = self._get(key)
+        outcome = "hit"
+        if result is None and self.store is not None:
+            result = self._get_shared(key, scope)
+            outcome = "shared_hit"
+        if result is not None:
+            self.hits += 1
+            record_cache("tool_result", outcome)
+            return result
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            record_cache("tool_result", "miss")
+            task = asyncio.create_task(self._fetch(key, arguments, call_tool, scope))
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+            record_cache("tool_result", "coalesced")
+        # shield：某个等待方被取消时不影响其他等待同一结果的调用
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: Tuple[str, str], arguments: dict, call_tool: CallToolFn, scope: str) -> str:
+        try:
+            result = await call_tool(key[0], arguments)
+            self._put(key, result)
+            if self.store is not None:
+                self.store.put(content_key("tool_result", scope, *key), "tool_result", result, self.ttls[key[0]])
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
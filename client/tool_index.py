@@ -0,0 +1,112 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """英文按单词切分（下划线拆开），中文按单字和相邻双字切分"""
+    text = (text or "").lower()
+    tokens = _WORD_PATTERN.findall(text.replace("_", " "))
+    for segment in _CJK_PATTERN.findall(text):
+        tokens.extend(segment)
+        tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+def tool_document(tool: dict) -> str:
+    """把工具名称、描述和 input_schema 中的参数信息拼成检索用的文本"""
+    parts = [tool.get("name") or "", tool.get("description") or ""]
+    schema = tool.get("input_schema") or {}
+    for name, prop in (schema.get("properties") or {}).items():
+        parts.append(name)
+        if isinstance(prop, dict):
+            parts.append(str(prop.get("title") or ""))
+            parts.append(str(prop.get("description") or ""))
+    return " ".join(parts)
+
+
+def _normalize(weights: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(value * value for value in weights.values()))
+    if norm == 0:
+        return {}
+    return {term: value / norm for term, value in weights.items()}
+
+
+class ToolIndex:
+    """
+    基于 TF-IDF 的本地工具检索索引，只把和问题最相关的 top-k 个工具交给规划模型。
+    索引按工具目录版本持久化到磁盘，目录未变化时直接加载。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.version = ""
+        self.idf: Dict[str, float] = {}
+        self.vectors: Dict[str, Dict[str, float]] = {}
+
+    def build(self, tools: List[dict], version: str = ""):
+        documents = {tool["name"]: Counter(tokenize(tool_document(tool))) for tool in tools}
+        document_frequency = Counter()
+        for counts in documents.values():
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.vectors = {
+            name: _normalize({term: (1 + math.log(tf)) * self.idf[term] for term, tf in counts.items()})
+            for name, counts in documents.items()
+        }
+        self.version = version
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "idf": self.idf, "vectors": self.vectors}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self, version: str) -> bool:
+        """磁盘上的索引版本与当前工具目录一致时加载并返回 True"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != version:
+            return False
+        self.version, self.idf, self.vectors = data["version"], data["idf"], data["vectors"]
+        return True
+
+    def load_or_build(self, tools: List[dict], version: str):
+        if self.version == version:
+            return
+        if not self.load(version):
+            self.build(tools, version)
+            self.save()
+
+    def scores(self, query: str) -> List[Tuple[float, str]]:
+        """返回 (相似度, 工具名称)，只包含相似度大于 0 的工具，按相似度从高到低排序"""
+        counts = Counter(term for term in tokenize(query) if term in self.idf)
+        query_vector = _normalize({term: (1 + math.log(tf)) * self.idf[term] for term, tf in counts.items()})
+        if not query_vector:
+            return []
+        scores = []
+        for name, vector in self.vectors.items():
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query_vector.items())
+            if score > 0:
+                scores.append((score, name))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        return scores
+
+    def search(self, query: str, k: int) -> List[str]:
+        """返回相似度大于 0 的前 k 个工具名称"""
+        return [name for _, name in self.scores(query)[:k]]
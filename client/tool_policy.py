@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from client.tracing import current_span, registry
+
+logger = logging.getLogger(__name__)
+
+CallToolFn = Callable[[str, dict], Awaitable[str]]
+
+
+class ToolCallError(Exception):
+    """工具调用失败（超时、熔断、服务端返回错误等），错误信息会作为工具结果交给模型"""
+    pass
+
+
+class ToolPolicy:
+    """
+    单个工具的调用策略：
+    - max_concurrency：同时进行的调用数上限，0 表示不限制；
+    - timeout：单次调用的截止时间（秒），包含排队和重试，None 表示不限制；
+    - retries：失败后的最大重试次数，只对 idempotent 为 True 的工具生效，按指数退避加随机抖动等待；
+    - retry_ratio：重试预算，每次调用积累 retry_ratio 次重试额度，上游大面积故障时限制重试流量；
+    - failure_threshold：连续失败多少次后熔断，0 表示不熔断；熔断 reset_timeout 秒后放行一次试探调用。
+    """
+
+    def __init__(self, max_concurrency: int = 0, timeout: Optional[float] = None, retries: int = 0,
+                 idempotent: bool = False, backoff: float = 0.2, max_backoff: float = 2.0, retry_ratio: float = 0.2,
+                 failure_threshold: int = 0, reset_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries if idempotent else 0
+        self.idempotent = idempotent
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_ratio = retry_ratio
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_dict(cls, value: dict) -> "ToolPolicy":
+        return cls(**value)
+
+
+def parse_policies(spec: str) -> Dict[str, ToolPolicy]:
+    """
+    解析 JSON 形式的按工具配置的调用策略，"*" 为未单独配置的工具使用的默认策略，例如：
+    {"*": {"timeout": 30}, "google_search": {"timeout": 10, "retries": 2, "idempotent": true, "failure_threshold": 5}}
+    """
+    if not spec:
+        return {}
+    return {name: ToolPolicy.from_dict(value) for name, value in json.loads(spec).items()}
+
+
+class CircuitBreaker:
+    """连续失败达到阈值后打开，期间直接拒绝调用；超过 reset_timeout 后放行一次试探调用，成功则关闭"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """试探调用被取消时不计结果，下次调用重新试探"""
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class RetryBudget:
+    """每次调用存入 ratio 个重试额度，每次重试取出 1 个；额度上限为 min_tokens，保证低流量时也能重试"""
+
+    def __init__(self, ratio: float, min_tokens: float = 10):
+        self.ratio = ratio
+        self.max_tokens = min_tokens
+        self.tokens = min_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class _ToolState:
+
+    def __init__(self, policy: ToolPolicy):
+        self.semaphore = asyncio.Semaphore(policy.max_concurrency) if policy.max_concurrency > 0 else None
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout) \
+            if policy.failure_threshold > 0 else None
+        self.budget = RetryBudget(policy.retry_ratio)
+
+
+class ToolPolicies:
+    """
+    工具调用策略层，位于结果缓存和 MCP 服务之间，同一个客户端的所有会话共享并发名额、熔断和重试预算。
+    调用失败时抛出 ToolCallError，由调用方转换为工具结果文本。
+    """
+
+    def __init__(self, policies: Dict[str, ToolPolicy]):
+        self.default = policies.get("*", ToolPolicy())
+        self.policies = policies
+        self._states: Dict[str, _ToolState] = {}
+
+    def get(self, tool_name: str) -> ToolPolicy:
+        return self.policies.get(tool_name, self.default)
+
+    def _state(self, tool_name: str) -> _ToolState:
+        state = self._states.get(tool_name)
+        if state is None:
+            state = self._states[tool_name] = _ToolState(self.get(tool_name))
+        return state
+
+    async def call(self, tool_name: str, arguments: dict, call_tool: CallToolFn) -> str:
+        policy = self.get(tool_name)
+        state = self._state(tool_name)
+        loop = asyncio.get_running_loop()
+        deadline = None if policy.timeout is None else loop.time() + policy.timeout
+        state.budget.deposit()
+        attempt = 0
+        while True:
+            if state.breaker is not None and not state.breaker.allow():
+                self._record(tool_name, "rejected", attempt)
+                raise ToolCallError(f"工具 {tool_name} 近期连续调用失败，已暂停调用，请稍后再试")
+            try:
+                result = await self._attempt(tool_name, arguments, call_tool, state, deadline, loop)
+            except asyncio.CancelledError:
+                if state.breaker is not None:
+                    state.breaker.release_probe()
+                raise
+            except Exception as e:
+                # 超时、服务端返回错误以及 MCP 会话层的错误（例如连接断开）都视为一次失败
+                error = e
+            else:
+                if state.breaker is not None:
+                    state.breaker.record_success()
+                self._record(tool_name, "ok", attempt)
+                return result
+            if state.breaker is not None:
+                state.breaker.record_failure()
+            timed_out = isinstance(error, asyncio.TimeoutError)
+            reason = "调用超时" if timed_out else str(error) or type(error).__name__
+            delay = random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** attempt))
+            remaining = None if deadline is None else deadline - loop.time()
+            if attempt >= policy.retries or (remaining is not None and remaining <= delay) \
+                    or not state.budget.withdraw():
+                self._record(tool_name, "timeout" if timed_out else "error", attempt)
+                raise ToolCallError(f"工具 {tool_name} 调用失败：{reason}") from error
+            logger.warning("工具 %s 第 %d 次调用失败（%s），%.2f 秒后重试", tool_name, attempt + 1, reason, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    async def _attempt(tool_name: str, arguments: dict, call_tool: CallToolFn, state: _ToolState,
+                       deadline: Optional[float], loop) -> str:
+        remaining = None if deadline is None else max(0.0, deadline - loop.time())
+        if state.semaphore is None:
+            return await asyncio.wait_for(call_tool(tool_name, arguments), remaining)
+        # 排队等待并发名额的时间同样计入截止时间
+        await asyncio.wait_for(state.semaphore.acquire(), remaining)
+        try:
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            return await asyncio.wait_for(call_tool(tool_name, arguments), remaining)
+        finally:
+            state.semaphore.release()
+
+    def _record(self, tool_name: str, outcome: str, retries: int):
+        item = current_span()
+        if item is not None:
+            item.set_attribute("tool.outcome", outcome)
+            item.set_attribute("tool.retries", retries)
+        registry.inc("agent_tool_calls_total", 1, "工具调用次数（ok / error / timeout / rejected）",
+                     tool=tool_name, outcome=outcome)
+        if retries:
+            registry.inc("agent_tool_retries_total", retries, "工具调用重试次数", tool=tool_name)
+        state = self._states.get(tool_name)
+        if state is not None and state.breaker is not None:
+            registry.set_gauge("agent_tool_circuit_open", 0 if state.breaker.state == "closed" else 1,
+                               "工具熔断状态（1 为打开）", tool=tool_name)
+
+    def stats(self) -> dict:
+        return {name: state.breaker.state for name, state in self._states.items() if state.breaker is not None}
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional
+
+from mcp import types
+
+from client.tool_index import ToolIndex
+
+
+def render_tools(tools: List[dict]) -> str:
+    return json.dumps(tools, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+class ToolRegistry:
+    """
+    工具目录缓存：连接服务时加载一次，收到 tools/list_changed 通知或超过 TTL 后重新加载。
+    同时维护 名称->工具 的索引和序列化后的工具列表，保证每次拼接到提示词中的内容字节一致。
+    """
+
+    def __init__(self, ttl: Optional[float] = None, top_k: int = 0, index_path: Optional[str] = None):
+        # ttl 为 None 时只依赖 list_changed 通知失效
+        self.ttl = ttl
+        # top_k 大于 0 时按问题检索最相关的 k 个工具放入提示词，否则使用完整工具列表
+        self.top_k = top_k
+        self.index = ToolIndex(index_path) if top_k > 0 else None
+        self.tools: List[dict] = []
+        self.tools_by_name: Dict[str, dict] = {}
+        self.tools_json = "[]"
+        self.version = ""
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def load(self, tools: List[types.Tool]):
+        # 按名称排序并固定 key 顺序，保证序列化结果稳定
+        self.tools = [{
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.inputSchema
+        } for tool in sorted(tools, key=lambda tool: tool.name)]
+        self.tools_by_name = {tool["name"]: tool for tool in self.tools}
+        self.tools_json = render_tools(self.tools)
+        self.version = hashlib.sha256(self.tools_json.encode("utf-8")).hexdigest()[:16]
+        if self.index is not None:
+            self.index.load_or_build(self.tools, self.version)
+        self._loaded_at = time.monotonic()
+
+    async def refresh(self, session):
+        # session 可以是 ClientSession，也可以是合并多个服务工具的 ServerPool
+        response = await session.list_tools()
+        self.load(response.tools)
+
+    async def ensure_loaded(self, session):
+        if self.is_stale:
+            await self.refresh(session)
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.tools_by_name.get(name)
+
+    def prompt_tools(self, query: str) -> str:
+        """返回拼接到规划提示词中的工具列表，检索不到相关工具时退回完整列表"""
+        if self.index is None or len(self.tools) <= self.top_k:
+            return self.tools_json
+        names = self.index.search(query, self.top_k)
+        if not names:
+            return self.tools_json
+        return self.render_subset(names)
+
+    def render_subset(self, names) -> str:
+        # 保持与完整列表一致的排序，相同的候选集合得到相同的提示词
+        return render_tools([tool for tool in self.tools if tool["name"] in names])
+
+    async def handle_message(self, message):
+        """作为 ClientSession 的 message_handler，处理服务端的工具列表变更通知"""
+        if isinstance(message, types.ServerNotification) and \
+                isinstance(message.root, types.ToolListChangedNotification):
+            self.invalidate()
@@ -0,0 +1,314 @@
+"""
+调用链追踪和 Prometheus 指标。
+
+span(name) 记录一段耗时，嵌套的 span 通过 ContextVar 自动形成父子关系（一次查询为一条 trace）。
+span 结束时：
+- 耗时计入 Prometheus 直方图 agent_span_duration_seconds；
+- 配置了导出器时导出 span：FileSpanExporter 按 OTLP/JSON 格式逐行写入文件（与 OpenTelemetry Collector 的 file exporter 格式一致），
+  InMemorySpanExporter 保存在内存中，便于测试和基准脚本分析。
+token 用量、提示词大小和缓存命中情况同时写入当前 span 的属性和 Prometheus 计数器。
+"""
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SERVICE_NAME = "agent-mcp-framework"
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "status", "start_time_ns",
+                 "end_time_ns", "_started")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self._started = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return time.perf_counter() - self._started if self.end_time_ns is None \
+            else (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def add_to_attribute(self, key: str, value: float):
+        """数值属性累加，例如同一个 span 内多次模型调用的 token 数"""
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def end(self):
+        # 用单调时钟计算耗时，避免系统时间调整导致耗时为负
+        self.end_time_ns = self.start_time_ns + int((time.perf_counter() - self._started) * 1e9)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or time.time_ns()),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 1 if self.status == "OK" else 2},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter:
+    def export(self, span: Span):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+
+    def export(self, span: Span):
+        self.spans.append(span)
+        if len(self.spans) > self.max_spans:
+            del self.spans[:len(self.spans) - self.max_spans]
+
+    def clear(self):
+        self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """攒够一批再写文件，每批一行 OTLP/JSON ExportTraceServiceRequest，避免在查询路径上频繁同步写盘"""
+
+    def __init__(self, path: str, batch_size: int = 64):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._buffer.append(span.to_otlp())
+            if len(self._buffer) < self.batch_size:
+                return
+            spans, self._buffer = self._buffer, []
+        self._write(spans)
+
+    def flush(self):
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if spans:
+            self._write(spans)
+
+    def _write(self, spans: List[dict]):
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+    def shutdown(self):
+        self.flush()
+
+
+# 耗时直方图的分桶（秒），覆盖工具调用的毫秒级到模型调用的分钟级
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 提示词字符数的分桶
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """进程内的 Prometheus 指标（counter / gauge / histogram），render() 输出文本格式"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) -> [各分桶计数, sum, count]
+        self._histograms: Dict[Tuple[str, Labels], list] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def _describe(self, name: str, kind: str, help_text: str):
+        if name not in self._help:
+            self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, "counter", help_text)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, "gauge", help_text)
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, help_text: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, "histogram", help_text)
+            buckets = self._buckets.setdefault(name, buckets)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def get(self, name: str, **labels) -> float:
+        key = (name, tuple(sorted(labels.items())))
+        return self._counters.get(key, self._gauges.get(key, 0))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self._help.items()):
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    for (metric, labels), (counts, total, count) in sorted(self._histograms.items()):
+                        if metric != name:
+                            continue
+                        cumulative = 0
+                        for bound, bucket_count in zip(self._buckets[name], counts):
+                            cumulative += bucket_count
+                            lines.append(f"{name}_bucket{_render_labels(labels, le=_format_number(bound))} "
+                                         f"{cumulative}")
+                        lines.append(f'{name}_bucket{_render_labels(labels, le="+Inf")} {count}')
+                        lines.append(f"{name}_sum{_render_labels(labels)} {_format_number(total)}")
+                        lines.append(f"{name}_count{_render_labels(labels)} {count}")
+                else:
+                    values = self._counters if kind == "counter" else self._gauges
+                    for (metric, labels), value in sorted(values.items()):
+                        if metric == name:
+                            lines.append(f"{name}{_render_labels(labels)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _render_labels(labels: Labels, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+_exporters: List[SpanExporter] = []
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def set_exporters(exporters: List[SpanExporter]):
+    shutdown()
+    _exporters[:] = exporters
+
+
+def create_exporter(kind: str, path: str) -> Optional[SpanExporter]:
+    if kind == "file":
+        return FileSpanExporter(path)
+    if kind == "memory":
+        return InMemorySpanExporter()
+    return None
+
+
+def shutdown():
+    for exporter in _exporters:
+        exporter.shutdown()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    parent = _current_span.get()
+    item = Span(name, parent, attributes)
+    token = _current_span.set(item)
+    try:
+        yield item
+    except BaseException as e:
+        item.status = "ERROR"
+        item.set_attribute("error.type", type(e).__name__)
+        raise
+    finally:
+        item.end()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # 异步生成器在其他上下文中结束时无法 reset，直接恢复父 span
+            _current_span.set(parent)
+        registry.observe("agent_span_duration_seconds", item.duration, "各阶段耗时（秒）", span=name,
+                         status=item.status)
+        for exporter in _exporters:
+            exporter.export(item)
+
+
+def record_tokens(usage: dict):
+    """模型调用的 token 用量，按当前 span 名称分别统计"""
+    item = _current_span.get()
+    name = item.name if item is not None else "none"
+    for key in ("input_tokens", "output_tokens"):
+        value = usage.get(key) or 0
+        if item is not None:
+            item.add_to_attribute(f"llm.{key}", value)
+        registry.inc("agent_llm_tokens_total", value, "模型调用的 token 数", span=name, type=key)
+
+
+def record_prompt(chars: int, messages: int):
+    """提示词大小（字符数），不在查询路径上做分词"""
+    item = _current_span.get()
+    name = item.name if item is not None else "none"
+    if item is not None:
+        item.add_to_attribute("llm.prompt_chars", chars)
+        item.add_to_attribute("llm.prompt_messages", messages)
+    registry.observe("agent_llm_prompt_chars", chars, "提示词字符数", SIZE_BUCKETS, span=name)
+
+
+def record_cache(cache: str, outcome: str):
+    """缓存查询结果：hit / shared_hit / similar_hit / miss / coalesced"""
+    item = _current_span.get()
+    if item is not None:
+        item.set_attribute(f"cache.{cache}", outcome)
+    registry.inc("agent_cache_requests_total", 1, "缓存查询次数", cache=cache, outcome=outcome)
@@ -0,0 +1,212 @@
+import json
+from typing import List, Optional, Tuple
+
+
+class PlanParseError(ValueError):
+    pass
+
+
+class IncrementalPlanParser:
+    """
+    增量解析模型流式输出的调用规划，单次线性扫描，对常见的格式问题保持宽容：
+    - 跳过 <think>...</think> 和 JSON 之前的其他内容（例如 ```json）；
+    - 去掉字符串之外的空白、// 与 /* */ 注释以及对象和数组末尾多余的逗号；
+    - 顶层是数组时，每个元素对象闭合后立即返回，不需要等待整个数组生成完毕；
+    - 输出被截断时，result() 退回到最后一个完整的值并补齐括号，同时把 truncated 置为 True。
+    """
+
+    def __init__(self):
+        self.done = False
+        self.truncated = False
+        self._recent = ""
+        self._in_think = False
+        self._started = False
+        # 清理后的 JSON 文本
+        self._out: List[str] = []
+        # 尚未闭合的括号
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # None / "line" / "block"
+        self._comment: Optional[str] = None
+        self._slash = False
+        self._star = False
+        self._element_start = 0
+        # 截断时可以回退到的位置：(清理后文本的长度, 当时尚未闭合的括号)
+        self._safe_point: Tuple[int, str] = (0, "")
+
+    @property
+    def started(self) -> bool:
+        """是否已经在输出中找到 JSON 的开头"""
+        return self._started
+
+    def feed(self, chunk: str) -> List[dict]:
+        """输入一段新生成的文本，返回其中新闭合的调用链节点"""
+        steps = []
+        for char in chunk:
+            if self.done:
+                break
+            if not self._started:
+                self._scan_prefix(char)
+                continue
+            step = self._scan_json(char)
+            if step is not None:
+                steps.append(step)
+        return steps
+
+    def result(self):
+        """返回解析出的完整 JSON 值"""
+        if not self._started:
+            raise PlanParseError("输出中没有 JSON")
+        if self.done:
+            text = "".join(self._out)
+        else:
+            self.truncated = True
+            length, stack = self._safe_point
+            text = "".join(self._out[:length]) + "".join("]" if bracket == "[" else "}" for bracket in reversed(stack))
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise PlanParseError(f"JSON 解析失败: {e}") from e
+
+    def _scan_prefix(self, char: str):
+        self._recent = (self._recent + char)[-8:]
+        if self._in_think:
+            if self._recent.endswith("</think>"):
+                self._in_think = False
+        elif self._recent.endswith("<think>"):
+            self._in_think = True
+        elif char in "[{":
+            self._started = True
+            self._open(char)
+
+    def _scan_json(self, char: str):
+        if self._comment == "line":
+            if char == "\n":
+                self._comment = None
+            return None
+        if self._comment == "block":
+            if self._star and char == "/":
+                self._comment = None
+            self._star = char == "*"
+            return None
+        if self._in_string:
+            self._out.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+            return None
+        if self._slash:
+            self._slash = False
+            if char == "/":
+                self._comment = "line"
+                return None
+            if char == "*":
+                self._comment, self._star = "block", False
+                return None
+            self._out.append("/")
+        if char == "/":
+            self._slash = True
+        elif char == '"':
+            self._in_string = True
+            self._out.append(char)
+        elif char in "[{":
+            self._open(char)
+        elif char in "]}":
+            return self._close()
+        elif char == ",":
+            # 逗号之前一定是一个完整的值
+            self._mark_safe()
+            self._out.append(char)
+        elif not char.isspace():
+            self._out.append(char)
+        return None
+
+    def _open(self, char: str):
+        self._out.append(char)
+        self._stack.append(char)
+        if len(self._stack) == 2 and self._stack[0] == "[":
+            self._element_start = len(self._out) - 1
+        self._mark_safe()
+
+    def _close(self):
+        if self._out and self._out[-1] == ",":
+            self._out.pop()
+        bracket = self._stack.pop()
+        self._out.append("]" if bracket == "[" else "}")
+        if not self._stack:
+            self.done = True
+            return None
+        self._mark_safe()
+        if len(self._stack) == 1 and self._stack[0] == "[":
+            return self._close_element()
+        return None
+
+    def _mark_safe(self):
+        self._safe_point = (len(self._out), "".join(self._stack))
+
+    def _close_element(self):
+        try:
+            step = json.loads("".join(self._out[self._element_start:]))
+        except json.JSONDecodeError:
+            # 无法单独解析的节点留给完整输出的解析流程处理
+            return None
+        return step if isinstance(step, dict) else None
+
+
+def parse_json(text: str):
+    """一次性解析完整的模型输出，截断或无法解析时抛出 PlanParseError"""
+    parser = IncrementalPlanParser()
+    parser.feed(text)
+    value = parser.result()
+    if parser.truncated:
+        raise PlanParseError("输出被截断，JSON 不完整")
+    return value
+
+
+class IncrementalToolCallParser:
+    """
+    增量收集原生工具调用（tool_call_chunks）。
+    同一个调用的参数分多块返回，按 index 区分不同的调用；某个调用之后出现新的调用时，前一个调用即已生成完毕，立即返回。
+    """
+
+    def __init__(self):
+        # [名称, 参数片段, 原始 index]
+        self._calls: List[list] = []
+        self._emitted = 0
+
+    def feed(self, tool_call_chunks: List[dict]) -> List[dict]:
+        """输入一个流式块中的 tool_call_chunks，返回其中新生成完毕的调用"""
+        for chunk in tool_call_chunks:
+            index = chunk.get("index")
+            current = self._calls[-1] if self._calls else None
+            if current is None or (index is not None and index != current[2]) or \
+                    (index is None and chunk.get("name") and current[0]):
+                current = [None, [], index]
+                self._calls.append(current)
+            if chunk.get("name"):
+                current[0] = chunk["name"]
+            if chunk.get("args"):
+                current[1].append(chunk["args"])
+        steps = []
+        while self._emitted < len(self._calls) - 1:
+            steps.append(self._to_step(self._calls[self._emitted]))
+            self._emitted += 1
+        return steps
+
+    def result(self) -> List[dict]:
+        """返回全部调用：[{"type": "tool", "name": ..., "input": ...}]"""
+        return [self._to_step(call) for call in self._calls]
+
+    @staticmethod
+    def _to_step(call: list) -> dict:
+        args = "".join(call[1]).strip()
+        try:
+            value = parse_json(args) if args else {}
+        except PlanParseError:
+            # 参数无法解析时原样保留，由调用方按结构校验
+            value = args
+        return {"type": "tool", "name": call[0], "input": value}
@@ -1,5 +1,7 @@
 from mcp.server.fastmcp import FastMCP
 
+from tool_runner import run_server
+
 mcp = FastMCP("Echo")
 
 
@@ -18,4 +20,8 @@ def echo_tool(message: str) -> str:
 @mcp.prompt()
 def echo_prompt(message: str) -> str:
     """Create an echo prompt"""
-    return f"Please process this message: {message}"
\ No newline at end of file
+    return f"Please process this message: {message}"
+
+if __name__ == "__main__":
+    # MCP_TRANSPORT=sse 时以 HTTP（SSE）方式启动，多个客户端共享同一个服务进程
+    run_server(mcp)
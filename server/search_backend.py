@@ -0,0 +1,132 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import httpx
+
+
+class SearchError(Exception):
+    pass
+
+
+class SearchProvider:
+    """搜索服务提供方，每个提供方有独立的超时时间和并发上限"""
+
+    name = ""
+
+    def __init__(self, url: str, timeout: float = 10.0, max_concurrency: int = 8):
+        self.url = url
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    def build_request(self, query: str, k: int) -> dict:
+        raise NotImplementedError
+
+    def parse_results(self, data: dict) -> List[dict]:
+        raise NotImplementedError
+
+    async def search(self, client: httpx.AsyncClient, query: str, k: int) -> List[dict]:
+        async with self.semaphore:
+            try:
+                response = await client.get(self.url, timeout=self.timeout, **self.build_request(query, k))
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                # 错误信息会作为工具结果交给模型、写入日志和追踪，只保留状态码：请求 URL 中带有 API key
+                raise SearchError(f"{self.name} 搜索失败: HTTP {e.response.status_code}") from e
+            except httpx.HTTPError as e:
+                raise SearchError(f"{self.name} 搜索失败: {type(e).__name__}") from e
+        try:
+            data = response.json()
+        except ValueError as e:
+            # 网关错误页、限流提示等非 JSON 响应同样按搜索失败处理，对冲模式下继续等待其他提供方
+            raise SearchError(f"{self.name} 返回的结果不是 JSON") from e
+        return self.parse_results(data)[:k]
+
+
+class GoogleSearchProvider(SearchProvider):
+    name = "google"
+
+    def __init__(self, api_key: str, cse_id: str, url: str = "https://www.googleapis.com/customsearch/v1", **kwargs):
+        super().__init__(url, **kwargs)
+        self.api_key = api_key
+        self.cse_id = cse_id
+
+    def build_request(self, query: str, k: int) -> dict:
+        # Custom Search API 单次最多返回 10 条
+        return {"params": {"key": self.api_key, "cx": self.cse_id, "q": query, "num": min(k, 10)}}
+
+    def parse_results(self, data: dict) -> List[dict]:
+        return [{"title": item.get("title"), "link": item.get("link"), "snippet": item.get("snippet")}
+                for item in data.get("items", [])]
+
+
+class BingSearchProvider(SearchProvider):
+    name = "bing"
+
+    def __init__(self, api_key: str, url: str, **kwargs):
+        super().__init__(url, **kwargs)
+        self.api_key = api_key
+
+    def build_request(self, query: str, k: int) -> dict:
+        return {
+            "params": {"q": query, "count": k, "textDecorations": "false", "textFormat": "Raw"},
+            "headers": {"Ocp-Apim-Subscription-Key": self.api_key},
+        }
+
+    def parse_results(self, data: dict) -> List[dict]:
+        return [{"title": item.get("name"), "link": item.get("url"), "snippet": item.get("snippet")}
+                for item in data.get("webPages", {}).get("value", [])]
+
+
+class SearchBackend:
+    """
+    异步搜索后端：所有提供方共享一个保持长连接的 httpx.AsyncClient 连接池，
+    支持同时请求多个提供方、返回最先成功结果的对冲模式。
+    """
+
+    def __init__(self, providers: List[SearchProvider], max_connections: int = 20, max_keepalive: int = 10):
+        self.providers: Dict[str, SearchProvider] = {provider.name: provider for provider in providers}
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # 延迟到第一次请求时创建，保证和服务端事件循环绑定
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits)
+        return self._client
+
+    async def search(self, provider_name: str, query: str, k: int) -> List[dict]:
+        provider = self.providers.get(provider_name)
+        if provider is None:
+            raise SearchError(f"{provider_name} 搜索未配置")
+        return await provider.search(self.client, query, k)
+
+    async def hedged_search(self, query: str, k: int) -> List[dict]:
+        """同时请求所有提供方，返回最先成功的结果并取消其余请求"""
+        if not self.providers:
+            raise SearchError("没有可用的搜索服务")
+        pending = {asyncio.create_task(provider.search(self.client, query, k)) for provider in self.providers.values()}
+        errors = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(str(task.exception()))
+        finally:
+            for task in pending:
+                task.cancel()
+        raise SearchError("; ".join(errors))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def format_results(results: List[dict]) -> str:
+    if not results:
+        return "没有找到相关结果"
+    return "\n\n".join(f"{index}. {item.get('title')}\n{item.get('link')}\n{item.get('snippet')}"
+                       for index, item in enumerate(results, start=1))
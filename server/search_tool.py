@@ -1,23 +1,44 @@
 from dotenv import load_dotenv
-from langchain_google_community import GoogleSearchAPIWrapper
-from langchain_community.utilities.bing_search import BingSearchAPIWrapper
 from mcp.server import FastMCP
 
+from search_backend import BingSearchProvider, GoogleSearchProvider, SearchBackend, format_results
+from tool_runner import run_server
+
 import os
 # os.environ["HTTP_PROXY"] = "http://127.0.0.1:7890"
 # os.environ["HTTPS_PROXY"] = "http://127.0.0.1:7890"
 load_dotenv()  # 自动加载 .env 文件
 google_api_key = os.environ["GOOGLE_API_KEY"]
 google_cse_id = os.environ["GOOGLE_CSE_ID"]
+# 请替换为你自己的 Bing 订阅密钥
+bing_api_key = os.environ["BING_API_KEY"]
+bing_search_url = os.environ["BING_SEARCH_URL"]
+# 返回的结果条数、各搜索服务的超时时间（秒）和并发上限
+search_result_count = int(os.environ.get("SEARCH_RESULT_COUNT", "5"))
+google_timeout = float(os.environ.get("GOOGLE_SEARCH_TIMEOUT", "10"))
+bing_timeout = float(os.environ.get("BING_SEARCH_TIMEOUT", "10"))
+search_concurrency = int(os.environ.get("SEARCH_CONCURRENCY", "8"))
 # Initialize FastMCP server
 mcp = FastMCP("Search")
 
-# 初始化搜索器（用你的 API Key 和 CSE ID）
-search = GoogleSearchAPIWrapper(
-    google_api_key=google_api_key,
-    google_cse_id=google_cse_id,
-    k=5  # 返回前5条结果
-)
+# 初始化异步搜索后端，google 和 bing 共享同一个连接池
+# 搜索失败时 SearchError 直接抛出，FastMCP 返回 isError 的结果，客户端按调用失败处理（重试、熔断、不写入缓存）
+search_backend = SearchBackend([
+    GoogleSearchProvider(
+        api_key=google_api_key,
+        cse_id=google_cse_id,
+        url=os.environ.get("GOOGLE_SEARCH_URL", "https://www.googleapis.com/customsearch/v1"),
+        timeout=google_timeout,
+        max_concurrency=search_concurrency
+    ),
+    BingSearchProvider(
+        api_key=bing_api_key,
+        url=bing_search_url,
+        timeout=bing_timeout,
+        max_concurrency=search_concurrency
+    ),
+])
+
 
 @mcp.tool(name="google_search")
 async def google_search_info(query: str) -> str:
@@ -30,20 +51,8 @@ async def google_search_info(query: str) -> str:
     Args:
         query (str): The search term or phrase to look up on Google.
     """
-    # 搜索关键词
-    results = search.results(query, 1)
-    return str(results[0].get("snippet"))
-
-# 请替换为你自己的 Bing 订阅密钥
-bing_api_key = os.environ["BING_API_KEY"]
-bing_search_url = os.environ["BING_SEARCH_URL"]
+    return format_results(await search_backend.search("google", query, search_result_count))
 
-# 初始化 BingSearchAPIWrapper
-bing_search = BingSearchAPIWrapper(
-    bing_subscription_key=bing_api_key,
-    bing_search_url=bing_search_url,
-    k=5  # 返回前5条结果
-)
 
 @mcp.tool(name="bing_search")
 async def bing_search_info(query: str) -> str:
@@ -56,9 +65,20 @@ async def bing_search_info(query: str) -> str:
     Args:
         query (str): The search term or phrase to look up on Bing.
     """
-    # 搜索关键词
-    results = bing_search.results(query, 1)
-    return str(results[0].get("snippet"))
+    return format_results(await search_backend.search("bing", query, search_result_count))
+
+
+@mcp.tool(name="web_search")
+async def web_search(query: str) -> str:
+    """
+    Search the web with Google and Bing at the same time and return whichever answers first.
+
+    Use this tool for general information lookups when no specific search engine is required.
+
+    Args:
+        query (str): The search term or phrase to look up.
+    """
+    return format_results(await search_backend.hedged_search(query, search_result_count))
 
 @mcp.tool(name="book_flight")
 async def book_flight(departure_city: str,destination_city:str,date:str) -> str:
@@ -101,8 +121,8 @@ async def order_info(order: str) -> str:
 
 
 if __name__ == "__main__":
-    # Initialize and run the server
-    mcp.run(transport='stdio')
+    # Initialize and run the server，MCP_TRANSPORT=sse 时以 HTTP（SSE）方式启动，多个客户端共享同一个服务进程
+    run_server(mcp)
 
 
 
@@ -0,0 +1,141 @@
+"""
+MCP 服务端的工具执行方式：FastMCP 默认在同一个事件循环中执行全部工具，同步函数会直接阻塞事件循环。
+用 ToolRunner 标记阻塞型或 CPU 密集型的工具，分别交给线程池或进程池执行，服务吞吐可以随 CPU 核数扩展：
+
+    mcp = FastMCP("Demo")
+    runner = ToolRunner()
+
+    @mcp.tool()
+    @runner.blocking        # 阻塞 IO（同步 SDK、文件读写等），在线程池中执行
+    def read_report(path: str) -> str: ...
+
+    @mcp.tool()
+    @runner.cpu_bound       # CPU 密集型计算，在进程池中执行，参数和返回值需要可以 pickle
+    def analyze(text: str) -> str: ...
+
+    if __name__ == "__main__":
+        run_server(mcp, runner)
+
+进程池在服务启动前创建并预热（每个 worker 提前启动、导入服务脚本），第一次调用不需要等待进程启动。
+run_server 根据 MCP_TRANSPORT 选择 stdio（默认）或 sse，sse 模式下多个客户端可以共享同一个服务进程。
+"""
+import asyncio
+import functools
+import os
+import runpy
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Set
+
+# 进程池中执行的函数：服务脚本路径:函数名 -> 原始函数
+# 服务脚本中的函数名被装饰后的协程函数覆盖，不能按名称 pickle，worker 通过这里找到原始函数
+_FUNCTIONS: Dict[str, Callable] = {}
+
+
+def _function_key(fn: Callable) -> str:
+    return f"{os.path.abspath(fn.__code__.co_filename)}:{fn.__qualname__}"
+
+
+def _init_worker(script_paths: tuple):
+    """worker 启动时导入服务脚本；fork 方式创建的 worker 已经继承了注册的函数，不需要重新导入"""
+    for script_path in script_paths:
+        if any(key.startswith(script_path + ":") for key in _FUNCTIONS):
+            continue
+        sys.path.insert(0, os.path.dirname(script_path))
+        runpy.run_path(script_path, run_name="__tool_worker__")
+
+
+def _invoke(key: str, args: tuple, kwargs: dict):
+    return _FUNCTIONS[key](*args, **kwargs)
+
+
+def _warm() -> int:
+    return os.getpid()
+
+
+class ToolRunner:
+    """
+    thread_workers / process_workers 不传时读取 SERVER_THREAD_WORKERS / SERVER_PROCESS_WORKERS，
+    默认分别为 min(32, CPU 核数 + 4) 和 CPU 核数。
+    """
+
+    def __init__(self, thread_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        cpu_count = os.cpu_count() or 1
+        self.thread_workers = thread_workers or int(os.environ.get("SERVER_THREAD_WORKERS", min(32, cpu_count + 4)))
+        self.process_workers = process_workers or int(os.environ.get("SERVER_PROCESS_WORKERS", cpu_count))
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._scripts: Set[str] = set()
+
+    @property
+    def thread_pool(self) -> Executor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="mcp-tool")
+        return self._thread_pool
+
+    @property
+    def process_pool(self) -> Executor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers, initializer=_init_worker,
+                                                     initargs=(tuple(sorted(self._scripts)),))
+        return self._process_pool
+
+    def blocking(self, fn: Callable) -> Callable:
+        """阻塞型工具：在线程池中执行，不占用事件循环"""
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.thread_pool, functools.partial(fn, *args, **kwargs))
+
+        return wrapper
+
+    def cpu_bound(self, fn: Callable) -> Callable:
+        """CPU 密集型工具：在进程池中执行，不受 GIL 限制"""
+        key = _function_key(fn)
+        _FUNCTIONS[key] = fn
+        self._scripts.add(os.path.abspath(fn.__code__.co_filename))
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self.process_pool, _invoke, key, args, kwargs)
+            except BrokenProcessPool:
+                # worker 异常退出后进程池不可用，丢弃后下次调用重新创建
+                self._process_pool = None
+                raise
+
+        return wrapper
+
+    def warm(self):
+        """服务启动前创建进程池并启动全部 worker"""
+        if not self._scripts:
+            return
+        pool = self.process_pool
+        for future in [pool.submit(_warm) for _ in range(self.process_workers)]:
+            future.result()
+
+    def shutdown(self):
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+
+
+def run_server(mcp, runner: Optional[ToolRunner] = None):
+    """
+    启动服务。MCP_TRANSPORT 为 sse 时监听 MCP_HOST:MCP_PORT（默认 127.0.0.1:8000），
+    客户端在 MCP_TOOL_PATH 中配置 http://host:port/sse 即可连接。
+    """
+    transport = os.environ.get("MCP_TRANSPORT", "stdio")
+    if transport == "sse":
+        mcp.settings.host = os.environ.get("MCP_HOST", mcp.settings.host)
+        mcp.settings.port = int(os.environ.get("MCP_PORT", mcp.settings.port))
+    if runner is not None:
+        runner.warm()
+    try:
+        mcp.run(transport=transport)
+    finally:
+        if runner is not None:
+            runner.shutdown()
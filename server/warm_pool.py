@@ -0,0 +1,119 @@
+"""
+MCP 服务预热池：提前启动服务脚本，以 SSE 方式常驻并保持已初始化的状态。
+客户端在 MCP_TOOL_PATH 中配置服务地址即可直接连接，省去每次启动时的进程创建、依赖导入和握手等待，
+多个客户端进程（CLI、网关、批处理 worker）共享同一组服务进程。服务进程异常退出后自动重启。
+
+运行方式（项目根目录）：
+    python -m server.warm_pool server/search_tool.py server/echo_server.py --base-port 8101
+启动后输出可以直接使用的配置，例如：
+    MCP_TOOL_PATH="http://127.0.0.1:8101/sse#search_tool,http://127.0.0.1:8102/sse#echo_server"
+"""
+import argparse
+import asyncio
+import logging
+import os
+import runpy
+import signal
+import sys
+from typing import List, Optional, Tuple
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 关闭时等待 SSE 连接断开的最长时间（秒），超时后强制退出
+SHUTDOWN_TIMEOUT = 5
+
+
+def load_server(server_script_path: str) -> Tuple[FastMCP, Optional[object]]:
+    """执行服务脚本（不触发其中的 __main__ 分支），取出其中的 FastMCP 实例和 ToolRunner（变量名 runner，可选）"""
+    script_path = os.path.abspath(server_script_path)
+    # 服务脚本以普通模块的方式导入同目录下的模块，例如 search_tool.py 中的 search_backend
+    sys.path.insert(0, os.path.dirname(script_path))
+    namespace = runpy.run_path(script_path, run_name="__warm_pool__")
+    server = namespace.get("mcp")
+    if not isinstance(server, FastMCP):
+        server = next((value for value in namespace.values() if isinstance(value, FastMCP)), None)
+    if server is None:
+        raise ValueError(f"{server_script_path} 中没有找到 FastMCP 实例")
+    runner = namespace.get("runner")
+    return server, runner if hasattr(runner, "warm") else None
+
+
+def serve(server_script_path: str, host: str, port: int):
+    server, runner = load_server(server_script_path)
+    # FastMCP 创建时把日志配置为 INFO，每次请求都会输出一行
+    logging.getLogger().setLevel(logging.WARNING)
+    # 进程池在启动事件循环之前创建，worker 就绪后再开始接受连接
+    if runner is not None:
+        runner.warm()
+    try:
+        uvicorn.run(server.sse_app(), host=host, port=port, log_level="warning",
+                    timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)
+    finally:
+        if runner is not None:
+            runner.shutdown()
+
+
+def server_url(server_script_path: str, host: str, port: int) -> str:
+    name = os.path.splitext(os.path.basename(server_script_path))[0]
+    return f"http://{host}:{port}/sse#{name}"
+
+
+async def supervise(server_script_path: str, host: str, port: int, restart_delay: float):
+    """在子进程中运行单个服务，退出后按间隔重启"""
+    while True:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "server.warm_pool", "--serve", server_script_path,
+            "--host", host, "--port", str(port), cwd=PROJECT_ROOT)
+        try:
+            code = await process.wait()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), SHUTDOWN_TIMEOUT * 2)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+            raise
+        print(f"{server_script_path} 退出（code={code}），{restart_delay} 秒后重启", file=sys.stderr)
+        await asyncio.sleep(restart_delay)
+
+
+async def run_pool(server_script_paths: List[str], host: str, base_port: int, restart_delay: float):
+    paths = [os.path.abspath(path) for path in server_script_paths]
+    tasks = [asyncio.create_task(supervise(path, host, base_port + index, restart_delay))
+             for index, path in enumerate(paths)]
+    urls = [server_url(path, host, base_port + index) for index, path in enumerate(paths)]
+    print(f'MCP_TOOL_PATH="{",".join(urls)}"', flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows 下不支持，依赖 KeyboardInterrupt 退出
+            pass
+    try:
+        await stop.wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="服务脚本路径")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=8101, help="第一个服务的端口，之后的服务依次加一")
+    parser.add_argument("--restart-delay", type=float, default=1.0, help="服务退出后重启的等待时间（秒）")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.host, args.port)
+    else:
+        asyncio.run(run_pool(args.paths, args.host, args.base_port, args.restart_delay))
@@ -66,6 +66,7 @@ prompt = """
             ]
         注意事项：
         1、如果返回样式是json，那么回答内容不允许在json结构外面有任何其他任何分析、解释内容, 并且不要在json结构内容使用//注释
+        2、链式调用中，如果某个参数需要依赖前序工具的返回结果、无法直接从问题中得到，请将该参数值写为 "前序工具名称.result"，例如 "book_flight.result"
 """
 
 generate_prompt = """
@@ -163,3 +164,48 @@ generate_param_prompt = """
 
 """
 
+
+summary_prompt = """
+    Context（上下文）：
+        用户与助手的对话越来越长，为了控制上下文长度，需要把较早的对话压缩成一段摘要，后续对话只携带摘要和最近的消息。
+    Objective（目的）：
+        根据已有的摘要和新一批需要压缩的对话消息，生成一段新的摘要，覆盖两者中的全部关键信息。
+    Style（风格）：
+        简洁、客观、信息完整，保留用户的身份信息、偏好、时间地点、订单号等后续对话可能用到的事实，省略寒暄和重复内容。
+    Tone（语气）：
+        中立，使用第三人称陈述。
+    Response（回应形式）：
+        只输出摘要正文，不包含任何解释或标题。
+"""
+
+
+repair_prompt = """
+    上一次的输出无法按要求解析，原因：{error}。
+    请根据原问题和可用的工具列表重新输出，只输出符合要求的 JSON（文本回答对象、单个工具调用对象或工具调用数组），
+    不要输出任何分析解释、代码块标记或 // 注释，并保证 JSON 完整闭合。
+"""
+
+
+param_repair_prompt = """
+    上一次输出的参数无法按要求解析，原因：{error}。
+    请根据当前工具的参数定义重新输出，只输出一个 JSON 对象，键为参数名称，
+    不要输出任何分析解释、代码块标记或 // 注释，并保证 JSON 完整闭合。
+"""
+
+
+native_prompt = """
+    你是一个可以调用工具的助手。根据用户的问题判断是否需要调用工具：
+    1. 不需要工具时，直接用自然语言回答；
+    2. 需要工具时，按工具的参数定义从问题中提取参数发起调用；需要多个工具时一次给出全部调用，并按执行顺序排列；
+    3. 某个参数依赖前序工具的返回结果、无法直接从问题中得到时，将参数值写为 "前序工具名称.result"，例如 "book_flight.result"。
+"""
+
+
+native_param_prompt = """
+    根据用户问题（user_input）和调用链中前序工具的输出（chain_history），为当前工具（current_node_info）生成调用参数。
+    参数必须符合当前工具的参数定义，只使用输入中能够得到的信息。
+"""
+
+direct_prompt = """
+    你是一个友好、专业的助手。用户的这条消息不需要查询任何外部信息，请结合对话历史直接用自然语言简洁地回答。
+"""
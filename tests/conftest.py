@@ -0,0 +1,4 @@
+from benchmark.env import setup_environment
+
+# client.cli 在导入时读取模型和工具服务的配置，测试中使用模拟模型和进程内的工具服务
+setup_environment()
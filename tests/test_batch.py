@@ -0,0 +1,36 @@
+import asyncio
+import json
+
+from client.batch import run_batch
+
+
+class EchoClient:
+
+    def __init__(self):
+        self.queries = []
+
+    async def process_query(self, query: str, session_id: str, metrics) -> str:
+        self.queries.append(query)
+        metrics.finish()
+        return f"回答：{query}"
+
+
+def test_bad_lines_are_reported_and_the_batch_continues(tmp_path):
+    input_path, output_path = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    input_path.write_text("\n".join([
+        json.dumps({"id": "a", "query": "武汉天气"}, ensure_ascii=False),
+        '{"id": "b", "query": ',
+        json.dumps({"id": "c", "question": "缺少 query 字段"}, ensure_ascii=False),
+        json.dumps(["不是对象"], ensure_ascii=False),
+        json.dumps({"id": "d", "query": "北京天气"}, ensure_ascii=False),
+    ]) + "\n", encoding="utf-8")
+    client = EchoClient()
+
+    report = asyncio.run(run_batch(client, str(input_path), str(output_path), concurrency=2))
+
+    records = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert sorted(client.queries) == ["北京天气", "武汉天气"]
+    assert sorted(record["id"] for record in records if record["status"] == "ok") == ["a", "d"]
+    assert sorted(record["line"] for record in records if record["status"] == "error") == [2, 3, 4]
+    assert sorted(record["id"] for record in records if record["status"] == "error") == ["2", "4", "c"]
+    assert (report.succeeded, report.failed) == (2, 3)
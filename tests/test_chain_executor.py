@@ -0,0 +1,71 @@
+import asyncio
+
+from agent_collections import FakeToolContent
+from client.chain_executor import ChainExecutor
+
+
+def node(name: str, **tool_input) -> FakeToolContent:
+    return FakeToolContent(type="tool", name=name, input=tool_input)
+
+
+def make_executor(calls: list, resolve_delay: float = 0.0) -> ChainExecutor:
+    async def call_tool(name: str, params: dict) -> str:
+        calls.append((name, params))
+        return f"{name} {params}"
+
+    async def resolve_params(user_input, current, node_info, chain_history, history) -> dict:
+        await asyncio.sleep(resolve_delay)
+        return current.input
+
+    return ChainExecutor(call_tool=call_tool, resolve_params=resolve_params)
+
+
+def test_finish_cancels_voided_node_before_call_tool():
+    calls = []
+
+    async def run():
+        chain_run = make_executor(calls, resolve_delay=0.05).start("q", {})
+        chain_run.add(node("a", x=1))
+        await asyncio.sleep(0)
+        results = await chain_run.finish([node("a", x=3)])
+        # 给被取消的执行留出时间，确认它没有继续调用工具
+        await asyncio.sleep(0.1)
+        return results
+
+    results = asyncio.run(run())
+    assert calls == [("a", {"x": 3})]
+    assert [item.result for item in results] == ["a {'x': 3}"]
+
+
+def test_finish_reuses_identical_node():
+    calls = []
+
+    async def run():
+        chain_run = make_executor(calls, resolve_delay=0.01).start("q", {})
+        chain_run.add(node("a", x=1))
+        chain_run.add(node("b", y="a.result"))
+        chain_run.add(node("c", z=1))
+        await asyncio.sleep(0)
+        return await chain_run.finish([node("a", x=1), node("b", y="a.result")])
+
+    results = asyncio.run(run())
+    assert calls == [("a", {"x": 1}), ("b", {"y": "a.result"})]
+    assert [item.name for item in results] == ["a", "b"]
+
+
+def test_claim_returns_matching_task_and_cancels_rest():
+    calls = []
+
+    async def run():
+        chain_run = make_executor(calls, resolve_delay=0.05).start("q", {})
+        chain_run.add(node("a", x=1))
+        chain_run.add(node("b", y=2))
+        await asyncio.sleep(0)
+        task = chain_run.claim(node("a", x=1))
+        result = await task
+        await asyncio.sleep(0.1)
+        return result
+
+    result = asyncio.run(run())
+    assert result.name == "a"
+    assert calls == [("a", {"x": 1})]
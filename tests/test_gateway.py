@@ -0,0 +1,79 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from client.gateway import AdmissionController, SessionLocks, query, result
+from client.result_compactor import ResultStore
+
+
+class FakeClient:
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.result_store = ResultStore()
+
+    async def stream_query(self, user_query: str, session_id: str, metrics):
+        if self.error is not None:
+            raise self.error
+        yield f"回答：{user_query}"
+
+
+def make_app(client: FakeClient) -> Starlette:
+    app = Starlette(routes=[Route("/query", query, methods=["POST"]),
+                            Route("/results/{result_id}", result, methods=["GET"])])
+    app.state.client = client
+    app.state.admission = AdmissionController(2, 2)
+    app.state.session_locks = SessionLocks()
+    return app
+
+
+def test_non_object_body_is_rejected():
+    with TestClient(make_app(FakeClient())) as http:
+        for body in ([], "x", 1):
+            response = http.post("/query", json=body)
+            assert response.status_code == 400
+            assert "error" in response.json()
+
+
+def test_non_streaming_error_returns_json():
+    with TestClient(make_app(FakeClient(RuntimeError("model down")))) as http:
+        response = http.post("/query", json={"query": "你好", "stream": False})
+    assert response.status_code == 500
+    assert response.json() == {"error": "RuntimeError: model down"}
+
+
+def test_results_are_scoped_to_the_session():
+    client = FakeClient()
+    reference = client.result_store.put("完整的工具结果", "alice")
+    result_id = reference.split("://", 1)[1]
+    with TestClient(make_app(client)) as http:
+        assert http.get(f"/results/{result_id}").status_code == 404
+        assert http.get(f"/results/{result_id}", params={"session_id": "bob"}).status_code == 404
+        response = http.get(f"/results/{result_id}", params={"session_id": "alice"})
+    assert response.status_code == 200
+    assert response.text == "完整的工具结果"
+
+
+def test_session_lock_waiters_do_not_hold_a_slot():
+    async def run():
+        admission, locks = AdmissionController(1, 10), SessionLocks()
+        release = asyncio.Event()
+
+        async def hold(session_id: str):
+            async with admission.slot(locks.hold(session_id)):
+                await release.wait()
+
+        first = asyncio.create_task(hold("s"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(hold("s"))
+        await asyncio.sleep(0)
+        state = (admission.active, admission.waiting)
+        release.set()
+        await asyncio.gather(first, second)
+        return state, admission._idle.is_set()
+
+    (active, waiting), idle = asyncio.run(run())
+    assert (active, waiting) == (1, 1)
+    assert idle
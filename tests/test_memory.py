@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+from client.memory import MemoryBackend, MemoryStore, SQLiteMemoryBackend
+
+
+async def summarize(summary: str, messages: list) -> str:
+    return summary + f"[{len(messages)}]"
+
+
+def test_backend_must_implement_all_methods():
+    class PartialBackend(MemoryBackend):
+        def load(self, session_id):
+            return [], "", 0
+
+        def append(self, session_id, role, content):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialBackend()
+
+
+def test_compaction_drops_summarized_messages_and_reloads(tmp_path):
+    path = str(tmp_path / "memory.db")
+
+    async def converse():
+        store = MemoryStore(backend=SQLiteMemoryBackend(path), token_budget=200, summarize=summarize)
+        memory = store.get("s")
+        await memory.load()
+        for index in range(40):
+            memory.add_user_message(f"第{index}个问题 " * 5)
+            memory.add_ai_message(f"回答{index} " * 5)
+            history = await memory.history()
+        store.close()
+        return memory, [message.content for message in history]
+
+    async def reload():
+        store = MemoryStore(backend=SQLiteMemoryBackend(path), token_budget=200, summarize=summarize)
+        try:
+            return [message.content for message in await store.get("s").history()]
+        finally:
+            store.close()
+
+    memory, history = asyncio.run(converse())
+    # 合并进摘要的消息不再留在内存中
+    assert memory._summarized_upto > 0
+    assert len(memory._messages) == 80 - memory._summarized_upto
+    assert asyncio.run(reload()) == history
+
+
+def test_backend_writes_run_off_the_event_loop_thread(tmp_path):
+    threads = []
+
+    class RecordingBackend(SQLiteMemoryBackend):
+        def append(self, session_id, role, content):
+            threads.append(threading.current_thread())
+            super().append(session_id, role, content)
+
+    async def converse():
+        store = MemoryStore(backend=RecordingBackend(str(tmp_path / "memory.db")))
+        memory = store.get("s")
+        await memory.load()
+        memory.add_user_message("你好")
+        store.close()
+
+    asyncio.run(converse())
+    assert threads and threading.main_thread() not in threads
+
+
+def test_sessions_are_evicted_without_backend():
+    store = MemoryStore(max_sessions=2)
+    first = store.get("a")
+    store.get("b")
+    store.get("c")
+    assert store.get("a") is not first
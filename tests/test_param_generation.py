@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from agent_collections import FakeToolContent, ModelAdapter, ParamGenerationError
+from benchmark.fakes import ScriptedChatModel
+from client.chain_executor import ChainExecutor
+
+NODE_INFO = {"name": "weather_search", "description": "查询天气",
+             "input_schema": {"type": "object", "properties": {"city": {"type": "string"}}, "required": ["city"]}}
+
+
+def make_adapter(replies: list, prompts: list) -> ModelAdapter:
+    """按顺序返回 replies 中的参数输出，并记录每次调用的最后一条消息"""
+    def responder(kind: str, content: str) -> str:
+        assert kind == "param"
+        prompts.append(content)
+        return replies[len(prompts) - 1]
+
+    model = ScriptedChatModel(responder=responder, first_token_latency=0, tokens_per_second=0)
+    return ModelAdapter(model_name="scripted-fake", model_type="fake", api_key="", base_url="", client=model)
+
+
+def generate(adapter: ModelAdapter) -> dict:
+    return asyncio.run(adapter.generate_param_by_current_node(chain_history=[], current_node_info=NODE_INFO,
+                                                              user_input="武汉天气", history=[]))
+
+
+@pytest.mark.parametrize("first", ['{"city": "武', '["武汉"]', '"武汉"'])
+def test_invalid_params_are_repaired_once(first):
+    prompts = []
+    params = generate(make_adapter([first, '{"city": "武汉"}'], prompts))
+    assert params == {"city": "武汉"}
+    assert len(prompts) == 2
+    assert "无法按要求解析" in prompts[1]
+
+
+def test_fenced_params_are_parsed():
+    prompts = []
+    assert generate(make_adapter(['```json\n{"city": "武汉"}\n```'], prompts)) == {"city": "武汉"}
+    assert len(prompts) == 1
+
+
+def test_unrepairable_params_fail_the_node_not_the_chain():
+    calls = []
+    adapter = make_adapter(['["武汉"]', '{"city": '], [])
+
+    async def call_tool(name: str, params: dict) -> str:
+        calls.append((name, params))
+        return "晴"
+
+    async def resolve_params(user_input, node, node_info, chain_history, history) -> dict:
+        return await adapter.generate_param_by_current_node(chain_history, node_info, user_input, history)
+
+    async def run():
+        executor = ChainExecutor(call_tool=call_tool, resolve_params=resolve_params, reuse_planned_input=False)
+        chain_run = executor.start("武汉天气", {"weather_search": NODE_INFO})
+        chain_run.add(FakeToolContent(type="tool", name="weather_search", input={"city": "武汉"}))
+        return await chain_run.wait()
+
+    with pytest.raises(ParamGenerationError):
+        generate(make_adapter(['["武汉"]', '{"city": '], []))
+    results = asyncio.run(run())
+    assert calls == []
+    assert "参数生成失败" in results[0].result
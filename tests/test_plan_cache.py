@@ -0,0 +1,39 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent_collections import FakeTextContent, FakeToolContent, ToolCallResult
+from client.plan_cache import PlanCache, history_scope
+
+
+def tool_plan(city: str) -> ToolCallResult:
+    return ToolCallResult(type="tool", result=FakeToolContent(type="tool", name="weather_search",
+                                                              input={"city": city, "date": "2025-05-07"}))
+
+
+def scope(history: list) -> str:
+    return f"fingerprint:catalog:{history_scope(history)}"
+
+
+def test_follow_up_does_not_reuse_plan_from_other_context():
+    cache = PlanCache()
+    wuhan = [HumanMessage(content="武汉今天天气怎么样"), AIMessage(content="武汉今天晴")]
+    beijing = [HumanMessage(content="北京今天天气怎么样"), AIMessage(content="北京今天多云")]
+    cache.put("那明天呢？", scope(wuhan), tool_plan("武汉"))
+
+    assert cache.get("那明天呢？", scope(beijing)) is None
+    assert cache.get("那明天呢", scope(wuhan)).result.input["city"] == "武汉"
+
+
+def test_first_turn_is_shared_across_sessions():
+    cache = PlanCache()
+    cache.put("武汉明天天气怎么样", scope([]), tool_plan("武汉"))
+    assert history_scope([]) == ""
+    assert cache.get("武汉明天天气怎么样", scope([])) is not None
+
+
+def test_similar_match_only_reuses_text_answers():
+    cache = PlanCache(similarity_threshold=0.8)
+    cache.put("查询订单1122334455的状态", scope([]), tool_plan("武汉"))
+    cache.put("你好，请介绍一下你自己", scope([]), ToolCallResult(type="text", result=FakeTextContent(type="text", text="我是助手")))
+
+    assert cache.get("查询订单9988776655的状态", scope([])) is None
+    assert cache.get("你好 请介绍一下你自己吧", scope([])).result.text == "我是助手"
@@ -0,0 +1,43 @@
+import pytest
+
+from plan_parser import IncrementalPlanParser, PlanParseError, parse_json
+
+CHAIN = ('<think>先订机票再查订单</think>```json\n[\n'
+         '  {"type": "tool", "name": "book_flight", "input": {"city": "广州"}}, // 订机票\n'
+         '  {"type": "tool", "name": "order_info", "input": {"order": "book_flight.result",},},\n'
+         ']\n```')
+
+
+def test_nodes_are_returned_as_soon_as_they_close():
+    parser = IncrementalPlanParser()
+    steps = []
+    for index in range(0, len(CHAIN), 3):
+        for step in parser.feed(CHAIN[index:index + 3]):
+            # 第一个节点闭合时第二个节点还没有生成完
+            steps.append((step["name"], parser.done))
+    assert steps == [("book_flight", False), ("order_info", False)]
+    assert [item["name"] for item in parser.result()] == ["book_flight", "order_info"]
+    assert not parser.truncated
+
+
+def test_comments_and_trailing_commas_are_tolerated():
+    assert parse_json('{"a": [1, 2,], /* 注释 */ "b": "x // y",}') == {"a": [1, 2], "b": "x // y"}
+
+
+def test_truncated_output_is_rejected():
+    parser = IncrementalPlanParser()
+    parser.feed('[{"type": "tool", "name": "a", "input": {}}, {"type": "tool", "na')
+    assert parser.truncated is False
+    # 退回到最后一个完整的值并补齐括号
+    assert parser.result() == [{"type": "tool", "name": "a", "input": {}}, {"type": "tool"}]
+    assert parser.truncated
+    with pytest.raises(PlanParseError):
+        parse_json('{"city": "武')
+
+
+def test_text_without_json_is_rejected():
+    parser = IncrementalPlanParser()
+    parser.feed("今天天气不错")
+    assert not parser.started
+    with pytest.raises(PlanParseError):
+        parser.result()
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+from mcp.server import FastMCP
+
+from agent_collections import ModelAdapter
+from benchmark.fakes import ScriptedChatModel, memory_session_factory
+from client.cli import MCPClient
+from client.tool_cache import ToolResultCache
+from client.tool_policy import ToolPolicies, ToolPolicy
+from server.search_backend import GoogleSearchProvider, SearchBackend, SearchError, format_results
+
+API_KEY = "secret-api-key"
+
+
+def make_backend(responses: list) -> SearchBackend:
+    """依次返回 responses 中的响应，用完后重复最后一个"""
+    backend = SearchBackend([GoogleSearchProvider(API_KEY, "cx", url="https://google.test/customsearch/v1")])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    backend._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return backend
+
+
+def ok_response() -> httpx.Response:
+    return httpx.Response(200, json={"items": [{"title": "t", "link": "https://example.com", "snippet": "s"}]})
+
+
+@pytest.mark.parametrize("response, expected", [
+    (httpx.Response(500, text="internal error"), "google 搜索失败: HTTP 500"),
+    (httpx.Response(200, text="<html>rate limited</html>"), "google 返回的结果不是 JSON"),
+])
+def test_search_error_hides_request_url(response, expected):
+    async def run():
+        backend = make_backend([response])
+        try:
+            with pytest.raises(SearchError) as info:
+                await backend.search("google", "q", 3)
+        finally:
+            await backend.aclose()
+        return str(info.value)
+
+    message = asyncio.run(run())
+    assert message == expected
+    assert API_KEY not in message
+
+
+def test_failed_search_is_a_tool_error_and_not_cached():
+    backend = make_backend([httpx.Response(500), ok_response()])
+    mcp = FastMCP("SearchTest")
+
+    @mcp.tool()
+    async def google_search(query: str) -> str:
+        """Search."""
+        return format_results(await backend.search("google", query, 3))
+
+    async def run():
+        adapter = ModelAdapter(model_name="scripted-fake", model_type="fake", api_key="", base_url="",
+                               client=ScriptedChatModel())
+        client = MCPClient(model_adapter=adapter)
+        client.tool_cache = ToolResultCache(ttls={"google_search": 600})
+        client.tool_policies = ToolPolicies({"google_search": ToolPolicy(failure_threshold=5)})
+        logging.getLogger().setLevel(logging.ERROR)
+        try:
+            await client.connect_to_sessions({"search": memory_session_factory(mcp)})
+            failed = await client._call_tool_text("google_search", {"query": "q"})
+            cached_after_failure = client.tool_cache.stats()["size"]
+            failures = client.tool_policies._state("google_search").breaker.failures
+            succeeded = await client._call_tool_text("google_search", {"query": "q"})
+            return failed, cached_after_failure, failures, succeeded, client.tool_cache.stats()["size"]
+        finally:
+            await client.cleanup()
+            await backend.aclose()
+
+    failed, cached_after_failure, failures, succeeded, cached = asyncio.run(run())
+    assert "HTTP 500" in failed and API_KEY not in failed
+    assert cached_after_failure == 0
+    assert failures == 1
+    assert "https://example.com" in succeeded
+    assert cached == 1
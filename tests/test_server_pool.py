@@ -0,0 +1,79 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import anyio
+import pytest
+from mcp import types
+
+from client.server_pool import MCPServer
+
+
+class FakeSession:
+
+    def __init__(self, number: int):
+        self.number = number
+        self.broken = False
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> types.CallToolResult:
+        if self.broken:
+            raise anyio.ClosedResourceError()
+        return types.CallToolResult(content=[types.TextContent(type="text", text=f"session {self.number}")])
+
+
+def session_factory(sessions: list):
+    @asynccontextmanager
+    async def open_session(message_handler=None):
+        session = FakeSession(len(sessions))
+        sessions.append(session)
+        yield session
+
+    return open_session
+
+
+def texts(results) -> list:
+    return [result.content[0].text for result in results]
+
+
+def test_failed_connection_is_skipped_and_reconnected():
+    sessions = []
+
+    async def run():
+        server = MCPServer("fake", session_factory(sessions), pool_size=2, reconnect_delay=0.01)
+        await server.start()
+        try:
+            sessions[0].broken = True
+            with pytest.raises(anyio.ClosedResourceError):
+                await server.call_tool("echo", {})
+            # 失效的连接不再被选中，即使它的在途调用数最少
+            skipped = texts([await server.call_tool("echo", {}) for _ in range(3)])
+            for _ in range(100):
+                if all(connection.healthy for connection in server.connections):
+                    break
+                await asyncio.sleep(0.01)
+            return skipped, [connection.session.number for connection in server.connections]
+        finally:
+            await server.close()
+
+    skipped, numbers = asyncio.run(run())
+    assert skipped == ["session 1"] * 3
+    assert numbers == [2, 1]
+
+
+def test_all_connections_failed_raises_until_reconnected():
+    sessions = []
+
+    async def run():
+        server = MCPServer("fake", session_factory(sessions), pool_size=1, reconnect_delay=0.01)
+        await server.start()
+        try:
+            sessions[0].broken = True
+            with pytest.raises(anyio.ClosedResourceError):
+                await server.call_tool("echo", {})
+            with pytest.raises(RuntimeError):
+                await server.call_tool("echo", {})
+            await asyncio.sleep(0.05)
+            return texts([await server.call_tool("echo", {})])
+        finally:
+            await server.close()
+
+    assert asyncio.run(run()) == ["session 1"]
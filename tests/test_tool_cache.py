@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from client.shared_cache import SharedCache
+from client.tool_cache import ToolResultCache
+
+
+def counting_tool(calls: list, delay: float = 0.01):
+    async def call_tool(name: str, arguments: dict) -> str:
+        calls.append((name, arguments))
+        await asyncio.sleep(delay)
+        if arguments.get("fail"):
+            raise RuntimeError("upstream down")
+        return f"{name} {arguments['city']}"
+
+    return call_tool
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    calls = []
+    cache = ToolResultCache({"weather_search": 60})
+
+    async def run():
+        call_tool = counting_tool(calls)
+        # 参数顺序不同也视为相同的调用
+        return await asyncio.gather(
+            cache.call("weather_search", {"city": "武汉", "date": "d"}, call_tool),
+            cache.call("weather_search", {"date": "d", "city": "武汉"}, call_tool),
+            cache.call("weather_search", {"city": "武汉", "date": "d"}, call_tool))
+
+    assert asyncio.run(run()) == ["weather_search 武汉"] * 3
+    assert len(calls) == 1
+    assert cache.stats() == {"size": 1, "hits": 0, "misses": 1, "coalesced": 2}
+
+
+def test_uncacheable_and_failed_calls_are_not_cached():
+    calls = []
+    cache = ToolResultCache({"weather_search": 60})
+
+    async def run():
+        call_tool = counting_tool(calls, delay=0)
+        for _ in range(2):
+            await cache.call("book_flight", {"city": "广州"}, call_tool)
+            try:
+                await cache.call("weather_search", {"city": "武汉", "fail": True}, call_tool)
+            except RuntimeError:
+                pass
+
+    asyncio.run(run())
+    assert len(calls) == 4
+    assert cache.stats()["size"] == 0
+
+
+def test_expired_results_are_fetched_again():
+    calls = []
+    cache = ToolResultCache({"weather_search": 0.05})
+
+    async def run():
+        call_tool = counting_tool(calls, delay=0)
+        await cache.call("weather_search", {"city": "武汉"}, call_tool)
+        await cache.call("weather_search", {"city": "武汉"}, call_tool)
+        await asyncio.sleep(0.06)
+        await cache.call("weather_search", {"city": "武汉"}, call_tool)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_shared_cache_is_hit_by_another_process_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    calls = []
+
+    async def call(store: SharedCache, scope: str) -> str:
+        cache = ToolResultCache({"weather_search": 60}, store=store)
+        return await cache.call("weather_search", {"city": "武汉"}, counting_tool(calls, delay=0), scope=scope)
+
+    first, second = SharedCache(path), SharedCache(path)
+    try:
+        asyncio.run(call(first, "v1"))
+        asyncio.run(call(second, "v1"))
+        # 工具目录版本变化后不再命中旧结果
+        asyncio.run(call(second, "v2"))
+    finally:
+        first.close()
+        second.close()
+    assert len(calls) == 2
+
+
+def test_shared_cache_trims_least_recently_used(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.db"), max_bytes=4000)
+    try:
+        for index in range(10):
+            # 随机内容压缩后大小不变
+            cache.put(f"key{index}", "test", os.urandom(500).hex())
+        cache.put("expired", "test", "x", ttl=-1)
+        removed = cache.trim()
+        assert removed > 0
+        assert cache.size_bytes() <= 4000 * 0.9
+        assert cache.get("key9") is not None
+        assert cache.get("key0") is None
+        assert cache.get("expired") is None
+    finally:
+        cache.close()
+
+
+def test_shared_cache_skips_writes_while_another_process_holds_the_lock(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SharedCache(path, busy_timeout=0.01)
+    cache.put("key", "test", "value")
+    # 另一个连接持有写锁
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN EXCLUSIVE")
+    try:
+        started = time.perf_counter()
+        cache.put("other", "test", "value")
+        assert time.perf_counter() - started < 1
+        # WAL 模式下读取不受写锁影响
+        assert cache.get("key").value == "value"
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert cache.get("other") is None
+    cache.close()